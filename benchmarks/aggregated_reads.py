@@ -0,0 +1,80 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Compares reading reward dates of many nodes one call at a time with the
+aggregated paths of CallAggregator (JSON-RPC batches and Multicall3), against
+the in-process fake JSON-RPC node with a fixed round-trip latency.
+
+Usage: PYTHONPATH=. ENDPOINT=http://127.0.0.1:8545 python benchmarks/aggregated_reads.py
+"""
+
+import time
+
+from eth_abi import decode
+from web3 import HTTPProvider, Web3
+
+from tests.fake_rpc import FakeNode, FakeRpcServer
+from tools.multicall import CallAggregator
+
+NODES_ABI = [{
+    'name': 'getNodeNextRewardDate',
+    'type': 'function',
+    'stateMutability': 'view',
+    'inputs': [{'name': 'nodeIndex', 'type': 'uint256'}],
+    'outputs': [{'name': '', 'type': 'uint256'}]
+}]
+NODES_ADDRESS = Web3.to_checksum_address('0x' + '11' * 20)
+MULTICALL_ADDRESS = '0x' + 'ca' * 20
+LATENCY = 0.02  # in seconds
+NODES_NUMBERS = (10, 100, 500)
+
+
+def measure(server, read):
+    requests_before = server.http_requests
+    start = time.perf_counter()
+    read()
+    return time.perf_counter() - start, server.http_requests - requests_before
+
+
+def main():
+    server = FakeRpcServer(FakeNode(latency=LATENCY)).start()
+    web3 = Web3(HTTPProvider(server.url))
+    contract = web3.eth.contract(address=NODES_ADDRESS, abi=NODES_ABI)
+    selector = contract.functions.getNodeNextRewardDate(0)._encode_transaction_data()[:10]
+    server.node.set_call_result(selector, ['uint256'],
+                                lambda args: [decode(['uint256'], args)[0]])
+    paths = {
+        'per-call': lambda functions: [function.call() for function in functions],
+        'rpc batch': CallAggregator(web3).call,
+        'multicall': CallAggregator(web3, multicall_address=MULTICALL_ADDRESS).call
+    }
+    print(f'{"nodes":>6} {"path":<10} {"seconds":>8} {"requests":>9}')
+    try:
+        for nodes_number in NODES_NUMBERS:
+            functions = [contract.functions.getNodeNextRewardDate(i) for i in range(nodes_number)]
+            for name, read in paths.items():
+                seconds, requests = measure(server, lambda: read(functions))
+                print(f'{nodes_number:>6} {name:<10} {seconds:>8.3f} {requests:>9}')
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
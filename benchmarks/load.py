@@ -0,0 +1,211 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Load benchmark of the real BountyAgentFleet, or AsyncBountyAgent with --async, against
+the fake JSON-RPC node, which runs in a child process so CPU time and memory belong
+to the agent only. Every
+node gets a reward date a few seconds ahead; the run ends when all nodes have
+claimed their bounty.
+
+Reports per fleet size: claim latency percentiles (from the reward date to the
+getBounty transaction reaching the node), JSON-RPC requests and HTTP round trips
+per claim, CPU time and RSS of the agent process. Results are saved as JSON.
+
+Usage: PYTHONPATH=. ENDPOINT=http://127.0.0.1:8545 python benchmarks/load.py \
+       [--nodes 1,10,100,1000] [--latency 0.005] [--jitter 0.005] [--output load.json] \
+       [--async]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+
+import requests
+from eth_account import Account
+from skale.wallets import Web3Wallet
+
+import bounty_agent
+import tools.agent_state
+import tools.ledger
+import tools.logger
+from tests.fake_rpc import (MANAGER_ABI, NODES_ABI, FakeRpcServer, FakeSkaleChain,
+                            make_manager_abi)
+from tools.agent_skale import AgentSkale
+
+RUN_TIMEOUT = 600  # in seconds
+
+
+class BenchChain(FakeSkaleChain):
+    """Fake chain that also reports its statistics to the benchmark."""
+
+    def __init__(self, nodes_number, **kwargs):
+        super().__init__(nodes_number, **kwargs)
+        self.stats_requests = 0
+
+    def handle(self, request):
+        if request['method'] == 'bench_getStats':
+            with self._lock:
+                self.stats_requests += 1
+                return {'jsonrpc': '2.0', 'id': request['id'], 'result': {
+                    'stats_requests': self.stats_requests,
+                    'calls': dict(self.calls),
+                    'claim_latencies': list(self.claim_latencies)
+                }}
+        return super().handle(request)
+
+
+def serve_chain(connection, nodes_number, latency, jitter):
+    server = FakeRpcServer(BenchChain(nodes_number, latency=latency, jitter=jitter))
+    server.start()
+    connection.send(server.url)
+    connection.recv()
+    connection.send(server.http_requests)
+    server.stop()
+
+
+def get_stats(url):
+    request = {'jsonrpc': '2.0', 'id': 0, 'method': 'bench_getStats', 'params': []}
+    return requests.post(url, json=request).json()['result']
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() / 2 ** 20
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(nodes_number, abi_filepath, skale_class, latency, jitter, agent_class):
+    connection, child_connection = multiprocessing.Pipe()
+    chain = multiprocessing.Process(target=serve_chain,
+                                    args=(child_connection, nodes_number, latency, jitter))
+    chain.start()
+    url = connection.recv()
+    try:
+        cpu_before, start = cpu_seconds(), time.perf_counter()
+        skale = skale_class(url, abi_filepath)
+        skale.wallet = Web3Wallet(Account.create().key.hex(), skale.web3)
+        fleet = agent_class(skale, list(range(nodes_number)))
+        fleet.run()
+        deadline = time.monotonic() + RUN_TIMEOUT
+        while len(get_stats(url)['claim_latencies']) < nodes_number:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'Not all {nodes_number} nodes claimed in {RUN_TIMEOUT} s')
+            time.sleep(0.5)
+        fleet.stop()
+        fleet.receipt_tracker.stop()
+        if isinstance(fleet, bounty_agent.AsyncBountyAgent):
+            fleet.shutdown()
+        else:
+            fleet.scheduler.shutdown(wait=True)  # lets running job listeners finish
+        duration, cpu = time.perf_counter() - start, cpu_seconds() - cpu_before
+        stats = get_stats(url)
+    finally:
+        connection.send('stop')
+        http_requests = connection.recv()
+        chain.join()
+    latencies = stats['claim_latencies']
+    rpc_requests = sum(stats['calls'].values())
+    return {
+        'nodes': nodes_number,
+        'duration_s': round(duration, 3),
+        'claim_latency_p50_s': round(percentile(latencies, 0.5), 3),
+        'claim_latency_p99_s': round(percentile(latencies, 0.99), 3),
+        'claim_latency_mean_s': round(statistics.mean(latencies), 3),
+        'rpc_requests_per_claim': round(rpc_requests / nodes_number, 2),
+        'http_requests_per_claim': round(
+            (http_requests - stats['stats_requests']) / nodes_number, 2),
+        'rpc_requests_by_method': stats['calls'],
+        'cpu_s': round(cpu, 3),
+        'cpu_ms_per_claim': round(cpu * 1000 / nodes_number, 2),
+        'rss_mb': round(rss_mb(), 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--nodes', default='1,10,100,1000',
+                        help='comma-separated fleet sizes')
+    parser.add_argument('--latency', type=float, default=0.005,
+                        help='seconds added to every HTTP request')
+    parser.add_argument('--jitter', type=float, default=0.005,
+                        help='up to this many seconds are added to the latency')
+    parser.add_argument('--output', default='load.json', help='JSON file with the results')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='run AsyncBountyAgent instead of BountyAgentFleet')
+    args = parser.parse_args()
+    agent_class = bounty_agent.AsyncBountyAgent if args.use_async \
+        else bounty_agent.BountyAgentFleet
+
+    tmp_dir = tempfile.mkdtemp()
+    abi_filepath = os.path.join(tmp_dir, 'manager.json')
+    abi = make_manager_abi(['nodes', 'manager'], functions_number=0)
+    abi['nodes_abi'], abi['skale_manager_abi'] = NODES_ABI, MANAGER_ABI
+    with open(abi_filepath, 'w') as abi_file:
+        json.dump(abi, abi_file)
+    # Logs and the ledger go to the temporary folder instead of the node data volume
+    tools.logger.LOG_FOLDER = tmp_dir
+    tools.ledger.LEDGER_DB_PATH = os.path.join(tmp_dir, 'ledger.db')
+
+    class BenchAgentSkale(AgentSkale):
+        abi_cache_folder = os.path.join(tmp_dir, 'cache')
+
+    results = []
+    print(f'{"nodes":>6} {"seconds":>8} {"p50 s":>7} {"p99 s":>7} {"rpc/claim":>10} '
+          f'{"http/claim":>11} {"cpu ms/claim":>13} {"rss MB":>7}')
+    try:
+        for nodes_number in [int(number) for number in args.nodes.split(',')]:
+            # every run starts without a saved schedule
+            tools.agent_state._state_store = tools.agent_state.StateStore(
+                os.path.join(tmp_dir, f'state-{nodes_number}.db'))
+            result = run(nodes_number, abi_filepath, BenchAgentSkale, args.latency, args.jitter,
+                         agent_class)
+            results.append(result)
+            print(f'{result["nodes"]:>6} {result["duration_s"]:>8.2f} '
+                  f'{result["claim_latency_p50_s"]:>7.3f} {result["claim_latency_p99_s"]:>7.3f} '
+                  f'{result["rpc_requests_per_claim"]:>10.2f} '
+                  f'{result["http_requests_per_claim"]:>11.2f} '
+                  f'{result["cpu_ms_per_claim"]:>13.2f} {result["rss_mb"]:>7.1f}')
+    finally:
+        shutil.rmtree(tmp_dir)
+    with open(args.output, 'w') as output_file:
+        json.dump({'latency': args.latency, 'jitter': args.jitter, 'async': args.use_async,
+                   'results': results},
+                  output_file, indent=2)
+    print(f'Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Decoding BountyReceived from getBounty receipts: web3's process_receipt against
+EventDecoder with all fields and with the fields the agent uses, for one receipt
+and for a batch of receipts. Receipts carry token transfer logs next to the event.
+
+Usage: PYTHONPATH=. ENDPOINT=http://127.0.0.1:8545 python benchmarks/receipt_decoding.py
+"""
+
+import time
+
+from web3 import Web3
+from web3.logs import DISCARD
+
+from tests.test_event_decoder import MANAGER_ABI, MANAGER_ADDRESS, make_log
+from tools.event_decoder import EventDecoder
+
+TOKEN_ADDRESS = Web3.to_checksum_address('0x' + 'ee' * 20)
+TRANSFER_TOPIC = Web3.keccak(text='Transfer(address,address,uint256)')
+OTHER_LOGS = 3
+BATCH_SIZE = 1000
+RUNS = 5
+
+
+def make_receipt(decoder, node_id):
+    logs = [make_log(decoder, node_id, address=TOKEN_ADDRESS, topic=TRANSFER_TOPIC)
+            for _ in range(OTHER_LOGS)]
+    return {'logs': logs + [make_log(decoder, node_id)]}
+
+
+def best_time(function, receipts):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        for receipt in receipts:
+            function(receipt)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    contract = Web3().eth.contract(address=MANAGER_ADDRESS, abi=MANAGER_ABI)
+    full_decoder = EventDecoder(contract, 'BountyReceived')
+    agent_decoder = EventDecoder(contract, 'BountyReceived', ('nodeIndex', 'bounty'))
+    receipts = [make_receipt(agent_decoder, node_id) for node_id in range(BATCH_SIZE)]
+    paths = {
+        'process_receipt': lambda receipt: contract.events.BountyReceived().process_receipt(
+            receipt, errors=DISCARD),
+        'EventDecoder, all fields': full_decoder.decode_receipt,
+        'EventDecoder, agent fields': agent_decoder.decode_receipt
+    }
+    print(f'{"path":<28} {"us/receipt":>11} {"batch of " + str(BATCH_SIZE):>14}')
+    for name, decode_receipt in paths.items():
+        single = best_time(decode_receipt, receipts[:1])
+        batch = best_time(decode_receipt, receipts)
+        print(f'{name:<28} {single * 10 ** 6:>11.1f} {batch * 1000:>11.1f} ms')
+    batch = best_time(agent_decoder.decode_receipts, [receipts])
+    print(f'{"decode_receipts":<28} {"":>11} {batch * 1000:>11.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
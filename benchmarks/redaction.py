@@ -0,0 +1,97 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Microbenchmark of log redaction: records/sec of HidingFormatter against the
+previous per-call regex implementation, for short messages and receipt dumps.
+
+Usage: PYTHONPATH=. ENDPOINT=http://127.0.0.1:8545 python benchmarks/redaction.py
+"""
+
+import logging
+import os
+import re
+import time
+from logging import Formatter
+
+from configs.logs import LOG_FORMAT
+from tools.logger import HidingFormatter
+
+PATTERNS = {
+    r'10\.1\.0\.1': '[SGX_IP]',
+    r'10\.1\.0\.2': '[ETH_IP]',
+    r'NEK\:\w+': '[SGX_KEY]'
+}
+SHORT_MSG = 'Current block timestamp is less than reward time. Will try in 1 min'
+RECEIPT_MSG = 'Receipt: ' + repr({
+    'blockHash': os.urandom(32).hex(),
+    'logs': [
+        {'data': os.urandom(96).hex(), 'topics': [os.urandom(32).hex() for _ in range(3)]}
+        for _ in range(20)
+    ],
+    'status': 1
+})
+SECRET_MSG = 'Connecting to https://10.1.0.1:1026 with key NEK:0123456789abcdef'
+DURATION = 1.0  # in seconds
+
+
+class LegacyHidingFormatter(Formatter):
+    def __init__(self, log_format, patterns):
+        super().__init__(log_format)
+        self._patterns = patterns
+
+    def _filter_sensitive(self, msg):
+        for match, replacement in self._patterns.items():
+            pat = re.compile(match)
+            msg = pat.sub(replacement, msg)
+        return msg
+
+    def format(self, record):
+        return self._filter_sensitive(super().format(record))
+
+
+def make_record(msg):
+    return logging.LogRecord('bounty-agent', logging.DEBUG, __file__, 0, msg, None, None)
+
+
+def records_per_sec(formatter, msg, handlers_number):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        record = make_record(msg)
+        for _ in range(handlers_number):
+            formatter.format(record)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    legacy = LegacyHidingFormatter(LOG_FORMAT, PATTERNS)
+    current = HidingFormatter(LOG_FORMAT, PATTERNS)
+    print(f'{"message":<10} {"handlers":>8} {"legacy rec/s":>14} {"new rec/s":>14} {"speedup":>8}')
+    for name, msg in (('short', SHORT_MSG), ('receipt', RECEIPT_MSG), ('secret', SECRET_MSG)):
+        for handlers_number in (1, 2):
+            old_rate = records_per_sec(legacy, msg, handlers_number)
+            new_rate = records_per_sec(current, msg, handlers_number)
+            print(f'{name:<10} {handlers_number:>8} {old_rate:>14.0f} {new_rate:>14.0f} '
+                  f'{new_rate / old_rate:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Startup time of the Skale object the agent uses: the full Skale against AgentSkale
+with a cold and a warm ABI cache. Uses a synthetic manager.json of realistic size
+and the in-process fake JSON-RPC node.
+
+Usage: PYTHONPATH=. ENDPOINT=http://127.0.0.1:8545 python benchmarks/startup.py
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from skale import Skale
+from skale.skale_manager import CONTRACTS_INFO
+
+from tests.fake_rpc import FakeRpcServer, make_manager_abi
+from tools.agent_skale import AgentSkale
+
+RUNS = 5
+
+
+def start(skale_class, endpoint, abi_filepath):
+    begin = time.perf_counter()
+    skale = skale_class(endpoint, abi_filepath)
+    skale.nodes, skale.manager
+    return time.perf_counter() - begin
+
+
+def main():
+    server = FakeRpcServer().start()
+    server.node.serve_contract_manager()
+    tmp_dir = tempfile.mkdtemp()
+    abi_filepath = os.path.join(tmp_dir, 'manager.json')
+    cache_folder = os.path.join(tmp_dir, 'cache')
+    with open(abi_filepath, 'w') as abi_file:
+        json.dump(make_manager_abi([info.name for info in CONTRACTS_INFO]), abi_file)
+    print(f'manager.json size: {os.path.getsize(abi_filepath) / 10 ** 6:.1f} MB')
+
+    class BenchAgentSkale(AgentSkale):
+        abi_cache_folder = cache_folder
+
+    try:
+        results = {'full Skale': [], 'AgentSkale, cold cache': [], 'AgentSkale, warm cache': []}
+        for _ in range(RUNS):
+            results['full Skale'].append(start(Skale, server.url, abi_filepath))
+            shutil.rmtree(cache_folder, ignore_errors=True)
+            results['AgentSkale, cold cache'].append(
+                start(BenchAgentSkale, server.url, abi_filepath))
+            results['AgentSkale, warm cache'].append(
+                start(BenchAgentSkale, server.url, abi_filepath))
+        for name, seconds in results.items():
+            print(f'{name:<24} {min(seconds) * 1000:>8.1f} ms (best of {RUNS})')
+    finally:
+        server.stop()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -21,150 +21,947 @@
 Bounty agent runs on every node of SKALE network.
 Agent requests to receive available reward for validation work.
 """
+import asyncio
+import concurrent.futures
+import functools
 import logging
+import signal
 import socket
+import threading
 import time
 from datetime import datetime, timedelta
 
-import tenacity
+import aiohttp
 from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
 from skale.transactions.exceptions import TransactionError
-from web3.logs import DISCARD
 
-from configs import (DELAY_AFTER_ERR, LONG_LINE, MISFIRE_GRACE_TIME,
-                     NODE_CONFIG_FILEPATH, RETRY_INTERVAL)
-from tools.exceptions import NotTimeForBountyException
-from tools.helper import (MsgIcon, Notifier, call_retry,
-                          check_if_node_is_registered, get_agent_name,
+from configs import (ASYNC_AGENT, ASYNC_RPC_TIMEOUT, BOUNTY_JOB_ID_PREFIX, BOUNTY_PREFLIGHT,
+                     LONG_LINE, MISFIRE_GRACE_TIME, NODE_CONFIG_FILEPATH, NODE_IDS,
+                     METRICS_HOST, METRICS_PORT, REVALIDATE_JOB_ID_PREFIX,
+                     SCHEDULER_MAX_WORKERS)
+from tools.agent_state import get_state_store
+from tools.balance_oracle import BalanceOracle
+from tools.block_clock import BlockClock
+from tools.event_decoder import EventDecoder
+from tools.exceptions import (NodeNotFoundException, NotEnoughEthForTxException,
+                              NotTimeForBountyException, PreflightFailedException)
+from tools.helper import (MsgIcon, Notifier, RpcBatch, RpcError, call_retry,
+                          check_if_node_is_registered,
+                          check_if_nodes_are_registered, get_agent_name,
                           get_id_from_config, init_skale)
-from tools.logger import add_file_handler, init_logger
+from tools.ledger import BountyClaim, get_ledger
+from tools.logger import add_file_handler, flush_logs, init_logger
+from tools.metrics import (CLAIM_LAG, CLAIMS, NOT_TIME_FOR_BOUNTY_RETRIES,
+                           RPC_LATENCY, start_metrics_server, track_scheduler)
+from tools.multicall import CallAggregator, get_nodes_info, get_reward_dates
+from tools.preflight import RevertReason, classify_revert, revert_message
+from tools.receipt_tracker import ReceiptTracker
+from tools.retry import job_retry_delay
+from tools.submitter import ClaimSubmitter, PendingClaim
+from tools.supervisor import Supervisor
+from tools.tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
 
+def create_scheduler():
+    return BackgroundScheduler(
+        timezone='UTC',
+        executors={'default': ThreadPoolExecutor(SCHEDULER_MAX_WORKERS)},
+        job_defaults={'coalesce': True, 'misfire_grace_time': MISFIRE_GRACE_TIME})
+
+
+def create_bounty_decoder(skale):
+    return EventDecoder(skale.manager.contract, 'BountyReceived', ('nodeIndex', 'bounty'))
+
+
 class BountyAgent:
 
-    def __init__(self, skale, node_id=None):
+    def __init__(self, skale, node_id=None, fleet=None):
+        """
+        Standalone agent owns its scheduler, block clock and log file. Agents of
+        a fleet share them and log through a child of the fleet logger.
+        """
         self.agent_name = get_agent_name(self.__class__.__name__)
-        self.logger = logging.getLogger(self.agent_name)
-        add_file_handler(self.logger, self.agent_name, node_id)
+        if fleet is None:
+            self.logger = logging.getLogger(self.agent_name)
+            add_file_handler(self.logger, self.agent_name, node_id)
+        else:
+            self.logger = fleet.logger.getChild(str(node_id))
         self.logger.info(f'Initialization of {self.agent_name} ...')
         if node_id is None:
             self.id = get_id_from_config(NODE_CONFIG_FILEPATH)
         else:
             self.id = node_id
         self.skale = skale
+        self.job_id = f'{BOUNTY_JOB_ID_PREFIX}{self.id}'
+        self.state_store = get_state_store() if fleet is None else fleet.state_store
+        if fleet is None:
+            self.saved_state = self.load_state()
+        else:
+            self.saved_state = fleet.saved_states.get(self.id)
 
-        check_if_node_is_registered(self.skale, self.id)
+        if fleet is not None:
+            node_info = fleet.nodes_info[self.id]
+        elif self.saved_state is not None and self.saved_state.has_node_info:
+            # the node is checked against SKALE Manager by revalidate after the start
+            node_info = {'name': self.saved_state.node_name, 'ip': self.saved_state.node_ip}
+        else:
+            check_if_node_is_registered(self.skale, self.id)
+            node_info = call_retry(self.skale.nodes.get, self.id)
+            node_info = {'name': node_info['name'], 'ip': socket.inet_ntoa(node_info['ip'])}
+            self.save_state(node_name=node_info['name'], node_ip=node_info['ip'])
+        self.notifier = Notifier(self.agent_name, node_info['name'], self.id, node_info['ip'])
+        self.stopped = threading.Event()
+        self.owns_scheduler = fleet is None
+        if fleet is None:
+            self.scheduler = create_scheduler()
+            track_scheduler(self.scheduler)
+        else:
+            self.scheduler = fleet.scheduler
+        self.block_clock = BlockClock() if fleet is None else fleet.block_clock
+        if fleet is None:
+            self.balance_oracle = BalanceOracle(skale, self.notifier)
+            self.submitter = ClaimSubmitter(skale, self.balance_oracle)
+        else:
+            self.balance_oracle = fleet.balance_oracle
+            self.submitter = fleet.submitter
+        self.receipt_tracker = ReceiptTracker(skale, nonce_manager=self.submitter.nonce_manager) \
+            if fleet is None else fleet.receipt_tracker
+        self.bounty_decoder = create_bounty_decoder(skale) if fleet is None \
+            else fleet.bounty_decoder
+        self.ledger = get_ledger() if fleet is None else fleet.ledger
+        self.preflight_reason = None
+        self.failed_jobs = 0  # in a row, for the retry backoff
+        self.failed_revalidations = 0  # in a row, counted apart from failed jobs
+        self.tracer = get_tracer()
+        if fleet is None:  # the fleet sends one message for all its nodes
+            self.notifier.send(f'{self.agent_name} started successfully with a node ID = '
+                               f'{self.id}', icon=MsgIcon.INFO)
 
-        node_info = call_retry(self.skale.nodes.get, self.id)
-        self.notifier = Notifier(self.agent_name, node_info['name'],
-                                 self.id, socket.inet_ntoa(node_info['ip']))
-        self.is_stopped = False
-        self.scheduler = BackgroundScheduler(
-            timezone='UTC',
-            job_defaults={'coalesce': True, 'misfire_grace_time': MISFIRE_GRACE_TIME})
-        self.notifier.send(f'{self.agent_name} started successfully with a node ID = {self.id}',
-                           icon=MsgIcon.INFO)
+    def load_state(self):
+        if self.state_store is None:
+            return None
+        try:
+            return self.state_store.load([self.id]).get(self.id)
+        except Exception as err:
+            self.logger.warning(f'Cannot load saved state: {err}')
+            return None
+
+    def save_state(self, **fields):
+        self._update_state('save', **fields)
+
+    def _update_state(self, method, *args, **kwargs):
+        """Calls the state store method for the node, the claim path never fails on it."""
+        if self.state_store is None:
+            return
+        try:
+            getattr(self.state_store, method)(self.id, *args, **kwargs)
+        except Exception as err:
+            self.logger.warning(f'Cannot save state: {err}')
+
+    def read_failed(self, err):
+        """Notifies that the reward date or the claim state cannot be read."""
+        self.notifier.send(f'Cannot get reward date from SKALE Manager: {err}', MsgIcon.ERROR,
+                           key='reward_date_error')
 
     def get_reward_date(self):
         try:
-            reward_date = call_retry(
-                self.skale.nodes.contract.functions.getNodeNextRewardDate(self.id).call)
+            with RPC_LATENCY.time('reward_date'):
+                reward_date = call_retry(
+                    self.skale.nodes.contract.functions.getNodeNextRewardDate(self.id).call)
         except Exception as err:
-            self.notifier.send(f'Cannot get reward date from SKALE Manager: {err}', MsgIcon.ERROR)
+            self.read_failed(err)
             raise
         return datetime.utcfromtimestamp(reward_date)
 
-    def get_bounty(self):
+    def claim_state_batch(self) -> RpcBatch:
+        """
+        Batch of reward date, the latest block header and, with BOUNTY_PREFLIGHT,
+        a gas estimate of getBounty, which fails if the claim would revert.
+        """
+        batch = RpcBatch(self.skale.web3)
+        batch.add_call(self.skale.nodes.contract.functions.getNodeNextRewardDate(self.id))
+        batch.add_block('latest')
+        if BOUNTY_PREFLIGHT:
+            batch.add_estimate_gas(self.skale.manager.contract.functions.getBounty(self.id),
+                                   sender=self.skale.wallet.address, allow_error=True)
+        return batch
+
+    @staticmethod
+    def parse_claim_state(results):
+        """
+        Returns the reward date, the block, the preflight error if the claim would revert
+        and the gas estimate of the claim if the preflight passed.
+        """
+        reward_date, block_data, *preflight = results
+        preflight_error = next((result for result in preflight if isinstance(result, RpcError)),
+                               None)
+        gas_estimate = next((result for result in preflight if isinstance(result, int)), None)
+        return datetime.utcfromtimestamp(reward_date), block_data, preflight_error, gas_estimate
+
+    def get_claim_state(self) -> list:
+        """Reads the claim state in one JSON-RPC batch, see claim_state_batch."""
+        batch = self.claim_state_batch()
+        try:
+            with RPC_LATENCY.time('claim_state'):
+                return call_retry(batch.execute)
+        except Exception as err:
+            self.read_failed(err)
+            raise
+
+    def check_preflight(self, preflight_error, reward_date):
+        """Raises if the simulated claim reverted, notifies once per new revert reason."""
+        if preflight_error is None:
+            self.preflight_reason = None
+            return
+        reason = classify_revert(preflight_error)
+        if reason == RevertReason.NOT_TIME:
+            delay = self.block_clock.poll_delay(reward_date)
+            self.logger.info(f'Claim is not allowed yet on-chain. Will try in {delay:.1f} sec')
+            NOT_TIME_FOR_BOUNTY_RETRIES.inc()
+            raise NotTimeForBountyException(delay)
+        message = f'Bounty claim would revert: {revert_message(preflight_error)}'
+        self.logger.warning(f'{message}. Will try in {reason.delay} sec')
+        if reason != self.preflight_reason:
+            icon = MsgIcon.WARNING if reason == RevertReason.INCOMPLIANT else MsgIcon.CRITICAL
+            self.notifier.send(message, icon, key=f'preflight_{reason.name.lower()}')
+        self.preflight_reason = reason
+        raise PreflightFailedException(reason, reason.delay, message)
+
+    def record_claim(self, status, reward_date, **fields):
+        if self.ledger is not None:
+            self.ledger.record(self.id, status, reward_date, **fields)
+
+    def get_bounty(self, reward_date=None, on_result=None, gas_estimate=None) -> PendingClaim:
+        """
+        Sends the claim and returns without waiting for the receipt: the receipt tracker
+        passes the result to on_result, by default it is handed back to the scheduler
+        as the finish_claim job of this node. With the gas estimate of the preflight
+        the claim is sent without a dry run.
+        """
+        start = time.monotonic()
         try:
-            tx_res = self.skale.manager.get_bounty(self.id)
+            with RPC_LATENCY.time('get_bounty_send'), self.tracer.span('send_transaction'):
+                claim = self.submitter.submit(self.id, gas_estimate)
+        except NotEnoughEthForTxException as err:
+            self.logger.warning(f'Bounty claim is not sent: {err}')
+            raise
         except TransactionError as err:
-            self.notifier.send(str(err), MsgIcon.CRITICAL)
+            self.claim_failed(err, reward_date, time.monotonic() - start)
             raise
+        self._update_state('add_claim', claim.tx_id, claim.sent_at)
+        if on_result is None:
+            def on_result(*result):
+                self.on_claim_result(*result, reward_date=reward_date)
+        self.receipt_tracker.track(claim, on_result)
+        return claim
+
+    def on_claim_result(self, claim, tx_res, error, reward_date=None):
+        if self.is_stopped:
+            self.logger.info(f'Agent is stopped, result of {claim.tx_id} is not processed')
+            return
+        RPC_LATENCY.observe(time.time() - claim.sent_at, 'get_bounty_receipt')
+        self.scheduler.add_job(self.finish_claim, args=[claim, tx_res, error, reward_date],
+                               id=self.job_id, replace_existing=True)
+
+    def claim_failed(self, err, reward_date, duration):
+        CLAIMS.inc(BountyClaim.FAILED)
+        with self.tracer.span('notify'):
+            self.notifier.send(str(err), MsgIcon.CRITICAL, key='claim_failed')
+        with self.tracer.span('record_claim'):
+            self.record_claim(BountyClaim.FAILED, reward_date, duration=duration, error=str(err))
+
+    def finish_claim(self, claim, tx_res, error, reward_date=None):
+        """Processes the result of the claim, raises the error if the transaction failed."""
+        self._update_state('remove_claim', claim.tx_id)
+        duration = time.time() - claim.sent_at
+        if error is not None:
+            self.claim_failed(error, reward_date, duration)
+            raise error
+        CLAIMS.inc(BountyClaim.SUCCESS)
+        if reward_date is not None:
+            CLAIM_LAG.observe(time.time() - self.block_clock.local_timestamp(reward_date))
         self.logger.info('The bounty was successfully received')
-        self.logger.debug(f'Receipt: {tx_res.receipt}')
         tx_hash = tx_res.receipt['transactionHash'].hex()
+        self.logger.debug(f'Receipt: {tx_hash}, block: {tx_res.receipt["blockNumber"]}, '
+                          f'gas used: {tx_res.receipt["gasUsed"]}')
         self.logger.info(LONG_LINE)
 
+        bounty = None
         try:
-            h_receipt = self.skale.manager.contract.events.BountyReceived().process_receipt(
-                tx_res.receipt, errors=DISCARD)
-            self.logger.info(h_receipt)
-            args = h_receipt[0]['args']
-            bounty_in_skl = self.skale.web3.from_wei(args["bounty"], 'ether')
+            with self.tracer.span('process_receipt'):
+                events = self.bounty_decoder.decode_receipt(tx_res.receipt)
+            event = next(event for event in events if event['nodeIndex'] == self.id)
+            self.logger.info(f'BountyReceived: {event}')
+            bounty = event['bounty']
+            bounty_in_skl = self.skale.web3.from_wei(bounty, 'ether')
         except Exception as err:
-            self.notifier.send(f'Bounty was received, but reward amount cannot be read from '
-                               f'tx receipt.\nTX hash: {tx_hash}', MsgIcon.WARNING)
+            with self.tracer.span('notify'):
+                self.notifier.send(f'Bounty was received, but reward amount cannot be read from '
+                                   f'tx receipt.\nTX hash: {tx_hash}', MsgIcon.WARNING)
             self.logger.exception(err)
         else:
-            self.notifier.send(f'Bounty awarded to node: {bounty_in_skl:.3f} SKL.\n'
-                               f'TX hash: {tx_hash}', MsgIcon.BOUNTY)
+            with self.tracer.span('notify'):
+                self.notifier.send(f'Bounty awarded to node: {bounty_in_skl:.3f} SKL.\n'
+                                   f'TX hash: {tx_hash}', MsgIcon.BOUNTY)
+        with self.tracer.span('record_claim'):
+            self.record_claim(BountyClaim.SUCCESS, reward_date, duration=duration,
+                              tx_hash=tx_hash, block_number=tx_res.receipt['blockNumber'],
+                              gas_used=tx_res.receipt['gasUsed'], bounty=bounty)
         return tx_res.receipt['status']
 
-    @tenacity.retry(wait=tenacity.wait_fixed(RETRY_INTERVAL),
-                    retry=tenacity.retry_if_exception_type(NotTimeForBountyException))
-    def job(self) -> None:
-        """Periodic job."""
+    def job(self) -> PendingClaim:
+        """
+        Periodic job, returns the sent claim. If it is early to claim, the job raises
+        and is scheduled again when the reward block is expected.
+        """
+        with self.tracer.span('job', node_id=self.id):
+            return self._job()
+
+    def _job(self):
         self.logger.debug('"Get Bounty" job started')
-        reward_date = self.get_reward_date()
-        last_block_number = self.skale.web3.eth.block_number
-        block_data = call_retry.call(self.skale.web3.eth.get_block, last_block_number)
+        with self.tracer.span('claim_state'):
+            results = self.get_claim_state()
+        reward_date, gas_estimate = self.check_claim_state(results)
+        return self.send_claim(reward_date, gas_estimate)
+
+    def send_claim(self, reward_date, gas_estimate, on_result=None):
+        with self.tracer.profile(f'get-bounty-{self.id}'), self.tracer.span('get_bounty'):
+            return self.get_bounty(reward_date, on_result, gas_estimate)
+
+    def check_claim_state(self, results):
+        """
+        Returns the reward date and the gas estimate of the claim from the results of
+        claim_state_batch. Raises NotTimeForBountyException or PreflightFailedException
+        if it is early to claim.
+        """
+        reward_date, block_data, preflight_error, gas_estimate = self.parse_claim_state(results)
+        self.block_clock.observe(block_data)
         block_timestamp = datetime.utcfromtimestamp(block_data['timestamp'])
         self.logger.info(f'Reward date: {reward_date}')
         self.logger.info(f'Block timestamp:  {block_timestamp}')
         if reward_date > block_timestamp:
-            self.logger.info('Current block timestamp is less than reward time. Will try in 1 min')
-            raise NotTimeForBountyException(Exception)
-        self.get_bounty()
+            delay = self.block_clock.poll_delay(reward_date)
+            self.logger.info(f'Current block timestamp is less than reward time. '
+                             f'Will try in {delay:.1f} sec')
+            NOT_TIME_FOR_BOUNTY_RETRIES.inc()
+            raise NotTimeForBountyException(delay)
+        self.check_preflight(preflight_error, reward_date)
+        return reward_date, gas_estimate
+
+    def retry_delay(self, err) -> float:
+        """Seconds before the job runs again after the error, counts failed jobs in a row."""
+        if isinstance(err, NotTimeForBountyException):
+            return err.delay
+        delay = job_retry_delay(err, self.failed_jobs)
+        self.failed_jobs += 1
+        return delay
+
+    def job_failed(self, err) -> datetime:
+        """Returns the date of the next try after the failed job and saves it."""
+        delay = self.retry_delay(err)
+        if not isinstance(err, NotTimeForBountyException):
+            self.logger.info(f'"Get Bounty" job failed: {err}. Will try in {delay:.1f} sec')
+        run_date = datetime.utcnow() + timedelta(seconds=delay)
+        self.save_state(next_claim_at=run_date)
+        return run_date
+
+    def job_finished(self, reward_date=None, error=None) -> datetime:
+        """
+        Returns the date of the next job after a finished claim and saves it: the next
+        reward date, or a retry if the error prevented reading it.
+        """
+        self.logger.debug('"Get Bounty" job finished successfully')
+        self.failed_jobs = 0
+        if error is not None:
+            run_date = datetime.utcnow() + timedelta(seconds=self.retry_delay(error))
+            self.logger.info(f'Next try to get reward date: {run_date}')
+            self.save_state(next_claim_at=run_date)
+            return run_date
+        self.notifier.send(f'Next reward date: {reward_date}', MsgIcon.BOUNTY)
+        run_date = self.block_clock.local_date(reward_date)
+        self.save_state(next_claim_at=run_date, reward_date=reward_date)
+        return run_date
+
+    def first_run_date(self, reward_date) -> datetime:
+        """Returns the date of the first job for the reward date and saves it."""
+        self.logger.info(f'Next reward date on agent\'s start: {reward_date}')
+        run_date = max(self.block_clock.local_date(reward_date), datetime.utcnow())
+        self.save_state(next_claim_at=run_date, reward_date=reward_date)
+        return run_date
+
+    def schedule_job(self, run_date):
+        self.scheduler.add_job(self.job, 'date', run_date=run_date,
+                               id=self.job_id, replace_existing=True)
 
     def job_listener(self, event):
+        if event.job_id != self.job_id:
+            return
+        with self.tracer.span('job_listener', node_id=self.id):
+            self._job_listener(event)
+        self.tracer.flush()
+
+    def _job_listener(self, event):
         if event.exception:
-            self.logger.info('"Get Bounty" job failed')
-            utc_now = datetime.utcnow()
-            self.scheduler.add_job(self.job,
-                                   'date',
-                                   run_date=utc_now + timedelta(seconds=DELAY_AFTER_ERR))
-            self.logger.debug(self.scheduler.get_jobs())
+            self.schedule_job(self.job_failed(event.exception))
+            self.logger.debug(self.scheduler.get_job(self.job_id))
+        elif isinstance(event.retval, PendingClaim):
+            self.logger.info(f'Bounty claim sent, waiting for receipt of {event.retval.tx_id}')
         else:
-            self.logger.debug('"Get Bounty" job finished successfully)')
             try:
+                with self.tracer.span('reward_date'):
+                    reward_date = self.get_reward_date()
+            except Exception as err:
+                run_date = self.job_finished(error=err)
+            else:
+                run_date = self.job_finished(reward_date)
+            self.schedule_job(run_date)
+            self.logger.info(f'Next job: {self.scheduler.get_job(self.job_id)}')
+
+    def schedule_first_job(self, reward_date=None) -> None:
+        if reward_date is None:
+            reward_date = self.get_reward_date()
+        self.schedule_job(self.first_run_date(reward_date))
+
+    @property
+    def has_saved_schedule(self) -> bool:
+        return self.saved_state is not None and self.saved_state.has_schedule
+
+    def restored_claims(self) -> list:
+        """Claims sent before the restart, their receipts are awaited again."""
+        claims = []
+        for saved_claim in self.saved_state.pending_claims:
+            self.logger.info(f'Waiting for receipt of {saved_claim.tx_id} sent before restart')
+            claims.append(PendingClaim(self.id, saved_claim.tx_id, None, saved_claim.sent_at))
+        return claims
+
+    def restored_run_date(self) -> datetime:
+        """Date of the next job from the saved state if no claims were in flight."""
+        run_date = max(self.saved_state.next_claim_at, datetime.utcnow())
+        self.logger.info(f'Next job from the saved state: {run_date}')
+        return run_date
+
+    def restore_schedule(self) -> bool:
+        """
+        Schedules the job from the saved state and resumes tracking of the claims sent
+        before the restart. Returns False if there is no saved schedule.
+        """
+        if not self.has_saved_schedule:
+            return False
+        reward_date = self.saved_state.reward_date
+        for claim in self.restored_claims():
+            self.receipt_tracker.track(claim, lambda *result: self.on_claim_result(
+                *result, reward_date=reward_date))
+        if not self.saved_state.pending_claims:
+            self.schedule_job(self.restored_run_date())
+        return True
+
+    def reward_date_changed(self, reward_date) -> bool:
+        return self.saved_state is None or reward_date != self.saved_state.reward_date
+
+    def schedule_outdated(self, reward_date, waiting) -> bool:
+        """
+        True if the restored schedule has to be rebuilt for the reward date read from
+        SKALE Manager. A claim in flight, when the job is not waiting, finishes first
+        and reads the reward date itself.
+        """
+        if not waiting or not self.reward_date_changed(reward_date):
+            return False
+        self.logger.info(f'Reward date changed to {reward_date}, rescheduling')
+        return True
+
+    def revalidation_retry_delay(self, err) -> float:
+        """Seconds before the restored schedule is checked again after the error."""
+        delay = job_retry_delay(err, self.failed_revalidations)
+        self.failed_revalidations += 1
+        self.logger.warning(f'Cannot check the restored schedule: {err}. '
+                            f'Will try in {delay:.1f} sec')
+        return delay
+
+    def node_not_found(self, err):
+        """Stops the agent of the node that is not registered in SKALE Manager."""
+        self.notifier.send(str(err), MsgIcon.CRITICAL)
+        self._update_state('delete')
+        self.stop()
+
+    def revalidate(self, reward_date=None):
+        """
+        Checks the schedule restored from the saved state against SKALE Manager,
+        reschedules the job if the reward date has changed meanwhile.
+        """
+        if reward_date is None:
+            try:
+                check_if_node_is_registered(self.skale, self.id)
                 reward_date = self.get_reward_date()
-                self.notifier.send(f'Next reward date: {reward_date}',
-                                   MsgIcon.BOUNTY)
-            except Exception:
-                reward_date = datetime.utcnow() + timedelta(seconds=DELAY_AFTER_ERR)
-                self.logger.info(f'Next try to get reward date: {reward_date}')
-            self.scheduler.add_job(self.job, 'date', run_date=reward_date)
-            self.scheduler.print_jobs()
+            except NodeNotFoundException as err:
+                self.node_not_found(err)
+                return
+            except Exception as err:
+                delay = self.revalidation_retry_delay(err)
+                self.scheduler.add_job(self.revalidate, 'date',
+                                       run_date=datetime.utcnow() + timedelta(seconds=delay),
+                                       id=f'{REVALIDATE_JOB_ID_PREFIX}{self.id}',
+                                       replace_existing=True)
+                return
+            self.failed_revalidations = 0
+        job = self.scheduler.get_job(self.job_id)
+        if self.schedule_outdated(reward_date, waiting=job is not None and job.func == self.job):
+            self.schedule_first_job(reward_date)
 
     def run(self) -> None:
         """Starts agent."""
-        reward_date = self.get_reward_date()
-        self.logger.info(f'Next reward date on agent\'s start: {reward_date}')
-        utc_now = datetime.utcnow()
-        if utc_now > reward_date:
-            reward_date = utc_now
-        self.scheduler.add_job(self.job, 'date', run_date=reward_date)
+        self.balance_oracle.start()
+        if self.restore_schedule():
+            self.scheduler.add_job(self.revalidate, id=f'{REVALIDATE_JOB_ID_PREFIX}{self.id}')
+        else:
+            self.schedule_first_job()
         self.scheduler.print_jobs()
         self.scheduler.add_listener(self.job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
         self.scheduler.start()
 
+    @property
+    def is_stopped(self):
+        return self.stopped.is_set()
+
     def stop(self):
-        self.is_stopped = True
-        self.scheduler.pause()
+        if self.owns_scheduler:
+            if self.scheduler.running:
+                self.scheduler.pause()
+            if self.ledger is not None:
+                self.ledger.flush()
+            self.tracer.flush()
+            flush_logs()
+        elif self.scheduler is not None and self.scheduler.get_job(self.job_id):
+            self.scheduler.remove_job(self.job_id)
+        self.stopped.set()
 
+    def shutdown(self):
+        """Stops the agent and its scheduler threads, the agent cannot be started again."""
+        self.stop()
+        if self.owns_scheduler:
+            self.receipt_tracker.stop()
+            self.balance_oracle.stop()
+            if self.scheduler.running:
+                self.scheduler.shutdown(wait=False)
 
-if __name__ == '__main__':
-    init_logger()
-    while True:
+
+class BaseFleet:
+    """
+    Serves many node IDs from one process: a single Skale connection, Redis pool,
+    block clock, claim submitter, receipt tracker, ledger and log file are shared,
+    and each node keeps only a BountyAgent record with its own reward timing and
+    notifier header. Node info and reward dates of all nodes are read with aggregated calls.
+    Subclasses run the jobs of the agents.
+    """
+    scheduler = None  # shared by the agents if the fleet runs their jobs on APScheduler
+
+    def __init__(self, skale, node_ids):
+        self.agent_name = get_agent_name(BountyAgent.__name__)
+        self.logger = logging.getLogger(self.agent_name)
+        add_file_handler(self.logger, self.agent_name, None)
+        self.logger.info(f'Initialization of {self.agent_name} fleet for {len(node_ids)} nodes')
+        self.skale = skale
+        self.aggregator = CallAggregator(self.skale.web3)
+        self.state_store = get_state_store()
+        self.saved_states = self.load_states(node_ids)
+        # nodes with saved info are checked against SKALE Manager by revalidate after the start
+        self.nodes_info = {node_id: {'name': state.node_name, 'ip': state.node_ip}
+                           for node_id, state in self.saved_states.items()
+                           if state.has_node_info}
+        new_ids = [node_id for node_id in node_ids if node_id not in self.nodes_info]
+        if new_ids:
+            check_if_nodes_are_registered(self.skale, new_ids)
+            new_nodes_info = get_nodes_info(self.skale, new_ids, self.aggregator)
+            self.nodes_info.update(new_nodes_info)
+            self.save_states({node_id: {'node_name': info['name'], 'node_ip': info['ip']}
+                              for node_id, info in new_nodes_info.items()})
+        self.block_clock = BlockClock()
+        self.notifier = Notifier(self.agent_name, f'fleet of {len(node_ids)} nodes', '-', '-')
+        self.balance_oracle = BalanceOracle(skale, self.notifier, claims_per_epoch=len(node_ids))
+        self.submitter = ClaimSubmitter(skale, self.balance_oracle)
+        self.receipt_tracker = ReceiptTracker(skale, nonce_manager=self.submitter.nonce_manager)
+        self.bounty_decoder = create_bounty_decoder(skale)
+        self.ledger = get_ledger()
+        self.agents = {node_id: BountyAgent(skale, node_id, fleet=self) for node_id in node_ids}
+        self.failed_revalidations = 0  # in a row
+        self.stopped = threading.Event()
+        self.logger.info(f'Node IDs of the fleet: {sorted(node_ids)}')
+        self.notifier.send(f'{self.agent_name} started successfully with {len(node_ids)} nodes',
+                           icon=MsgIcon.INFO)
+
+    def load_states(self, node_ids) -> dict:
+        if self.state_store is None:
+            return {}
+        try:
+            return self.state_store.load(node_ids)
+        except Exception as err:
+            self.logger.warning(f'Cannot load saved state: {err}')
+            return {}
+
+    def save_states(self, fields_by_node):
+        if self.state_store is None:
+            return
         try:
-            skale = init_skale()
-            bounty_agent = BountyAgent(skale)
-            bounty_agent.run()
-            while not bounty_agent.is_stopped:
-                time.sleep(1)
+            self.state_store.save_many(fields_by_node)
+        except Exception as err:
+            self.logger.warning(f'Cannot save state: {err}')
+
+    def check_restored_nodes(self, node_ids) -> dict:
+        """
+        Stops agents of the restored nodes that are no longer registered, returns
+        reward dates of the rest. Nodes of stopped agents are skipped.
+        """
+        node_ids = [node_id for node_id in node_ids if not self.agents[node_id].is_stopped]
+        nodes_number = call_retry(self.skale.nodes.get_nodes_number)
+        for node_id in node_ids:
+            if not 0 <= node_id < nodes_number:
+                self.agents[node_id].node_not_found(
+                    NodeNotFoundException(f'There is no Node with ID = {node_id} in SKALE manager'))
+        node_ids = [node_id for node_id in node_ids if 0 <= node_id < nodes_number]
+        reward_dates = get_reward_dates(self.skale, node_ids, self.aggregator)
+        self.failed_revalidations = 0
+        return {node_id: datetime.utcfromtimestamp(reward_dates[node_id]) for node_id in node_ids}
+
+    def revalidation_retry_delay(self, err) -> float:
+        """Seconds before the restored nodes are checked again after the error."""
+        delay = job_retry_delay(err, self.failed_revalidations)
+        self.failed_revalidations += 1
+        self.logger.warning(f'Cannot check the restored schedules: {err}. '
+                            f'Will try in {delay:.1f} sec')
+        return delay
+
+    @property
+    def is_stopped(self):
+        return self.stopped.is_set()
+
+    def stop(self):
+        if self.ledger is not None:
+            self.ledger.flush()
+        get_tracer().flush()
+        flush_logs()
+        self.stopped.set()
+
+    def shutdown(self):
+        """Stops the fleet and its threads, the fleet cannot be started again."""
+        self.stop()
+        self.receipt_tracker.stop()
+        self.balance_oracle.stop()
+
+
+class BountyAgentFleet(BaseFleet):
+    """Runs the agents of the fleet as jobs of one APScheduler scheduler."""
+
+    def __init__(self, skale, node_ids):
+        self.scheduler = create_scheduler()
+        track_scheduler(self.scheduler)
+        super().__init__(skale, node_ids)
+
+    def revalidate(self, node_ids):
+        """Checks the schedules restored from the saved state, see BountyAgent.revalidate."""
+        try:
+            reward_dates = self.check_restored_nodes(node_ids)
+        except Exception as err:
+            delay = self.revalidation_retry_delay(err)
+            self.scheduler.add_job(self.revalidate, 'date',
+                                   run_date=datetime.utcnow() + timedelta(seconds=delay),
+                                   args=[node_ids], id=f'{REVALIDATE_JOB_ID_PREFIX}fleet',
+                                   replace_existing=True)
+            return
+        for node_id, reward_date in reward_dates.items():
+            self.agents[node_id].revalidate(reward_date)
+
+    def job_listener(self, event):
+        if not event.job_id.startswith(BOUNTY_JOB_ID_PREFIX):
+            return
+        node_id = int(event.job_id[len(BOUNTY_JOB_ID_PREFIX):])
+        agent = self.agents.get(node_id)
+        if agent is not None:
+            agent.job_listener(event)
+
+    def run(self) -> None:
+        """Starts all agents of the fleet."""
+        self.balance_oracle.start()
+        restored_ids = {node_id for node_id, agent in self.agents.items()
+                        if agent.restore_schedule()}
+        new_ids = [node_id for node_id in self.agents if node_id not in restored_ids]
+        if new_ids:
+            reward_dates = get_reward_dates(self.skale, new_ids, self.aggregator)
+            for node_id in new_ids:
+                self.agents[node_id].schedule_first_job(
+                    datetime.utcfromtimestamp(reward_dates[node_id]))
+        if restored_ids:
+            self.logger.info(f'Schedule of {len(restored_ids)} nodes is restored from disk')
+            self.scheduler.add_job(self.revalidate, args=[sorted(restored_ids)],
+                                   id=f'{REVALIDATE_JOB_ID_PREFIX}fleet')
+        self.scheduler.add_listener(self.job_listener, EVENT_JOB_EXECUTED | EVENT_JOB_ERROR)
+        self.scheduler.start()
+
+    def stop(self):
+        if self.scheduler.running:
+            self.scheduler.pause()
+        super().stop()
+
+    def shutdown(self):
+        """Stops the fleet and its scheduler threads, the fleet cannot be started again."""
+        super().shutdown()
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+
+
+class AsyncBountyAgent(BaseFleet):
+    """
+    Runs the agents of a fleet, or a single node from the node config, as coroutines
+    on one asyncio event loop thread. Waits for reward dates and retries are asyncio
+    timers and reads are JSON-RPC batches posted with aiohttp, so idle nodes hold no
+    threads. Signing and sending stay on a small thread pool, receipts are polled by
+    the shared receipt tracker.
+    """
+
+    def __init__(self, skale, node_ids=None):
+        if node_ids is None:
+            node_ids = [get_id_from_config(NODE_CONFIG_FILEPATH)]
+        super().__init__(skale, node_ids)
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            SCHEDULER_MAX_WORKERS, thread_name_prefix='bounty-sender')
+        self.loop = asyncio.new_event_loop()
+        self.session = None
+        self._stop_event = None
+        self._thread = None
+        self._tasks = {}  # claim loops by node ID
+        self._sleeping = set()  # node IDs waiting for the next job
+
+    def run(self) -> None:
+        """Starts all agents, the event loop runs in its own thread until stop."""
+        self.balance_oracle.start()
+        restored = [node_id for node_id, agent in self.agents.items()
+                    if agent.has_saved_schedule]
+        new_ids = [node_id for node_id in self.agents if node_id not in restored]
+        if restored:
+            self.logger.info(f'Schedule of {len(restored)} nodes is restored from disk')
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop,
+                                        args=(new_ids, restored, started),
+                                        name='async-bounty-agent', daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def _run_loop(self, new_ids, restored, started):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main(new_ids, restored, started))
+        finally:
+            self.loop.close()
+
+    async def _main(self, new_ids, restored, started):
+        self._stop_event = asyncio.Event()
+        started.set()
+        timeout = aiohttp.ClientTimeout(total=ASYNC_RPC_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as self.session:
+            for node_id in restored:
+                agent = self.agents[node_id]
+                if agent.saved_state.pending_claims:
+                    self.start_claim_loop(agent, None, self.resume_claims(agent))
+                else:
+                    self.start_claim_loop(agent, agent.restored_run_date())
+            tasks = []
+            if new_ids:
+                tasks.append(asyncio.ensure_future(self.start_new_nodes(new_ids)))
+            if restored:
+                tasks.append(asyncio.ensure_future(self.revalidate_loops(sorted(restored))))
+            await self._stop_event.wait()
+            tasks.extend(self._tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def first_run_dates(self, node_ids) -> dict:
+        """Reads reward dates of the nodes without a saved schedule, saves their run dates."""
+        reward_dates = get_reward_dates(self.skale, node_ids, self.aggregator)
+        reward_dates = {node_id: datetime.utcfromtimestamp(reward_date)
+                        for node_id, reward_date in reward_dates.items()}
+        # timers are set in local time, so the offset from chain time is needed first
+        self.block_clock.observe(call_retry(self.skale.web3.eth.get_block, 'latest'))
+        run_dates = {node_id: max(self.block_clock.local_date(reward_date), datetime.utcnow())
+                     for node_id, reward_date in reward_dates.items()}
+        self.save_states({node_id: {'next_claim_at': run_dates[node_id],
+                                    'reward_date': reward_dates[node_id]}
+                          for node_id in node_ids})
+        return run_dates
+
+    async def start_new_nodes(self, node_ids):
+        """Starts claim loops of the nodes without a saved schedule once it is read."""
+        attempt = 0
+        while True:
+            try:
+                run_dates = await self.loop.run_in_executor(
+                    self.executor, self.first_run_dates, node_ids)
+                break
+            except Exception as err:
+                delay = job_retry_delay(err, attempt)
+                attempt += 1
+                self.logger.warning(f'Cannot read reward dates of new nodes: {err}. '
+                                    f'Will try in {delay:.1f} sec')
+                await asyncio.sleep(delay)
+        for node_id, run_date in run_dates.items():
+            self.start_claim_loop(self.agents[node_id], run_date)
+
+    def start_claim_loop(self, agent, run_date, resume=None):
+        self._tasks[agent.id] = asyncio.ensure_future(self.claim_loop(agent, run_date, resume))
+
+    async def claim_loop(self, agent, run_date, resume=None):
+        """
+        Runs the job of the agent at run_date and reschedules it. The resume coroutine,
+        if given, runs at once instead of the first job.
+        """
+        if resume is None:
+            agent.logger.info(f'Next job: {run_date}')
+        while True:
+            if resume is None:
+                self._sleeping.add(agent.id)
+                try:
+                    await asyncio.sleep(max((run_date - datetime.utcnow()).total_seconds(), 0))
+                finally:
+                    self._sleeping.discard(agent.id)
+                step = self.job(agent)
+            else:
+                step, resume = resume, None
+            try:
+                await step
+            except asyncio.CancelledError:
+                raise
+            except Exception as err:
+                run_date = await self.loop.run_in_executor(self.executor, agent.job_failed, err)
+                continue
+            run_date = await self.next_run_date(agent)
+            agent.logger.info(f'Next job: {run_date}')
+
+    async def revalidate_loops(self, node_ids):
+        """Checks the schedules restored from the saved state, see BountyAgent.revalidate."""
+        while True:
+            try:
+                reward_dates = await self.loop.run_in_executor(
+                    self.executor, self.check_restored_nodes, node_ids)
+                break
+            except Exception as err:
+                await asyncio.sleep(self.revalidation_retry_delay(err))
+        for node_id in node_ids:
+            agent = self.agents[node_id]
+            if agent.is_stopped:
+                self._tasks[node_id].cancel()
+                continue
+            reward_date = reward_dates[node_id]
+            if agent.schedule_outdated(reward_date, waiting=node_id in self._sleeping):
+                self._tasks[node_id].cancel()
+                run_date = await self.loop.run_in_executor(
+                    self.executor, agent.first_run_date, reward_date)
+                self.start_claim_loop(agent, run_date)
+
+    def claim_result_future(self, agent):
+        """Returns the future and the receipt tracker callback that resolves it on the loop."""
+        claim_result = self.loop.create_future()
+
+        def on_result(*result):
+            try:
+                self.loop.call_soon_threadsafe(set_future_result, claim_result, result)
+            except RuntimeError:  # the loop is closed
+                agent.logger.info(f'Agent is stopped, result of {result[0].tx_id} '
+                                  f'is not processed')
+        return claim_result, on_result
+
+    async def finish_claim(self, agent, claim_result, reward_date):
+        claim, tx_res, error = await claim_result
+        RPC_LATENCY.observe(time.time() - claim.sent_at, 'get_bounty_receipt')
+        # the state store, receipt decoding and the ledger block, so they stay off the loop
+        return await self.loop.run_in_executor(self.executor, agent.finish_claim,
+                                               claim, tx_res, error, reward_date)
+
+    async def read(self, agent, batch, name):
+        """Posts the read batch of the agent, see BountyAgent.get_claim_state."""
+        try:
+            with RPC_LATENCY.time(name), agent.tracer.span(name):
+                return await call_retry.call_async(batch.execute_async, self.session)
+        except Exception as err:
+            agent.read_failed(err)
+            raise
+
+    async def job(self, agent):
+        with agent.tracer.span('job', node_id=agent.id):
+            agent.logger.debug('"Get Bounty" job started')
+            results = await self.read(agent, agent.claim_state_batch(), 'claim_state')
+            reward_date, gas_estimate = agent.check_claim_state(results)
+            claim_result, on_result = self.claim_result_future(agent)
+            claim = await self.loop.run_in_executor(self.executor, agent.send_claim,
+                                                    reward_date, gas_estimate, on_result)
+        agent.logger.info(f'Bounty claim sent, waiting for receipt of {claim.tx_id}')
+        return await self.finish_claim(agent, claim_result, reward_date)
+
+    async def resume_claims(self, agent):
+        """Waits for receipts of the claims sent before the restart."""
+        finished = []
+        for claim in agent.restored_claims():
+            claim_result, on_result = self.claim_result_future(agent)
+            agent.receipt_tracker.track(claim, on_result)
+            finished.append(self.finish_claim(agent, claim_result, agent.saved_state.reward_date))
+        results = await asyncio.gather(*finished, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+
+    async def next_run_date(self, agent):
+        """Reads the next reward date after the claim, see BountyAgent.job_finished."""
+        batch = RpcBatch(self.skale.web3).add_call(
+            self.skale.nodes.contract.functions.getNodeNextRewardDate(agent.id))
+        try:
+            reward_date, = await self.read(agent, batch, 'reward_date')
+        except Exception as err:
+            job_finished = functools.partial(agent.job_finished, error=err)
+        else:
+            job_finished = functools.partial(agent.job_finished,
+                                             datetime.utcfromtimestamp(reward_date))
+        return await self.loop.run_in_executor(self.executor, job_finished)
+
+    def stop(self):
+        if self._stop_event is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:  # the loop is closed
                 pass
-        except Exception as e:
-            logger.exception('Bounty agent failed with %s', e)
+        for agent in self.agents.values():
+            agent.stopped.set()
+        super().stop()
+
+    def shutdown(self):
+        """Stops the event loop and sender threads, the agent cannot be started again."""
+        self.stop()
+        if self._thread is not None:
+            self._thread.join()
+        else:
+            self.loop.close()
+        # reads started before the stop finish here, not at interpreter exit
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        super().shutdown()
+
+
+def set_future_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def create_agent(skale):
+    if ASYNC_AGENT:
+        return AsyncBountyAgent(skale, NODE_IDS or None)
+    if NODE_IDS:
+        return BountyAgentFleet(skale, NODE_IDS)
+    return BountyAgent(skale)
+
+
+if __name__ == '__main__':
+    init_logger()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT, METRICS_HOST)
+    supervisor = Supervisor(init_skale, create_agent)
+    signal.signal(signal.SIGTERM, lambda *_: supervisor.stop())
+    supervisor.run()
@@ -5,6 +5,17 @@ ENV = os.environ.get('ENV')
 LONG_LINE = '-' * 100
 
 NOTIFIER_URL = 'http://localhost:3007/send-tg-notification'
+NOTIFIER_QUEUE_SIZE = 1000
+NOTIFIER_BATCH_SIZE = 20
+NOTIFIER_TIMEOUT = (3, 10)  # connect and read timeouts in seconds
+NOTIFIER_FLUSH_TIMEOUT = 10  # in seconds
+NOTIFIER_DEDUP_INTERVAL = 60 * 60  # in seconds, repeats of a message only go to digests
+NOTIFIER_DIGEST_INTERVAL = 15 * 60  # in seconds
+NOTIFIER_DIGEST_LINES = 20  # the most frequent suppressed messages listed in a digest
+NOTIFIER_NODE_RATE = 1 / 60  # messages per second per node
+NOTIFIER_NODE_BURST = 5
+NOTIFIER_GLOBAL_RATE = 1 / 6  # messages per second for the whole process
+NOTIFIER_GLOBAL_BURST = 30
 SKALE_VOLUME_PATH = '/skale_vol'
 NODE_DATA_PATH = '/skale_node_data'
 
@@ -12,6 +23,7 @@ CONTRACTS_INFO_FOLDER_NAME = 'contracts_info'
 MANAGER_CONTRACTS_INFO_NAME = 'manager.json'
 CONTRACTS_INFO_FOLDER = os.path.join(SKALE_VOLUME_PATH,
                                      CONTRACTS_INFO_FOLDER_NAME)
+ABI_CACHE_FOLDER = os.path.join(NODE_DATA_PATH, 'bounty-agent-cache')
 NODE_CONFIG_FILENAME = 'node_config.json'
 NODE_CONFIG_FILEPATH = os.path.join(NODE_DATA_PATH, NODE_CONFIG_FILENAME)
 
@@ -24,8 +36,64 @@ MIN_ETH_AMOUNT_IN_SKL = 0.01
 MIN_ETH_AMOUNT = int(MIN_ETH_AMOUNT_IN_SKL * (10 ** 18))
 RETRY_INTERVAL = 60  # in seconds
 CONFIG_CHECK_PERIOD = 30  # in seconds
+CONFIG_POLL_INTERVAL = 1  # in seconds, if inotify is not available
 MISFIRE_GRACE_TIME = 365 * 24 * 60 * 60  # in seconds
 DELAY_AFTER_ERR = 60  # in seconds
+CALL_RETRY_ATTEMPTS = 10
+CALL_RETRY_BASE = 0.5  # in seconds, doubled with every attempt
+CALL_RETRY_MAX = 10  # in seconds
+JOB_RETRY_BASE = 10  # in seconds, doubled with every failed job of a node
+JOB_RETRY_MAX = 10 * 60  # in seconds
+RETRY_BUDGET_RATIO = 0.2  # retries per first attempt
+RETRY_BUDGET_MIN_RATE = 1  # retries per second allowed regardless of the ratio
+RETRY_BUDGET_BURST = 50
+MIN_POLL_INTERVAL = 1  # in seconds
+DEFAULT_BLOCK_INTERVAL = 12  # in seconds
+BLOCK_HISTORY_SIZE = 16
+
+NODE_IDS = [int(node_id) for node_id in os.getenv('NODE_IDS', '').split(',') if node_id.strip()]
+SCHEDULER_MAX_WORKERS = int(os.getenv('SCHEDULER_MAX_WORKERS', 10))
+BOUNTY_JOB_ID_PREFIX = 'get-bounty-'
+REVALIDATE_JOB_ID_PREFIX = 'revalidate-'
+ASYNC_AGENT = os.getenv('ASYNC_AGENT', 'False') == 'True'  # run agents on an asyncio loop
+ASYNC_RPC_TIMEOUT = 30  # in seconds
+
+METRICS_PORT = int(os.getenv('METRICS_PORT') or 0)  # metrics endpoint is disabled if 0
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+TRACE_FILEPATH = os.getenv('TRACE_FILEPATH')  # tracing is disabled if not set
+TRACE_PROFILE_JOBS = int(os.getenv('TRACE_PROFILE_JOBS', 0))  # number of jobs to profile
+TRACE_SAMPLE_INTERVAL = 0.005  # in seconds
+TRACE_BUFFER_SIZE = 1000
+
+BALANCE_CHECK_INTERVAL = 5 * 60  # in seconds
+BOUNTY_GAS_ESTIMATE = 1000000  # used until the first getBounty dry run
+
+BOUNTY_PREFLIGHT = os.getenv('BOUNTY_PREFLIGHT', 'True') == 'True'
+PREFLIGHT_RETRY_DELAY = 60 * 60  # in seconds, after reverts that need an operator
+
+RECEIPT_POLL_INTERVAL = 2  # in seconds
+RECEIPT_TIMEOUT = 3 * 60 * 60  # in seconds
+
+RPC_PROBE_INTERVAL = 10  # in seconds
+RPC_LATENCY_SMOOTHING = 0.2  # weight of the latest measurement
+RPC_MAX_BLOCK_LAG = 5  # endpoints further behind the chain head are not used
+RPC_BACKOFF_BASE = 1  # in seconds, a failed endpoint is skipped for this long
+RPC_BACKOFF_MAX = 60  # in seconds
+RPC_HEDGING = os.getenv('RPC_HEDGING', 'False') == 'True'  # hedge slow reads
+RPC_HEDGE_PERCENTILE = 0.95  # of recent read latencies, reads slower than it are hedged
+RPC_HEDGE_MIN_DELAY = 0.05  # in seconds
+RPC_HEDGE_MIN_SAMPLES = 20  # reads are not hedged until this many latencies are measured
+RPC_HEDGE_WINDOW = 500  # number of recent latencies
+RPC_HEDGE_MAX_RATIO = 0.05  # at most this share of reads is sent twice
+RPC_HEDGE_BURST = 10
+RPC_HEDGE_WORKERS = 16
+
+RESTART_BASE_DELAY = 1  # in seconds
+RESTART_MAX_DELAY = 300  # in seconds
+
+MULTICALL_ADDRESS = os.getenv('MULTICALL_ADDRESS')
+AGGREGATED_CALLS_CHUNK_SIZE = 200
 
 SGX_SERVER_URL = os.getenv('SGX_SERVER_URL')
 SGX_CERTIFICATES_FOLDER_NAME = os.getenv('SGX_CERTIFICATES_DIR_NAME')
@@ -1,7 +1,17 @@
 import os
 
+from configs import NODE_DATA_PATH
+
 DB_USER = os.environ.get("DB_USER")
 DB_PASSWORD = os.environ.get("DB_PASSWORD")
-DB_PORT = int(os.environ.get("DB_PORT"))
+DB_PORT = int(os.environ.get("DB_PORT") or 3306)
 DB_NAME = 'db_skale'
 DB_HOST = '127.0.0.1'
+
+LEDGER_DB_ENGINE = os.environ.get('LEDGER_DB_ENGINE', 'sqlite')  # sqlite or mysql
+LEDGER_DB_PATH = os.path.join(NODE_DATA_PATH, 'bounty-ledger.db')
+LEDGER_QUEUE_SIZE = 10000
+LEDGER_BATCH_SIZE = 100
+LEDGER_FLUSH_TIMEOUT = 10  # in seconds
+
+AGENT_STATE_DB_PATH = os.path.join(NODE_DATA_PATH, 'bounty-agent-state.db')
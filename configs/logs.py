@@ -17,3 +17,7 @@ LOG_FILE_SIZE_BYTES = LOG_FILE_SIZE_MB * 1000000
 LOG_BACKUP_COUNT = 3
 
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+LOG_QUEUE_ENABLED = os.getenv('LOG_QUEUE_ENABLED', 'False') == 'True'
+LOG_QUEUE_SIZE = 10000
+LOG_FLUSH_TIMEOUT = 10  # in seconds
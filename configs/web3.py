@@ -3,4 +3,7 @@ import os
 from configs import CONTRACTS_INFO_FOLDER, MANAGER_CONTRACTS_INFO_NAME
 
 ENDPOINT = os.environ['ENDPOINT']
+# requests are balanced between ENDPOINT and these comma-separated endpoints
+EXTRA_ENDPOINTS = [url.strip() for url in os.getenv('EXTRA_ENDPOINTS', '').split(',')
+                   if url.strip()]
 ABI_FILEPATH = os.path.join(CONTRACTS_INFO_FOLDER, MANAGER_CONTRACTS_INFO_NAME)
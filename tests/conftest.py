@@ -1,14 +1,25 @@
 """ SKALE config test """
 
+import json
+import os
+from types import SimpleNamespace
+
 import pytest
+from eth_account import Account
 from skale import Skale
 from skale.utils.web3_utils import init_web3
 from skale.wallets import Web3Wallet
+from web3 import HTTPProvider, Web3
 
 from tests.constants import (ENDPOINT, ETH_PRIVATE_KEY, N_TEST_NODES,
                              TEST_ABI_FILEPATH)
+from tests.fake_rpc import (FLEET_SIZE, MANAGER_ABI, MANAGER_ADDRESS, NODES_ABI, START_NONCE,
+                            FakeRpcServer, FakeSkaleChain, make_manager_abi)
 from tests.prepare_validator import (create_dirs, create_set_of_nodes,
                                      get_active_ids)
+import tools.agent_state
+import tools.logger
+from tools.agent_skale import AgentSkale
 
 
 @pytest.fixture(scope="session")
@@ -24,3 +35,66 @@ def skale():
     cur_node_id = max(ids) + 1 if len(ids) else 0
     create_set_of_nodes(skale, cur_node_id, N_TEST_NODES)
     return skale
+
+
+@pytest.fixture(autouse=True)
+def state_store(tmp_path_factory, monkeypatch):
+    """Every test starts without a saved agent state"""
+    store = tools.agent_state.StateStore(
+        str(tmp_path_factory.mktemp('agent-state') / 'agent-state.db'))
+    monkeypatch.setattr(tools.agent_state, '_state_store', store)
+    return store
+
+
+@pytest.fixture
+def rpc_server():
+    """In-process JSON-RPC node for tests that do not need Ganache"""
+    server = FakeRpcServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fake_skale(rpc_server):
+    """Skale stand-in with a wallet and the SkaleManager contract on rpc_server"""
+    web3 = Web3(HTTPProvider(rpc_server.url))
+    wallet = Web3Wallet(Account.create().key.hex(), web3)
+    rpc_server.node.nonces[wallet.address] = START_NONCE
+    manager = SimpleNamespace(name='manager',
+                              contract=web3.eth.contract(address=MANAGER_ADDRESS,
+                                                         abi=MANAGER_ABI))
+    return SimpleNamespace(web3=web3, wallet=wallet, manager=manager, gas_price=10 ** 9)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def log_folder(tmp_path_factory):
+    """Agents started by tests log to a temporary folder"""
+    log_folder = tools.logger.LOG_FOLDER
+    tools.logger.LOG_FOLDER = str(tmp_path_factory.mktemp('logs'))
+    yield
+    tools.logger.LOG_FOLDER = log_folder
+
+
+@pytest.fixture
+def chain_server():
+    """In-process chain with FLEET_SIZE nodes whose reward dates come in a few seconds"""
+    server = FakeRpcServer(FakeSkaleChain(FLEET_SIZE)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def chain_skale(chain_server, tmp_path):
+    """Skale of the agents with a new wallet on chain_server"""
+    abi = make_manager_abi(['nodes', 'manager'], functions_number=0)
+    abi['nodes_abi'], abi['skale_manager_abi'] = NODES_ABI, MANAGER_ABI
+    abi_filepath = os.path.join(tmp_path, 'manager.json')
+    with open(abi_filepath, 'w') as abi_file:
+        json.dump(abi, abi_file)
+
+    class ChainSkale(AgentSkale):
+        abi_cache_folder = os.path.join(tmp_path, 'cache')
+
+    skale = ChainSkale(chain_server.url, abi_filepath)
+    skale.wallet = Web3Wallet(Account.create().key.hex(), skale.web3)
+    return skale
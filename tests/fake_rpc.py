@@ -0,0 +1,425 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""In-process JSON-RPC node stand-in for tests that do not need Ganache."""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_account._utils.typed_transactions import TypedTransaction
+from eth_utils import function_signature_to_4byte_selector, keccak, to_checksum_address
+from hexbytes import HexBytes
+
+AGGREGATE3_SELECTOR = '0x' + function_signature_to_4byte_selector(
+    'aggregate3((address,bool,bytes)[])').hex()
+
+
+ERROR_SELECTOR = function_signature_to_4byte_selector('Error(string)')
+CONTRACTS_SELECTOR = '0x' + function_signature_to_4byte_selector('contracts(bytes32)').hex()
+CONTRACT_MANAGER_ABI = [{
+    'name': 'contracts',
+    'type': 'function',
+    'stateMutability': 'view',
+    'inputs': [{'name': '', 'type': 'bytes32'}],
+    'outputs': [{'name': '', 'type': 'address'}]
+}]
+
+
+NODES_ABI = [
+    {
+        'name': 'getNodeNextRewardDate',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': 'nodeIndex', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'uint256'}]
+    },
+    {
+        'name': 'getNumberOfNodes',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [],
+        'outputs': [{'name': '', 'type': 'uint256'}]
+    },
+    {
+        'name': 'nodes',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': '', 'type': 'uint256'}],
+        'outputs': [{'name': 'name', 'type': 'string'}, {'name': 'ip', 'type': 'bytes4'},
+                    {'name': 'publicIP', 'type': 'bytes4'}, {'name': 'port', 'type': 'uint16'},
+                    {'name': 'startBlock', 'type': 'uint256'},
+                    {'name': 'lastRewardDate', 'type': 'uint256'},
+                    {'name': 'finishTime', 'type': 'uint256'},
+                    {'name': 'status', 'type': 'uint8'},
+                    {'name': 'validatorId', 'type': 'uint256'}]
+    }
+]
+BOUNTY_RECEIVED_INPUTS = [
+    ('nodeIndex', 'uint256', True), ('owner', 'address', False),
+    ('averageDowntime', 'uint256', False), ('averageLatency', 'uint256', False),
+    ('bounty', 'uint256', False), ('previousBlockEvent', 'uint256', False),
+    ('time', 'uint256', False), ('gasSpend', 'uint256', False)
+]
+MANAGER_ABI = [
+    {
+        'name': 'getBounty',
+        'type': 'function',
+        'stateMutability': 'nonpayable',
+        'inputs': [{'name': 'nodeIndex', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'bool'}]
+    },
+    {
+        'name': 'BountyReceived',
+        'type': 'event',
+        'anonymous': False,
+        'inputs': [{'name': name, 'type': abi_type, 'indexed': indexed}
+                   for name, abi_type, indexed in BOUNTY_RECEIVED_INPUTS]
+    }
+]
+NODES_ADDRESS = to_checksum_address('0x' + '11' * 20)
+MANAGER_ADDRESS = to_checksum_address('0x' + 'dd' * 20)
+START_NONCE = 5  # of wallets on the node served by the rpc_server fixture
+GAS_ESTIMATE = 200000  # answer of eth_estimateGas for calls that do not revert
+
+
+class CallReverted(Exception):
+    def __init__(self, reason=None):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def revert_error(err):
+    """Error response of a reverted call, with Error(string) data if there is a reason."""
+    if err.reason is None:
+        return {'code': -32000, 'message': 'execution reverted'}
+    return {'code': 3, 'message': f'execution reverted: {err.reason}',
+            'data': '0x' + (ERROR_SELECTOR + encode(['string'], [err.reason])).hex()}
+
+
+def fake_contract_address(contract_hash: bytes) -> str:
+    return '0x' + contract_hash[:20].hex()
+
+
+def make_manager_abi(contract_names, functions_number=400):
+    """
+    Returns an ABI bundle shaped like SKALE Manager's manager.json with dummy
+    contracts. Register it on a node with FakeNode.serve_contract_manager.
+    """
+    dummy_abi = [{
+        'name': f'function{i}',
+        'type': 'function',
+        'stateMutability': 'view',
+        'inputs': [{'name': 'value', 'type': 'uint256'}],
+        'outputs': [{'name': '', 'type': 'uint256'}]
+    } for i in range(functions_number)]
+    abi = {
+        'contract_manager_address': '0x' + 'cc' * 20,
+        'contract_manager_abi': CONTRACT_MANAGER_ABI
+    }
+    for name in contract_names:
+        if name == 'contract_manager':
+            continue
+        key = f'skale_{name}' if name in ('manager', 'token') else name
+        abi[f'{key}_address'] = '0x' + 'dd' * 20
+        abi[f'{key}_abi'] = dummy_abi
+    return abi
+
+
+class FakeRpcHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.http_requests += 1
+        delay = self.server.node.delay()
+        if delay:
+            time.sleep(delay)
+        if isinstance(body, list):
+            self.server.batches += 1
+            response = [self.server.node.handle(request) for request in body]
+        else:
+            response = self.server.node.handle(body)
+        data = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeNode:
+    """
+    Answers eth_call with values registered per selector, also through a Multicall3
+    aggregate3 call, and serves a simple chain of blocks. Counts requests per method.
+    Raw transactions are passed to transaction_handler, which returns the receipt logs
+    or raises CallReverted; the receipt is available at once.
+    """
+
+    def __init__(self, block_number=100, block_timestamp=None, block_interval=5,
+                 latency=0, jitter=0, live=False):
+        self.latency = latency  # seconds added to every HTTP request
+        self.jitter = jitter  # up to this many seconds are added on top of the latency
+        self.live = live  # blocks are produced following the local clock
+        self.block_number = block_number
+        self.block_timestamp = int(time.time()) if block_timestamp is None else block_timestamp
+        self.block_interval = block_interval
+        self.call_results = {}  # selector -> (output types, values)
+        self.transaction_handler = None
+        self.receipts = {}
+        self.nonces = {}
+        self.balances = {}  # address -> wei, other accounts have default_balance
+        self.default_balance = 10 ** 20
+        self.gas_price = 10 ** 9
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def delay(self):
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+
+    def set_call_result(self, selector, output_types, values):
+        """Values can be a function of the call arguments (bytes) returning the values."""
+        self.call_results[selector] = (output_types, values)
+
+    def eth_call(self, data: bytes) -> bytes:
+        selector = '0x' + data[:4].hex()
+        if selector == AGGREGATE3_SELECTOR:
+            calls = decode(['(address,bool,bytes)[]'], data[4:])[0]
+            return encode(['(bool,bytes)[]'],
+                          [[(True, self.eth_call(call_data)) for _, _, call_data in calls]])
+        if selector not in self.call_results:
+            raise CallReverted()
+        output_types, values = self.call_results[selector]
+        if callable(values):
+            values = values(data[4:])
+        return encode(output_types, values)
+
+    def serve_contract_manager(self):
+        """Answers ContractManager.contracts(hash) with an address derived from the hash."""
+        self.set_call_result(CONTRACTS_SELECTOR, ['address'],
+                             lambda args: [fake_contract_address(args[:32])])
+
+    def mine(self, blocks=1):
+        self.block_number += blocks
+        self.block_timestamp += blocks * self.block_interval
+
+    def follow_clock(self):
+        blocks = (int(time.time()) - self.block_timestamp) // self.block_interval
+        if blocks > 0:
+            self.mine(blocks)
+
+    def send_raw_transaction(self, raw_transaction: bytes) -> str:
+        tx_hash = '0x' + keccak(raw_transaction).hex()
+        sender = Account.recover_transaction(raw_transaction)
+        tx = TypedTransaction.from_bytes(HexBytes(raw_transaction)).as_dict()
+        try:
+            logs, status = self.transaction_handler(sender, tx), 1
+        except CallReverted:
+            logs, status = [], 0
+        block_hash = self.block()['hash']
+        self.nonces[sender] = tx['nonce'] + 1
+        self.receipts[tx_hash] = {
+            'transactionHash': tx_hash,
+            'transactionIndex': '0x0',
+            'blockHash': block_hash,
+            'blockNumber': hex(self.block_number),
+            'from': sender,
+            'to': '0x' + bytes(HexBytes(tx['to'])).hex(),
+            'cumulativeGasUsed': hex(tx['gas'] // 2),
+            'gasUsed': hex(tx['gas'] // 2),
+            'effectiveGasPrice': hex(tx.get('gasPrice', 0)),
+            'contractAddress': None,
+            'status': hex(status),
+            'type': hex(tx['type']),
+            'logsBloom': '0x' + '00' * 256,
+            'logs': [dict(log, blockHash=block_hash, blockNumber=hex(self.block_number),
+                          transactionHash=tx_hash, transactionIndex='0x0',
+                          logIndex=hex(i), removed=False)
+                     for i, log in enumerate(logs)]
+        }
+        return tx_hash
+
+    def block(self):
+        return {
+            'number': hex(self.block_number),
+            'timestamp': hex(self.block_timestamp),
+            'hash': '0x' + f'{self.block_number:064x}',
+            'gasLimit': hex(30000000),
+            'transactions': []
+        }
+
+    def handle(self, request):
+        method = request['method']
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        response = {'jsonrpc': '2.0', 'id': request['id']}
+        if self.live:
+            with self._lock:
+                self.follow_clock()
+        if method == 'eth_blockNumber':
+            response['result'] = hex(self.block_number)
+        elif method == 'eth_chainId':
+            response['result'] = hex(1)
+        elif method == 'eth_getBlockByNumber':
+            response['result'] = self.block()
+        elif method == 'eth_call':
+            data = bytes.fromhex(request['params'][0]['data'][2:])
+            try:
+                response['result'] = '0x' + self.eth_call(data).hex()
+            except CallReverted as err:
+                response['error'] = revert_error(err)
+        elif method == 'eth_estimateGas':
+            data = request['params'][0].get('data')
+            try:
+                if data is not None and data[:10] in self.call_results:  # else a plain send
+                    self.eth_call(bytes.fromhex(data[2:]))
+                response['result'] = hex(GAS_ESTIMATE)
+            except CallReverted as err:
+                response['error'] = revert_error(err)
+        elif method == 'eth_gasPrice':
+            response['result'] = hex(self.gas_price)
+        elif method == 'eth_getBalance':
+            address = request['params'][0].lower()
+            response['result'] = hex(next((value for account, value in self.balances.items()
+                                           if account.lower() == address),
+                                          self.default_balance))
+        elif method == 'eth_getTransactionCount':
+            address = request['params'][0].lower()
+            nonce = next((value for sender, value in self.nonces.items()
+                          if sender.lower() == address), 0)
+            response['result'] = hex(nonce)
+        elif method == 'eth_sendRawTransaction' and self.transaction_handler is not None:
+            with self._lock:
+                response['result'] = self.send_raw_transaction(
+                    bytes.fromhex(request['params'][0][2:]))
+        elif method == 'eth_getTransactionReceipt':
+            response['result'] = self.receipts.get(request['params'][0])
+        else:
+            response['error'] = {'code': -32601, 'message': f'Method {method} not found'}
+        return response
+
+
+class FakeRpcServer:
+    def __init__(self, node=None):
+        self.node = node or FakeNode()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), FakeRpcHandler)
+        self._server.daemon_threads = True
+        self._server.node = self.node
+        self._server.batches = 0
+        self._server.http_requests = 0
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    @property
+    def batches(self):
+        return self._server.batches
+
+    @property
+    def http_requests(self):
+        return self._server.http_requests
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+GET_BOUNTY_SELECTOR = function_signature_to_4byte_selector('getBounty(uint256)')
+BOUNTY_RECEIVED_TOPIC = '0x' + keccak(
+    text='BountyReceived(uint256,address,uint256,uint256,uint256,uint256,uint256,uint256)').hex()
+BOUNTY = 1000 * 10 ** 18
+MONTH = 30 * 24 * 60 * 60  # in seconds
+REWARD_DELAY = 3  # in seconds, reward dates are spread over this time after start
+FLEET_SIZE = 3  # nodes of the chain served by the chain_server fixture
+CLAIM_TIMEOUT = 30  # in seconds
+
+
+def selector(signature):
+    return '0x' + function_signature_to_4byte_selector(signature).hex()
+
+
+def node_index(args):
+    return decode(['uint256'], args)[0]
+
+
+class FakeSkaleChain(FakeNode):
+    """
+    Nodes and SkaleManager contracts of a fleet, by default with reward dates in the
+    near future. A claimed reward date moves a month ahead.
+    """
+
+    def __init__(self, nodes_number, reward_dates=None, **kwargs):
+        super().__init__(block_interval=1, live=True, **kwargs)
+        start = time.time()
+        self.reward_dates = reward_dates or [int(start + random.uniform(1, REWARD_DELAY))
+                                             for _ in range(nodes_number)]
+        self.claim_latencies = []
+        self.serve_contract_manager()
+        self.set_call_result(selector('getNumberOfNodes()'), ['uint256'], [nodes_number])
+        self.set_call_result(selector('getNodeNextRewardDate(uint256)'), ['uint256'],
+                             lambda args: [self.reward_dates[node_index(args)]])
+        self.set_call_result(
+            selector('nodes(uint256)'),
+            ['string', 'bytes4', 'bytes4', 'uint16', 'uint256', 'uint256', 'uint256', 'uint8',
+             'uint256'],
+            lambda args: [f'node-{node_index(args)}', bytes([10, 0, 0, 1]), bytes([1, 2, 3, 4]),
+                          10000, 1, 0, 0, 0, 1])
+        self.set_call_result(selector('getBounty(uint256)'), ['bool'], self.preflight)
+        self.transaction_handler = self.handle_transaction
+
+    def wait_for_claims(self, number, timeout=CLAIM_TIMEOUT) -> int:
+        """Returns the number of claims once there are `number` of them or on timeout."""
+        deadline = time.monotonic() + timeout
+        while len(self.claim_latencies) < number and time.monotonic() < deadline:
+            time.sleep(0.2)
+        return len(self.claim_latencies)
+
+    def preflight(self, args):
+        if self.block_timestamp < self.reward_dates[node_index(args)]:
+            raise CallReverted('Not time for bounty')
+        return [True]
+
+    def handle_transaction(self, sender, tx):
+        data = tx['data']
+        if data[:4] != GET_BOUNTY_SELECTOR:
+            raise CallReverted()
+        node_id = node_index(data[4:])
+        now = time.time()
+        if self.block_timestamp < self.reward_dates[node_id]:
+            raise CallReverted('Not time for bounty')
+        self.claim_latencies.append(now - self.reward_dates[node_id])
+        self.reward_dates[node_id] += MONTH
+        return [{
+            'address': '0x' + bytes(HexBytes(tx['to'])).hex(),
+            'topics': [BOUNTY_RECEIVED_TOPIC, '0x' + encode(['uint256'], [node_id]).hex()],
+            'data': '0x' + encode(
+                ['address'] + ['uint256'] * 6,
+                [sender, 0, 0, BOUNTY, self.block_number, self.block_timestamp, 0]).hex()
+        }]
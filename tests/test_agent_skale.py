@@ -0,0 +1,80 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+
+import pytest
+from skale.skale_manager import CONTRACTS_INFO
+
+from tests.fake_rpc import FakeRpcServer, make_manager_abi
+from tools.agent_skale import AgentSkale, load_agent_abi
+
+
+@pytest.fixture
+def abi_filepath(tmp_path):
+    path = os.path.join(tmp_path, 'manager.json')
+    with open(path, 'w') as abi_file:
+        json.dump(make_manager_abi([info.name for info in CONTRACTS_INFO], 10), abi_file)
+    return path
+
+
+def test_load_agent_abi(tmp_path, abi_filepath):
+    cache_folder = os.path.join(tmp_path, 'cache')
+    agent_abi = load_agent_abi(abi_filepath, cache_folder=cache_folder)
+    assert sorted(agent_abi) == sorted([
+        'contract_manager_abi', 'contract_manager_address', 'nodes_abi', 'nodes_address',
+        'skale_manager_abi', 'skale_manager_address'
+    ])
+    cache_files = os.listdir(cache_folder)
+    assert len(cache_files) == 1
+    cache_path = os.path.join(cache_folder, cache_files[0])
+    with open(cache_path) as cache_file:
+        assert json.load(cache_file) == agent_abi
+    assert load_agent_abi(abi_filepath, cache_folder=cache_folder) == agent_abi
+
+    # a broken cache is not trusted, the ABI file is parsed again
+    with open(cache_path, 'w') as cache_file:
+        cache_file.write('{')
+    assert load_agent_abi(abi_filepath, cache_folder=cache_folder) == agent_abi
+
+    with open(abi_filepath, 'a') as abi_file:
+        abi_file.write(' ')
+    load_agent_abi(abi_filepath, cache_folder=cache_folder)
+    assert len(os.listdir(cache_folder)) == 2
+
+
+def test_agent_skale(tmp_path, abi_filepath):
+    server = FakeRpcServer().start()
+    server.node.serve_contract_manager()
+
+    class TestAgentSkale(AgentSkale):
+        abi_cache_folder = os.path.join(tmp_path, 'cache')
+
+    try:
+        skale = TestAgentSkale(server.url, abi_filepath)
+        assert skale.nodes.name == 'nodes'
+        assert skale.manager.name == 'manager'
+        assert skale.validator_service is None
+        # addresses are read from the contract manager once per contract
+        calls = server.node.calls['eth_call']
+        assert skale.nodes is skale.nodes
+        assert server.node.calls['eth_call'] == calls
+    finally:
+        server.stop()
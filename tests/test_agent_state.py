@@ -0,0 +1,61 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import os
+from datetime import datetime
+
+from tools.agent_state import SavedClaim, StateStore
+
+REWARD_DATE = datetime(2024, 3, 15, 10, 0, 0)
+NEXT_CLAIM_AT = datetime(2024, 3, 15, 10, 0, 3)
+
+
+def test_state_store(tmp_path):
+    store = StateStore(os.path.join(tmp_path, 'state.db'))
+    assert store.load([0, 1]) == {}
+
+    store.save(0, node_name='node-0', node_ip='10.0.0.1')
+    store.save(0, reward_date=REWARD_DATE, next_claim_at=NEXT_CLAIM_AT)
+    store.save_many({1: {'node_name': 'node-1', 'node_ip': '10.0.0.2'}})
+    states = store.load([0, 1, 2])
+    assert set(states) == {0, 1}
+    assert states[0].has_node_info and states[0].has_schedule
+    assert states[0].reward_date == REWARD_DATE
+    assert states[0].next_claim_at == NEXT_CLAIM_AT
+    assert states[1].has_node_info and not states[1].has_schedule
+
+    store.delete(1)
+    assert list(store.load([0, 1])) == [0]
+
+
+def test_pending_claims(tmp_path):
+    store = StateStore(os.path.join(tmp_path, 'state.db'))
+    store.add_claim(0, '0x01', 1.5)
+    store.add_claim(0, '0x02', 2.5)
+    state = store.load([0])[0]
+    assert state.pending_claims == [SavedClaim('0x01', 1.5), SavedClaim('0x02', 2.5)]
+    assert state.has_schedule and not state.has_node_info
+
+    store.remove_claim(0, '0x01')
+    assert store.load([0])[0].pending_claims == [SavedClaim('0x02', 2.5)]
+
+    # the state survives reopening of the database
+    store = StateStore(os.path.join(tmp_path, 'state.db'))
+    assert store.load([0])[0].pending_claims == [SavedClaim('0x02', 2.5)]
@@ -0,0 +1,163 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+import tools.helper
+from bounty_agent import AsyncBountyAgent
+from tests.fake_rpc import CLAIM_TIMEOUT, FLEET_SIZE, MONTH
+from tools.helper import Notifier
+
+
+def test_claim_loop(chain_server, chain_skale, state_store):
+    chain = chain_server.node
+    agent = AsyncBountyAgent(chain_skale, list(range(FLEET_SIZE)))
+    agent.run()
+    try:
+        assert chain.wait_for_claims(FLEET_SIZE) == FLEET_SIZE
+        deadline = time.monotonic() + CLAIM_TIMEOUT
+        while len(agent._sleeping) < FLEET_SIZE and time.monotonic() < deadline:
+            time.sleep(0.2)
+        assert agent._sleeping == set(range(FLEET_SIZE))
+    finally:
+        agent.shutdown()
+
+    # the next reward dates of the claimed nodes are saved
+    states = state_store.load(list(range(FLEET_SIZE)))
+    assert [states[node_id].reward_date for node_id in range(FLEET_SIZE)] == \
+        [datetime.utcfromtimestamp(reward_date) for reward_date in chain.reward_dates]
+    assert all(not state.pending_claims for state in states.values())
+
+
+def test_revalidate_loops(chain_server, chain_skale, state_store):
+    chain = chain_server.node
+    saved_date = datetime.utcnow() + timedelta(days=1)
+    # node 3 is not registered, the saved reward dates of the others are outdated
+    state_store.save_many({node_id: {'node_name': f'node-{node_id}', 'node_ip': '10.0.0.1',
+                                     'reward_date': saved_date, 'next_claim_at': saved_date}
+                           for node_id in range(FLEET_SIZE + 1)})
+    agent = AsyncBountyAgent(chain_skale, list(range(FLEET_SIZE + 1)))
+    agent.run()
+    try:
+        assert chain.wait_for_claims(FLEET_SIZE) == FLEET_SIZE
+        assert agent.agents[FLEET_SIZE].is_stopped
+        assert agent._tasks[FLEET_SIZE].done()
+    finally:
+        agent.shutdown()
+    assert FLEET_SIZE not in state_store.load([FLEET_SIZE])
+    assert chain.calls.get('eth_sendRawTransaction') == FLEET_SIZE
+
+
+def test_revalidate_loops_retry_failed_reads(chain_server, chain_skale, state_store,
+                                             monkeypatch):
+    chain = chain_server.node
+    saved_date = datetime.utcnow() + timedelta(days=1)
+    state_store.save_many({node_id: {'node_name': f'node-{node_id}', 'node_ip': '10.0.0.1',
+                                     'reward_date': saved_date, 'next_claim_at': saved_date}
+                           for node_id in range(FLEET_SIZE)})
+    monkeypatch.setattr('bounty_agent.job_retry_delay', lambda err, attempt: 0.1)
+    agent = AsyncBountyAgent(chain_skale, list(range(FLEET_SIZE)))
+    failures = [requests.ConnectionError('The endpoint is down')]
+    check_restored_nodes = agent.check_restored_nodes
+
+    def check_once_failing(node_ids):
+        if failures:
+            raise failures.pop()
+        return check_restored_nodes(node_ids)
+
+    agent.check_restored_nodes = check_once_failing
+    agent.run()
+    try:
+        # the outdated saved dates are replaced only if the check is retried
+        assert chain.wait_for_claims(FLEET_SIZE) == FLEET_SIZE
+    finally:
+        agent.shutdown()
+    assert not failures
+    assert agent.failed_revalidations == 0
+
+
+def test_restored_agent_starts_without_rpc(chain_server, chain_skale, state_store, monkeypatch):
+    saved_date = datetime.utcnow() + timedelta(days=1)
+    state_store.save_many({node_id: {'node_name': f'node-{node_id}', 'node_ip': '10.0.0.1',
+                                     'reward_date': saved_date, 'next_claim_at': saved_date}
+                           for node_id in range(FLEET_SIZE)})
+    monkeypatch.setattr(tools.helper.call_retry, 'attempts', 1)
+    agent = AsyncBountyAgent(chain_skale, list(range(FLEET_SIZE)))
+    chain_server.stop()
+    start = time.monotonic()
+    agent.run()
+    try:
+        assert time.monotonic() - start < 1
+        assert sorted(agent._tasks) == list(range(FLEET_SIZE))
+        assert not any(task.done() for task in agent._tasks.values())
+    finally:
+        agent.shutdown()
+
+
+def test_failed_job_saves_next_try(chain_server, chain_skale, state_store, monkeypatch):
+    saved_date = datetime.utcnow()
+    state_store.save_many({node_id: {'node_name': f'node-{node_id}', 'node_ip': '10.0.0.1',
+                                     'reward_date': saved_date, 'next_claim_at': saved_date}
+                           for node_id in range(FLEET_SIZE)})
+    monkeypatch.setattr(tools.helper.call_retry, 'attempts', 1)
+    monkeypatch.setattr('bounty_agent.job_retry_delay', lambda err, attempt: MONTH)
+    agent = AsyncBountyAgent(chain_skale, list(range(FLEET_SIZE)))
+    chain_skale.nodes, chain_skale.manager  # contract addresses are resolved before the outage
+    chain_server.stop()
+    agent.run()
+    try:
+        # the claim state cannot be read, so the retry date is saved for a restart
+        deadline = time.monotonic() + CLAIM_TIMEOUT
+        while time.monotonic() < deadline:
+            states = state_store.load(list(range(FLEET_SIZE)))
+            if all(state.next_claim_at > saved_date + timedelta(days=1)
+                   for state in states.values()):
+                break
+            time.sleep(0.2)
+        else:
+            raise AssertionError('Retry dates are not saved')
+    finally:
+        agent.shutdown()
+    assert all(node_agent.failed_jobs > 0 for node_agent in agent.agents.values())
+
+
+def test_stop_and_shutdown(chain_server, chain_skale, monkeypatch):
+    chain = chain_server.node
+    chain.reward_dates = [int(time.time()) + MONTH] * FLEET_SIZE
+    sent = []
+    monkeypatch.setattr(Notifier, 'send', lambda notifier, message, icon=None, key=None:
+                        sent.append(message) or 0)
+    agent = AsyncBountyAgent(chain_skale, list(range(FLEET_SIZE)))
+    # one start message for the fleet, not one per node
+    assert [message for message in sent if 'started successfully' in message] == \
+        [f'{agent.agent_name} started successfully with {FLEET_SIZE} nodes']
+    assert all(node_agent.ledger is agent.ledger for node_agent in agent.agents.values())
+    agent.run()
+    agent.stop()
+    assert agent.stopped.wait(CLAIM_TIMEOUT)
+    agent.shutdown()
+    assert not agent._thread.is_alive()
+    assert agent.loop.is_closed()
+    assert all(task.done() for task in agent._tasks.values())
+    assert all(node_agent.is_stopped for node_agent in agent.agents.values())
+    assert chain.claim_latencies == []
@@ -0,0 +1,52 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import threading
+
+from tools.background import BackgroundQueue
+
+
+class Collector(BackgroundQueue):
+    def __init__(self, **kwargs):
+        self.batches = []
+        self.failed = []
+        self.release = threading.Event()
+        super().__init__('collector', **kwargs)
+
+    def _process(self, batch):
+        self.release.wait()
+        if 'bad' in batch:
+            raise ValueError('bad item')
+        self.batches.append(batch)
+
+    def _failed(self, batch, err):
+        self.failed.append(batch)
+
+
+def test_batches_survive_errors_and_flush():
+    collector = Collector(max_size=3, batch_size=2)
+    assert collector.put('bad')
+    assert not collector.flush(timeout=0.1)
+    assert all(collector.put(item) for item in ['a', 'b', 'c'])
+    assert not collector.put('d')  # the queue is full
+    collector.release.set()
+    assert collector.flush(timeout=5)
+    assert collector.failed == [['bad']]
+    assert collector.batches == [['a', 'b'], ['c']]
@@ -0,0 +1,80 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+
+from configs import MIN_ETH_AMOUNT
+from tools.balance_oracle import BalanceOracle
+from tools.exceptions import NotEnoughEthForTxException
+from tools.submitter import ClaimSubmitter
+
+GAS_PRICE = 10 ** 9
+
+
+class ListNotifier:
+    def __init__(self):
+        self.messages = []
+
+    def send(self, message, icon=None):
+        self.messages.append(message)
+
+
+def test_balance_is_cached(rpc_server, fake_skale):
+    rpc_server.node.gas_price = GAS_PRICE
+    rpc_server.node.balances[fake_skale.wallet.address] = 10 ** 18
+    oracle = BalanceOracle(fake_skale, interval=60)
+    batches = rpc_server.batches
+    oracle.check()
+    oracle.check()
+    assert rpc_server.batches == batches + 1
+    assert oracle.balance == 10 ** 18
+    assert oracle.gas_price == 2 * GAS_PRICE
+    assert oracle.claim_cost() == max(oracle.gas_estimate * 2 * GAS_PRICE, MIN_ETH_AMOUNT)
+
+
+def test_low_balance(rpc_server, fake_skale):
+    notifier = ListNotifier()
+    oracle = BalanceOracle(fake_skale, notifier, claims_per_epoch=10, interval=60)
+    oracle.observe_gas(100000)
+    claim_cost = max(100000 * 2 * rpc_server.node.gas_price, MIN_ETH_AMOUNT)
+
+    rpc_server.node.balances[fake_skale.wallet.address] = claim_cost * 5
+    oracle.refresh()
+    oracle.refresh()
+    oracle.check()
+    assert len(notifier.messages) == 1
+
+    rpc_server.node.balances[fake_skale.wallet.address] = claim_cost * 20
+    oracle.refresh()
+    rpc_server.node.balances[fake_skale.wallet.address] = claim_cost // 2
+    oracle.refresh()
+    assert len(notifier.messages) == 2
+
+    submitter = ClaimSubmitter(fake_skale, oracle)
+    with pytest.raises(NotEnoughEthForTxException):
+        submitter.submit(0)
+    assert 'eth_estimateGas' not in rpc_server.node.calls
+
+
+def test_start_does_not_wait_for_rpc(rpc_server, fake_skale):
+    rpc_server.stop()
+    oracle = BalanceOracle(fake_skale, interval=60)
+    oracle.start()  # the refresh fails in the background
+    oracle.stop()
+    assert oracle.balance is None
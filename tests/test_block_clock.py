@@ -0,0 +1,51 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from datetime import datetime
+
+from freezegun import freeze_time
+
+from configs import DEFAULT_BLOCK_INTERVAL, MIN_POLL_INTERVAL, RETRY_INTERVAL
+from tools.block_clock import BlockClock
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+NOW_TS = 1704110400
+
+
+def test_block_clock_estimates():
+    clock = BlockClock()
+    assert clock.offset == 0
+    assert clock.block_interval == DEFAULT_BLOCK_INTERVAL
+    with freeze_time(NOW):
+        clock.observe({'number': 100, 'timestamp': NOW_TS - 30})
+        clock.observe({'number': 100, 'timestamp': NOW_TS - 30})
+        clock.observe({'number': 105, 'timestamp': NOW_TS - 5})
+    assert clock.offset == -5
+    assert clock.block_interval == 5
+    assert clock.local_date(NOW) == datetime(2024, 1, 1, 12, 0, 5)
+
+
+def test_block_clock_poll_delay():
+    clock = BlockClock()
+    with freeze_time(NOW):
+        clock.observe({'number': 10, 'timestamp': NOW_TS - 20})
+        clock.observe({'number': 12, 'timestamp': NOW_TS - 16})
+        assert clock.poll_delay(datetime(2024, 1, 1, 12, 0, 10)) == 26
+        assert clock.poll_delay(datetime(2024, 1, 1, 11, 59, 0)) == MIN_POLL_INTERVAL
+        assert clock.poll_delay(datetime(2024, 1, 1, 13, 0, 0)) == RETRY_INTERVAL
@@ -18,7 +18,7 @@
 #   along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 from freezegun import freeze_time
@@ -31,6 +31,7 @@ from tools.helper import check_if_node_is_registered
 
 MINING_DELAY = 5
 REWARD_DATE_OFFSET = 10  # additional seconds to skip to ensure reward time is came
+ASYNC_RUN_TIMEOUT = 60
 
 
 @pytest.fixture(scope="module")
@@ -94,6 +95,24 @@ def test_bounty_job_saves_data(skale, bounty_collector):
     assert len(bounties) == 1
 
 
+def test_restore_schedule(skale, node_id, state_store):
+    saved_date = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+    state_store.save(node_id, node_name='restored', node_ip='10.0.0.1',
+                     reward_date=saved_date, next_claim_at=saved_date)
+    agent = bounty_agent.BountyAgent(skale, node_id)
+    try:
+        assert 'Node: restored,' in agent.notifier.header
+        assert agent.restore_schedule()
+        assert agent.scheduler.get_job(agent.job_id).trigger.run_date.replace(
+            tzinfo=None) == saved_date
+
+        agent.revalidate()
+        reward_date = agent.get_reward_date()
+        assert state_store.load([node_id])[node_id].reward_date == reward_date
+    finally:
+        agent.shutdown()
+
+
 def test_run_agent(skale, node_id):
     bounty_collector = bounty_agent.BountyAgent(skale, node_id)
     reward_date = skale.nodes.contract.functions.getNodeNextRewardDate(bounty_collector.id).call()
@@ -108,3 +127,18 @@ def test_run_agent(skale, node_id):
     time.sleep(MINING_DELAY)
     bounties = get_bounty_events(skale, bounty_collector.id)
     assert len(bounties) == 2
+
+
+def test_run_async_agent(skale, node_id):
+    agent = bounty_agent.AsyncBountyAgent(skale, [node_id])
+    reward_date = skale.nodes.contract.functions.getNodeNextRewardDate(node_id).call()
+    go_to_date(skale.web3, reward_date + REWARD_DATE_OFFSET)
+
+    agent.run()
+    try:
+        deadline = time.monotonic() + ASYNC_RUN_TIMEOUT
+        while len(get_bounty_events(skale, node_id)) < 3 and time.monotonic() < deadline:
+            time.sleep(MINING_DELAY)
+    finally:
+        agent.shutdown()
+    assert len(get_bounty_events(skale, node_id)) == 3
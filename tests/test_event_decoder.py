@@ -0,0 +1,85 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.logs import DISCARD
+
+from tools.event_decoder import EventDecoder
+
+BOUNTY_RECEIVED_INPUTS = [
+    ('nodeIndex', 'uint256', True), ('owner', 'address', False),
+    ('averageDowntime', 'uint256', False), ('averageLatency', 'uint256', False),
+    ('bounty', 'uint256', False), ('previousBlockEvent', 'uint256', False),
+    ('time', 'uint256', False), ('gasSpend', 'uint256', False)
+]
+MANAGER_ABI = [{
+    'name': 'BountyReceived',
+    'type': 'event',
+    'anonymous': False,
+    'inputs': [{'name': name, 'type': abi_type, 'indexed': indexed}
+               for name, abi_type, indexed in BOUNTY_RECEIVED_INPUTS]
+}]
+MANAGER_ADDRESS = Web3.to_checksum_address('0x' + 'dd' * 20)
+OWNER = Web3.to_checksum_address('0x' + 'ab' * 20)
+BOUNTY = 123 * 10 ** 18
+
+
+def make_log(decoder, node_id, address=MANAGER_ADDRESS, topic=None):
+    return AttributeDict({
+        'address': address,
+        'topics': [HexBytes(topic or decoder.topic), HexBytes(encode(['uint256'], [node_id]))],
+        'data': HexBytes(encode(['address'] + ['uint256'] * 6,
+                                [OWNER, 1, 2, BOUNTY + node_id, 3, 4, 5])),
+        'blockNumber': 1, 'transactionHash': HexBytes('0x' + '11' * 32), 'transactionIndex': 0,
+        'blockHash': HexBytes('0x' + '22' * 32), 'logIndex': 0, 'removed': False
+    })
+
+
+@pytest.fixture
+def contract():
+    return Web3().eth.contract(address=MANAGER_ADDRESS, abi=MANAGER_ABI)
+
+
+def test_decoder_matches_process_receipt(contract):
+    decoder = EventDecoder(contract, 'BountyReceived')
+    receipt = {'logs': [
+        make_log(decoder, 7, topic=b'\x01' * 32),
+        make_log(decoder, 8, address=OWNER),
+        make_log(decoder, 9)
+    ]}
+    expected = contract.events.BountyReceived().process_receipt(receipt, errors=DISCARD)
+    assert len(expected) == 2  # process_receipt does not check the log address
+    assert decoder.decode_receipt(receipt) == [
+        dict(event['args']) for event in expected if event['address'] == MANAGER_ADDRESS]
+
+
+def test_decoder_reads_requested_fields(contract):
+    decoder = EventDecoder(contract, 'BountyReceived', ('nodeIndex', 'bounty'))
+    receipts = [{'logs': [make_log(decoder, node_id)]} for node_id in range(3)] + [{'logs': []}]
+    raw_log = {key: value.hex() if isinstance(value, bytes) else value
+               for key, value in make_log(decoder, 4).items()}
+    raw_log['topics'] = [topic.hex() for topic in raw_log['topics']]
+
+    assert decoder.decode_receipts(receipts) == [
+        [{'nodeIndex': node_id, 'bounty': BOUNTY + node_id}] for node_id in range(3)] + [[]]
+    assert decoder.decode_log(raw_log) == {'nodeIndex': 4, 'bounty': BOUNTY + 4}
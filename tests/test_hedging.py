@@ -0,0 +1,133 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from web3 import Web3
+
+from tests.fake_rpc import FakeNode, FakeRpcServer
+from tools.hedging import RPC_HEDGES, HedgePolicy
+from tools.helper import RpcBatch
+from tools.rpc_pool import RpcPool
+
+OUTLIER_LATENCY = 1  # in seconds
+
+
+class OutlierNode(FakeNode):
+    """Answers the next slow_requests requests after OUTLIER_LATENCY."""
+
+    def __init__(self):
+        super().__init__()
+        self.slow_requests = 0
+
+    def delay(self):
+        with self._lock:
+            if self.slow_requests:
+                self.slow_requests -= 1
+                return OUTLIER_LATENCY
+        return 0
+
+
+@pytest.fixture
+def server():
+    server = FakeRpcServer(OutlierNode()).start()
+    yield server
+    server.stop()
+
+
+def test_hedge_policy():
+    policy = HedgePolicy(percentile=0.9, min_delay=0.01, max_ratio=0.5, burst=1)
+    for _ in range(19):
+        policy.observe(0.1)
+    assert policy.delay() is None
+    for latency in range(1, 11):
+        policy.observe(latency / 100)
+    assert policy.delay() == 0.1
+
+    assert policy.acquire()
+    assert not policy.acquire()
+    policy.delay()
+    assert not policy.acquire()
+    policy.delay()
+    assert policy.acquire()
+
+
+def warm_up(web3, reads=25):
+    for _ in range(reads):
+        web3.eth.block_number
+
+
+def test_slow_read_is_hedged(server):
+    pool = RpcPool([server.url], hedging=True)
+    web3 = Web3(pool)
+    warm_up(web3)
+    hedges_won = RPC_HEDGES.get('hedge')
+
+    server.node.slow_requests = 1
+    start = time.monotonic()
+    assert web3.eth.block_number == server.node.block_number
+    assert time.monotonic() - start < OUTLIER_LATENCY / 2
+    assert RPC_HEDGES.get('hedge') == hedges_won + 1
+
+    block, = RpcBatch(web3).add_block('latest').execute()
+    assert block['number'] == server.node.block_number
+    pool.stop()
+
+
+def test_hedges_are_capped(server):
+    pool = RpcPool([server.url], hedging=True)
+    web3 = Web3(pool)
+    warm_up(web3)
+    while pool.hedge_policy.acquire():
+        pass
+
+    server.node.slow_requests = 1
+    start = time.monotonic()
+    web3.eth.block_number
+    assert time.monotonic() - start >= OUTLIER_LATENCY
+    pool.stop()
+
+
+def test_slow_async_read_is_hedged(server):
+    pool = RpcPool([server.url], hedging=True)
+    warm_up(Web3(pool))
+    hedges_won = RPC_HEDGES.get('hedge')
+
+    observed = []
+    observe = pool.hedge_policy.observe
+    pool.hedge_policy.observe = lambda *args: observed.append(args) or observe(*args)
+
+    async def execute():
+        async with aiohttp.ClientSession() as session:
+            result = await RpcBatch(Web3(pool)).add_block('latest').execute_async(session)
+            await asyncio.sleep(0.1)  # the losing primary is cancelled
+            return result
+
+    server.node.slow_requests = 1
+    start = time.monotonic()
+    block, = asyncio.run(execute())
+    assert time.monotonic() - start < OUTLIER_LATENCY / 2 + 0.1
+    assert block['number'] == server.node.block_number
+    assert RPC_HEDGES.get('hedge') == hedges_won + 1
+    assert observed == []  # the cancelled primary is not a latency sample
+    pool.stop()
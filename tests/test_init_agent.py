@@ -21,7 +21,7 @@ import json
 
 import pytest
 
-from bounty_agent import BountyAgent
+from bounty_agent import BountyAgent, BountyAgentFleet
 from configs import NODE_CONFIG_FILEPATH
 from tools.exceptions import NodeNotFoundException
 
@@ -57,3 +57,14 @@ def test_init_agent_neg(skale):
 
     with pytest.raises(Exception):
         BountyAgent(skale)
+
+
+def test_init_fleet(skale):
+    print("Test fleet init with several node ids")
+    fleet = BountyAgentFleet(skale, [0, 1])
+    assert sorted(fleet.agents) == [0, 1]
+    assert all(agent.scheduler is fleet.scheduler for agent in fleet.agents.values())
+    assert fleet.agents[0].job_id != fleet.agents[1].job_id
+
+    with pytest.raises(NodeNotFoundException):
+        BountyAgentFleet(skale, [0, 100])
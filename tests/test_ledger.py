@@ -0,0 +1,51 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+from datetime import datetime
+
+from peewee import SqliteDatabase
+
+from tools.ledger import BountyClaim, Ledger, get_epoch
+
+REWARD_DATE = datetime(2024, 3, 15, 10, 0, 0)
+SKL = 10 ** 18
+
+
+def test_get_epoch():
+    assert get_epoch(datetime(1970, 1, 31)) == 0
+    assert get_epoch(REWARD_DATE) == 54 * 12 + 2
+
+
+def test_ledger(tmp_path):
+    ledger = Ledger(SqliteDatabase(os.path.join(tmp_path, 'ledger.db')))
+    epoch = get_epoch(REWARD_DATE)
+    big_bounty = 123456789 * SKL + 1
+    ledger.record(0, BountyClaim.SUCCESS, REWARD_DATE, tx_hash='0x01', bounty=big_bounty)
+    ledger.record(0, BountyClaim.FAILED, REWARD_DATE, error='reverted')
+    ledger.record(1, BountyClaim.SUCCESS, REWARD_DATE, tx_hash='0x02', bounty=5 * SKL)
+    ledger.record(1, BountyClaim.SUCCESS, datetime(2024, 4, 15), tx_hash='0x03', bounty=7 * SKL)
+    assert ledger.flush()
+
+    assert len(ledger.get_node_claims(0)) == 2
+    assert ledger.get_node_claims(1, limit=1)[0].tx_hash == '0x03'
+    assert ledger.get_node_total(0) == big_bounty
+    assert ledger.get_node_total(1) == 12 * SKL
+    assert ledger.get_node_total(1, epoch=epoch) == 5 * SKL
+    assert ledger.get_epoch_totals(epoch) == {0: big_bounty, 1: 5 * SKL}
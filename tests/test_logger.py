@@ -0,0 +1,86 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import threading
+
+from configs.logs import LOG_FORMAT
+from tools.logger import (HidingFormatter, LogWriter, QueuedHandler, Redactor,
+                          literal_prefix)
+
+PATTERNS = {
+    r'10\.1\.0\.1': '[SGX_IP]',
+    r'NEK\:\w+': '[SGX_KEY]'
+}
+
+
+def test_literal_prefix():
+    assert literal_prefix(r'10\.1\.0\.1') == '10.1.0.1'
+    assert literal_prefix(r'NEK\:\w+') == 'NEK:'
+    assert literal_prefix(r'ab*c') == 'a'
+    assert literal_prefix(r'a|b') == ''
+
+
+def test_redactor():
+    redactor = Redactor(PATTERNS)
+    assert redactor.redact('https://10.1.0.1:1026 NEK:abc1') == 'https://[SGX_IP]:1026 [SGX_KEY]'
+    assert redactor.redact('10.1.0.11 NEK abc') == '[SGX_IP]1 NEK abc'
+    assert redactor.redact('nothing to hide') == 'nothing to hide'
+
+
+def test_hiding_formatter_formats_record_once():
+    formatter = HidingFormatter(LOG_FORMAT, PATTERNS)
+    record = logging.LogRecord('bounty-agent', logging.INFO, __file__, 0,
+                               'Key %s', ('NEK:abc',), None)
+    first = formatter.format(record)
+    assert first.endswith('Key [SGX_KEY]')
+    record.msg = 'changed'
+    assert formatter.format(record) is first
+
+
+class SlowListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.unblocked = threading.Event()
+        self.messages = []
+
+    def emit(self, record):
+        self.unblocked.wait()
+        self.messages.append(self.format(record))
+
+
+def test_queued_handler_writes_off_thread():
+    target = SlowListHandler()
+    target.setFormatter(HidingFormatter('%(message)s', PATTERNS))
+    writer = LogWriter(max_size=2)
+    test_logger = logging.getLogger('test-queued-handler')
+    test_logger.propagate = False
+    test_logger.addHandler(QueuedHandler(target, writer))
+
+    args = ['NEK:abc']
+    test_logger.warning('Key %s', args)
+    args.append('changed')
+    for i in range(10):
+        test_logger.warning('Message %d', i)
+    assert writer.dropped > 0
+
+    target.unblocked.set()
+    assert writer.flush()
+    assert target.messages[0] == "Key ['[SGX_KEY]']"
+    assert len(target.messages) < 11
@@ -0,0 +1,58 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import requests
+
+from tools.metrics import Registry, start_metrics_server
+
+
+def test_registry_render():
+    registry = Registry()
+    counter = registry.counter('test_calls_total', 'Calls', ['status'])
+    histogram = registry.histogram('test_latency_seconds', 'Latency', ['method'],
+                                   buckets=(0.1, 1))
+    registry.callback('test_jobs', 'Jobs', 'gauge', lambda: {(): 3})
+    counter.inc('success')
+    counter.inc('success', amount=2)
+    histogram.observe(0.05, 'get_block')
+    histogram.observe(0.5, 'get_block')
+    histogram.observe(5, 'get_block')
+
+    assert counter.get('success') == 3
+    assert histogram.get_count('get_block') == 3
+    text = registry.render()
+    assert '# TYPE test_calls_total counter' in text
+    assert 'test_calls_total{status="success"} 3' in text
+    assert 'test_latency_seconds_bucket{method="get_block",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{method="get_block",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{method="get_block",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum{method="get_block"} 5.55' in text
+    assert 'test_jobs 3' in text
+
+
+def test_metrics_server():
+    registry = Registry()
+    registry.counter('test_requests_total', 'Requests').inc()
+    server = start_metrics_server(0, registry=registry)
+    try:
+        response = requests.get(f'http://127.0.0.1:{server.server_port}/metrics')
+        assert response.status_code == 200
+        assert 'test_requests_total 1' in response.text
+    finally:
+        server.shutdown()
@@ -0,0 +1,50 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import pytest
+from eth_abi import decode
+from web3 import HTTPProvider, Web3
+
+from tests.fake_rpc import NODES_ABI, NODES_ADDRESS
+from tools.multicall import CallAggregator
+
+MULTICALL_ADDRESS = '0x' + 'ca' * 20
+REWARD_DATE_BASE = 1700000000
+
+
+@pytest.fixture
+def nodes_contract(rpc_server):
+    web3 = Web3(HTTPProvider(rpc_server.url))
+    contract = web3.eth.contract(address=NODES_ADDRESS,
+                                 abi=NODES_ABI)
+    selector = contract.functions.getNodeNextRewardDate(0)._encode_transaction_data()[:10]
+    rpc_server.node.set_call_result(
+        selector, ['uint256'],
+        lambda args: [REWARD_DATE_BASE + decode(['uint256'], args)[0]])
+    return contract
+
+
+@pytest.mark.parametrize('multicall_address', [None, MULTICALL_ADDRESS])
+def test_call_aggregator(rpc_server, nodes_contract, multicall_address):
+    aggregator = CallAggregator(nodes_contract.w3, multicall_address=multicall_address,
+                                chunk_size=40)
+    node_ids = list(range(100))
+    functions = [nodes_contract.functions.getNodeNextRewardDate(i) for i in node_ids]
+    assert aggregator.call(functions) == [REWARD_DATE_BASE + i for i in node_ids]
+    assert rpc_server.node.calls['eth_call'] == (100 if multicall_address is None else 3)
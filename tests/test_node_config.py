@@ -0,0 +1,88 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import threading
+import time
+
+import pytest
+
+from configs import CONFIG_POLL_INTERVAL
+from tools.node_config import NodeConfig, NodeConfigWatcher
+
+
+def write_config(path, data):
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(data))
+    tmp_path.replace(path)
+
+
+def test_config_is_parsed_once(tmp_path, monkeypatch):
+    path = tmp_path / 'node_config.json'
+    write_config(path, {'node_id': 3, 'sgx_key_name': 'key'})
+    watcher = NodeConfigWatcher(str(path))
+    reads = []
+    read = watcher._read
+    monkeypatch.setattr(watcher, '_read', lambda: reads.append(1) or read())
+    assert watcher.get() == NodeConfig(3, 'key')
+    assert watcher.get() == NodeConfig(3, 'key')
+    assert len(reads) == 1
+
+    write_config(path, {'node_id': 4, 'sgx_key_name': 'key'})
+    assert watcher.get().node_id == 4
+    assert len(reads) == 2
+
+
+def test_missing_or_partial_config(tmp_path):
+    path = tmp_path / 'node_config.json'
+    watcher = NodeConfigWatcher(str(path))
+    assert watcher.get() == NodeConfig()
+    path.write_text('{"node_id":')
+    assert watcher.get() == NodeConfig()
+    assert watcher.wait_for('node_id', timeout=0.1) is None
+
+
+def test_invalid_node_id(tmp_path):
+    path = tmp_path / 'node_config.json'
+    write_config(path, {'node_id': 'one'})
+    with pytest.raises(ValueError):
+        NodeConfigWatcher(str(path)).get()
+
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_waiter_wakes_when_node_id_appears(tmp_path, use_inotify):
+    path = tmp_path / 'node_config.json'
+    write_config(path, {'sgx_key_name': 'key'})
+    watcher = NodeConfigWatcher(str(path), use_inotify=use_inotify)
+    threading.Timer(0.2, write_config, (path, {'node_id': 7, 'sgx_key_name': 'key'})).start()
+
+    start = time.monotonic()
+    assert watcher.wait_for('node_id', timeout=10) == 7
+    assert time.monotonic() - start < 2
+
+
+def test_polling_stops_at_once(tmp_path):
+    watcher = NodeConfigWatcher(str(tmp_path / 'node_config.json'), use_inotify=False)
+    assert watcher.wait_for('node_id', timeout=0.1) is None
+    start = time.monotonic()
+    watcher.stop()
+    watcher._thread.join(timeout=5)
+    assert not watcher._thread.is_alive()
+    assert time.monotonic() - start < CONFIG_POLL_INTERVAL
@@ -0,0 +1,181 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from tools.helper import MsgIcon, NotificationCoalescer, NotificationQueue, Notifier
+
+
+class ListQueue:
+    def __init__(self):
+        self.messages = []
+
+    def put(self, message_lines):
+        self.messages.append(message_lines)
+        return True
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def coalescer():
+    coalescer = NotificationCoalescer(ListQueue(), dedup_interval=60, digest_interval=3600,
+                                      node_rate=0.1, node_burst=2, global_rate=1,
+                                      global_burst=3, clock=FakeClock())
+    yield coalescer
+    coalescer.stop()
+
+
+def create_notifier(coalescer, node_id=0):
+    return Notifier('bounty-agent', f'node_{node_id}', node_id, '10.1.0.0',
+                    notification_queue=coalescer.queue, coalescer=coalescer)
+
+
+class NotifierHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.requests.append(json.loads(body))
+        reply = self.server.replies.pop(0) if self.server.replies else b'{"status": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def notifier_server():
+    server = HTTPServer(('127.0.0.1', 0), NotifierHandler)
+    server.requests = []
+    server.replies = []  # bodies of the next replies, then {"status": "ok"}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_notifier_sends_in_background(notifier_server):
+    url = f'http://127.0.0.1:{notifier_server.server_port}/send-tg-notification'
+    notifier = Notifier('bounty-agent', 'node_0', 0, '10.1.0.0',
+                        notification_queue=NotificationQueue(url=url))
+    for i in range(5):
+        assert notifier.send(f'message {i}', MsgIcon.INFO) == 0
+    assert notifier.queue.flush()
+
+    lines = [line for req in notifier_server.requests for line in req['message']]
+    assert [line for line in lines if line.startswith('message')] == \
+        [f'message {i}' for i in range(5)]
+    assert notifier.queue.stats['queued'] == 5
+    assert notifier.queue.stats['sent'] == 5
+    assert notifier.queue.stats['failed'] == 0
+
+
+def test_notifier_survives_bad_reply(notifier_server):
+    notifier_server.replies = [b'<html>Bad gateway</html>', b'[]']
+    url = f'http://127.0.0.1:{notifier_server.server_port}/send-tg-notification'
+    notification_queue = NotificationQueue(url=url, batch_size=1)
+    notifier = Notifier('bounty-agent', 'node_0', 0, '10.1.0.0',
+                        notification_queue=notification_queue)
+    for i in range(3):
+        notifier.send(f'message {i}', MsgIcon.INFO)
+        assert notification_queue.flush()
+    assert notification_queue.stats['failed'] == 2
+    assert notification_queue.stats['sent'] == 1
+
+
+def test_notifier_counts_failed_and_dropped():
+    notification_queue = NotificationQueue(url='http://127.0.0.1:1/send-tg-notification',
+                                           max_size=1, timeout=0.1)
+    notifier = Notifier('bounty-agent', 'node_0', 0, '10.1.0.0',
+                        notification_queue=notification_queue)
+    results = [notifier.send(f'message {i}') for i in range(100)]
+    assert notification_queue.flush()
+    stats = notification_queue.stats
+    assert results.count(1) == stats['dropped'] > 0
+    assert stats['queued'] + stats['dropped'] == 100
+    assert stats['failed'] == stats['queued']
+    assert stats['sent'] == 0
+
+
+def test_coalescer_deduplicates(coalescer):
+    notifier = create_notifier(coalescer)
+    for i in range(10):
+        assert notifier.send(f'Cannot get reward date: timeout {i}', key='reward_date') == 0
+        notifier.send('Next reward date', MsgIcon.BOUNTY)
+    messages = coalescer.queue.messages
+    assert [lines[1] for lines in messages].count('Next reward date') == 10
+    assert [lines[1] for lines in messages if lines[1] != 'Next reward date'] == \
+        ['Cannot get reward date: timeout 0']
+
+    coalescer.clock.now = 61
+    notifier.send('Cannot get reward date: timeout 10', key='reward_date')
+    assert messages[-1][1] == 'Cannot get reward date: timeout 10'
+
+    assert coalescer.send_digest()
+    digest = messages[-1]
+    assert digest[0].endswith('Suppressed 9 notifications in the last 60 min:')
+    assert digest[1:] == [f'9 x {MsgIcon.ERROR.value} {notifier.header.strip()}\n'
+                          f'Cannot get reward date: timeout 9']
+    assert not coalescer.send_digest()
+
+
+def test_coalescer_rate_limits(coalescer):
+    notifier = create_notifier(coalescer)
+    for i in range(4):
+        notifier.send(f'error {i}')
+    # the node bucket holds two messages
+    assert [lines[1] for lines in coalescer.queue.messages] == ['error 0', 'error 1']
+
+    # the first critical message with a key is sent anyway, its repeats are not
+    notifier.send('Transaction failed: 0x01', MsgIcon.CRITICAL, key='claim_failed')
+    notifier.send('Transaction failed: 0x02', MsgIcon.CRITICAL, key='claim_failed')
+    assert coalescer.queue.messages[-1][1] == 'Transaction failed: 0x01'
+
+    # the global bucket is shared by all nodes
+    other_notifier = create_notifier(coalescer, node_id=1)
+    other_notifier.send('error 0')
+    other_notifier.send('error 1')
+    assert len(coalescer.queue.messages) == 3
+
+    coalescer.clock.now = 20  # both buckets are refilled
+    notifier.send('error 2')
+    assert coalescer.queue.messages[-1][1] == 'error 2'
+
+    coalescer.send_digest()
+    error, critical = MsgIcon.ERROR.value, MsgIcon.CRITICAL.value
+    assert coalescer.queue.messages[-1][1:] == [
+        f'1 x {error} {notifier.header.strip()}\nerror 2',
+        f'1 x {error} {notifier.header.strip()}\nerror 3',
+        f'1 x {critical} {notifier.header.strip()}\nTransaction failed: 0x02',
+        f'1 x {error} {other_notifier.header.strip()}\nerror 0',
+        f'1 x {error} {other_notifier.header.strip()}\nerror 1',
+    ]
@@ -0,0 +1,71 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from eth_abi import encode
+from web3 import HTTPProvider, Web3
+
+from tests.fake_rpc import GAS_ESTIMATE, MANAGER_ABI, MANAGER_ADDRESS, CallReverted
+from tools.helper import RpcBatch, RpcError
+from tools.preflight import RevertReason, classify_revert, revert_message
+
+
+def test_preflight_in_batch(rpc_server):
+    web3 = Web3(HTTPProvider(rpc_server.url))
+    contract = web3.eth.contract(address=MANAGER_ADDRESS, abi=MANAGER_ABI)
+
+    def get_bounty(args):
+        if args[-1] == 1:
+            raise CallReverted('The node is incompliant')
+        if args[-1] == 2:
+            raise CallReverted()
+        return [True]
+
+    rpc_server.node.set_call_result(
+        contract.functions.getBounty(0)._encode_transaction_data()[:10], ['bool'], get_bounty)
+    batch = RpcBatch(web3)
+    for node_id in range(3):
+        batch.add_call(contract.functions.getBounty(node_id), sender=MANAGER_ADDRESS,
+                       allow_error=True)
+    batch.add_block('latest')
+    passed, incompliant, reverted, _ = batch.execute()
+
+    assert passed is True
+    assert isinstance(incompliant, RpcError)
+    assert revert_message(incompliant) == 'The node is incompliant'
+    assert classify_revert(incompliant) == RevertReason.INCOMPLIANT
+    assert classify_revert(reverted) == RevertReason.UNKNOWN
+    assert rpc_server.batches == 1
+
+    batch = RpcBatch(web3)
+    for node_id in range(2):
+        batch.add_estimate_gas(contract.functions.getBounty(node_id), sender=MANAGER_ADDRESS,
+                               allow_error=True)
+    gas, incompliant = batch.execute()
+    assert gas == GAS_ESTIMATE
+    assert classify_revert(incompliant) == RevertReason.INCOMPLIANT
+
+
+def test_classify_revert():
+    not_time = RpcError(-32000, 'execution reverted: Not time for bounty', None)
+    error_data = '0x08c379a0' + encode(['string'],
+                                       ['Node does not exist for Message sender']).hex()
+    nested = RpcError(3, 'execution reverted', {'data': error_data})
+    assert classify_revert(not_time) == RevertReason.NOT_TIME
+    assert classify_revert(nested) == RevertReason.NOT_NODE_OWNER
+    assert RevertReason.NOT_NODE_OWNER.delay > RevertReason.UNKNOWN.delay
@@ -0,0 +1,117 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import time
+from types import SimpleNamespace
+
+from skale.transactions.exceptions import TransactionFailedError, TransactionNotMinedError
+from skale.wallets import RedisWalletAdapter
+from skale.wallets.redis_wallet import RedisWalletDroppedError
+from web3 import HTTPProvider, Web3
+
+from tests.fake_rpc import START_NONCE, CallReverted
+from tools.receipt_tracker import ReceiptTracker
+from tools.submitter import ClaimSubmitter, PendingClaim
+
+
+class FakeRedis:
+    def __init__(self):
+        self.records = {}
+
+    def mget(self, keys):
+        return [self.records.get(key) for key in keys]
+
+
+def test_receipts_are_polled_in_one_batch(rpc_server, fake_skale):
+    def handle_transaction(sender, tx):
+        if tx['data'][-1] == 3:
+            raise CallReverted()
+        return []
+
+    rpc_server.node.transaction_handler = handle_transaction
+    submitter = ClaimSubmitter(fake_skale)
+    results = {}
+    tracker = ReceiptTracker(fake_skale, interval=60)
+    for node_id in range(5):
+        tracker.track(submitter.submit(node_id),
+                      lambda claim, tx_res, error: results.update({claim.node_id: (tx_res, error)}))
+    assert tracker.pending == 5
+
+    batches = rpc_server.batches
+    tracker.poll()
+    assert rpc_server.batches == batches + 1
+    assert tracker.pending == 0
+    assert all(results[node_id][0].receipt['status'] == 1 for node_id in (0, 1, 2, 4))
+    assert results[3][0] is None
+    assert isinstance(results[3][1], TransactionFailedError)
+    tracker.stop()
+
+
+def test_not_mined_claim_times_out(rpc_server, fake_skale):
+    results = []
+    submitter = ClaimSubmitter(fake_skale)
+    submitter.nonce_manager.allocate()
+    tracker = ReceiptTracker(fake_skale, interval=60, timeout=10,
+                             nonce_manager=submitter.nonce_manager)
+    tracker.track(PendingClaim(0, '0x' + '11' * 32, None, time.time()),
+                  lambda *result: results.append(result))
+    tracker.poll()
+    assert results == []
+    tracker.track(PendingClaim(1, '0x' + '22' * 32, None, time.time() - 11),
+                  lambda *result: results.append(result))
+    tracker.poll()
+    assert [claim.node_id for claim, _, _ in results] == [1]
+    assert isinstance(results[0][2], TransactionNotMinedError)
+    assert tracker.pending == 1
+    # the dropped nonce is reused
+    assert submitter.nonce_manager.allocate() == START_NONCE
+    assert rpc_server.node.calls['eth_getTransactionCount'] == 2
+    tracker.stop()
+
+
+def test_transaction_manager_records_are_resolved(rpc_server):
+    rpc_server.node.transaction_handler = lambda sender, tx: []
+    web3 = Web3(HTTPProvider(rpc_server.url))
+    wallet = RedisWalletAdapter.__new__(RedisWalletAdapter)
+    wallet.rs = FakeRedis()
+    tracker = ReceiptTracker(SimpleNamespace(web3=web3, wallet=wallet), interval=60)
+    results = {}
+    for tx_id in ('tx-mined', 'tx-dropped', 'tx-proposed'):
+        tracker.track(PendingClaim(0, tx_id, None, time.time()),
+                      lambda claim, tx_res, error: results.update({claim.tx_id: (tx_res, error)}))
+
+    tx_hash = '0x' + '33' * 32
+    rpc_server.node.receipts[tx_hash] = {
+        'transactionHash': tx_hash, 'transactionIndex': '0x0', 'blockHash': '0x' + '44' * 32,
+        'blockNumber': '0x1', 'from': '0x' + '55' * 20, 'to': '0x' + '66' * 20,
+        'cumulativeGasUsed': '0x1', 'gasUsed': '0x1', 'effectiveGasPrice': '0x1',
+        'contractAddress': None, 'status': '0x1', 'type': '0x1', 'logsBloom': '0x' + '00' * 256,
+        'logs': []
+    }
+    wallet.rs.records = {
+        b'tx-mined': json.dumps({'status': 'SUCCESS', 'tx_hash': tx_hash}),
+        b'tx-dropped': json.dumps({'status': 'DROPPED', 'tx_hash': None}),
+        b'tx-proposed': json.dumps({'status': 'PROPOSED', 'tx_hash': None})
+    }
+    tracker.poll()
+    assert results['tx-mined'][0].receipt['transactionHash'].hex().endswith('33' * 32)
+    assert isinstance(results['tx-dropped'][1], RedisWalletDroppedError)
+    assert tracker.pending == 1
+    tracker.stop()
@@ -0,0 +1,146 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+
+import pytest
+import requests
+from skale.transactions.exceptions import DryRunRevertError, TransactionNotMinedError
+
+from configs import BALANCE_CHECK_INTERVAL, JOB_RETRY_BASE, JOB_RETRY_MAX, PREFLIGHT_RETRY_DELAY
+from tools.exceptions import (CircuitOpenException, NodeNotFoundException,
+                              NotEnoughEthForTxException, NotTimeForBountyException)
+from tools.retry import (CircuitBreaker, ErrorKind, RetryBudget, RetryPolicy, TokenBucket,
+                         backoff_delay, classify, job_retry_delay)
+
+
+@pytest.mark.parametrize('err, kind', [
+    (requests.ConnectionError(), ErrorKind.TRANSIENT),
+    (TransactionNotMinedError(), ErrorKind.TRANSIENT),
+    (CircuitOpenException(1), ErrorKind.TRANSIENT),
+    (ValueError({'code': -32005, 'message': 'limit exceeded'}), ErrorKind.TRANSIENT),
+    (ValueError({'code': 3, 'message': 'execution reverted'}), ErrorKind.REVERT),
+    (DryRunRevertError('Not time for bounty'), ErrorKind.REVERT),
+    (NodeNotFoundException(), ErrorKind.CONFIG),
+    (NotEnoughEthForTxException('Balance is too low'), ErrorKind.FUNDS),
+    (KeyError('node_id'), ErrorKind.UNKNOWN)
+])
+def test_classify(err, kind):
+    assert classify(err) == kind
+
+
+def test_backoff_delay():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, 1, 30)
+        assert min(2 ** attempt, 30) / 2 <= delay <= min(2 ** attempt, 30)
+
+
+class FlakyCall:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'result'
+
+
+def test_retry_policy():
+    policy = RetryPolicy(attempts=3, base=0.01, cap=0.01, budget=RetryBudget(burst=10))
+    call = FlakyCall([requests.ConnectionError(), requests.Timeout()])
+    assert policy(call) == 'result'
+    assert call.calls == 3
+
+    call = FlakyCall([requests.ConnectionError()] * 3)
+    with pytest.raises(requests.ConnectionError):
+        policy(call)
+    assert call.calls == 3
+
+    call = FlakyCall([DryRunRevertError('reverted')])
+    with pytest.raises(DryRunRevertError):
+        policy(call)
+    assert call.calls == 1
+
+
+def test_retry_policy_async():
+    policy = RetryPolicy(attempts=3, base=0.01, cap=0.01, budget=RetryBudget(burst=10))
+    call = FlakyCall([requests.ConnectionError()])
+
+    async def flaky():
+        return call()
+
+    assert asyncio.run(policy.call_async(flaky)) == 'result'
+    assert call.calls == 2
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_rate=0, burst=1)
+    policy = RetryPolicy(attempts=10, base=0.01, cap=0.01, budget=budget)
+    call = FlakyCall([requests.ConnectionError()] * 5)
+    with pytest.raises(requests.ConnectionError):
+        policy(call)
+    assert call.calls == 2  # one token from the burst, the deposit does not make a whole one
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_token_bucket_refills_with_time():
+    now = [0]
+    bucket = TokenBucket(rate=0.5, burst=2, clock=lambda: now[0])
+    assert bucket.withdraw() and bucket.withdraw()
+    assert not bucket.available()
+    now[0] = 2
+    assert bucket.available()
+    bucket.take()
+    bucket.take()  # taking from an empty bucket does not make it negative
+    now[0] = 4
+    assert bucket.withdraw()
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker(threshold=2, base=10, cap=15)
+    breaker.failure()
+    assert not breaker.is_open
+    breaker.failure()
+    assert breaker.is_open
+    assert 9 < breaker.remaining() <= 10
+    breaker.failure()
+    assert 14 < breaker.remaining() <= 15
+    breaker.success()
+    assert not breaker.is_open
+    assert breaker.failures == 0
+
+
+def test_job_retry_delay():
+    budget = RetryBudget(min_rate=0, burst=2)
+    assert job_retry_delay(NotTimeForBountyException(3), 5, budget) == 3
+    assert job_retry_delay(NodeNotFoundException(), 0, budget) == PREFLIGHT_RETRY_DELAY
+    assert job_retry_delay(NotEnoughEthForTxException(), 0, budget) == BALANCE_CHECK_INTERVAL
+    assert JOB_RETRY_BASE / 2 <= job_retry_delay(requests.Timeout(), 0, budget) <= JOB_RETRY_BASE
+    assert job_retry_delay(CircuitOpenException(JOB_RETRY_MAX), 0, budget) == JOB_RETRY_MAX
+    # with the budget spent nodes back off one step longer, still not in lockstep
+    delays = {job_retry_delay(requests.Timeout(), 0, budget) for _ in range(10)}
+    assert all(JOB_RETRY_BASE <= delay <= 2 * JOB_RETRY_BASE for delay in delays)
+    assert len(delays) > 1
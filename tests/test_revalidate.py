@@ -0,0 +1,84 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+import bounty_agent
+from bounty_agent import BountyAgent, BountyAgentFleet
+from tests.fake_rpc import FLEET_SIZE
+
+
+@pytest.fixture
+def outdated_schedules(state_store):
+    """Saved schedules a day later than the reward dates on chain_server"""
+    saved_date = datetime.utcnow() + timedelta(days=1)
+    state_store.save_many({node_id: {'node_name': f'node-{node_id}', 'node_ip': '10.0.0.1',
+                                     'reward_date': saved_date, 'next_claim_at': saved_date}
+                           for node_id in range(FLEET_SIZE)})
+
+
+@pytest.fixture
+def retry_attempts(monkeypatch):
+    """Attempts of retried failures, retries wait 0.1 sec"""
+    attempts = []
+    monkeypatch.setattr(bounty_agent, 'job_retry_delay',
+                        lambda err, attempt: attempts.append(attempt) or 0.1)
+    return attempts
+
+
+def fail_once(fn):
+    failures = [requests.ConnectionError('The endpoint is down')]
+
+    def call(*args):
+        if failures:
+            raise failures.pop()
+        return fn(*args)
+    return call
+
+
+def test_agent_retries_revalidation(chain_server, chain_skale, outdated_schedules,
+                                    retry_attempts, monkeypatch):
+    monkeypatch.setattr(bounty_agent, 'check_if_node_is_registered',
+                        fail_once(bounty_agent.check_if_node_is_registered))
+    agent = BountyAgent(chain_skale, 0)
+    agent.run()
+    try:
+        # the outdated saved date is replaced only if the check is retried
+        assert chain_server.node.wait_for_claims(1) == 1
+    finally:
+        agent.shutdown()
+    assert retry_attempts == [0]
+    assert agent.failed_revalidations == 0
+
+
+def test_fleet_retries_revalidation(chain_server, chain_skale, outdated_schedules,
+                                    retry_attempts):
+    fleet = BountyAgentFleet(chain_skale, list(range(FLEET_SIZE)))
+    fleet.check_restored_nodes = fail_once(fleet.check_restored_nodes)
+    fleet.run()
+    try:
+        assert chain_server.node.wait_for_claims(FLEET_SIZE) == FLEET_SIZE
+    finally:
+        fleet.shutdown()
+    assert retry_attempts == [0]
+    assert fleet.failed_revalidations == 0
@@ -0,0 +1,78 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import asyncio
+
+import aiohttp
+import pytest
+from web3 import HTTPProvider, Web3
+
+from tests.fake_rpc import NODES_ABI, NODES_ADDRESS
+from tools.helper import RpcBatch
+
+REWARD_DATE = 1700000100
+
+
+def test_rpc_batch(rpc_server):
+    web3 = Web3(HTTPProvider(rpc_server.url))
+    contract = web3.eth.contract(address=NODES_ADDRESS,
+                                 abi=NODES_ABI)
+    reward_date_fn = contract.functions.getNodeNextRewardDate(1)
+    rpc_server.node.set_call_result(reward_date_fn._encode_transaction_data()[:10],
+                                    ['uint256'], [REWARD_DATE])
+
+    batch = RpcBatch(web3)
+    batch.add_call(reward_date_fn)
+    batch.add_block('latest')
+    reward_date, block = batch.execute()
+
+    assert reward_date == REWARD_DATE
+    assert block['number'] == rpc_server.node.block_number
+    assert block['timestamp'] == rpc_server.node.block_timestamp
+    assert rpc_server.batches == 1
+
+
+def test_rpc_batch_error(rpc_server):
+    web3 = Web3(HTTPProvider(rpc_server.url))
+    contract = web3.eth.contract(address=NODES_ADDRESS,
+                                 abi=NODES_ABI)
+    batch = RpcBatch(web3)
+    batch.add_block(5)
+    batch.add_call(contract.functions.getNodeNextRewardDate(2))
+    with pytest.raises(ValueError):
+        batch.execute()
+
+
+def test_rpc_batch_async(rpc_server):
+    web3 = Web3(HTTPProvider(rpc_server.url))
+    contract = web3.eth.contract(address=NODES_ADDRESS,
+                                 abi=NODES_ABI)
+    reward_date_fn = contract.functions.getNodeNextRewardDate(1)
+    rpc_server.node.set_call_result(reward_date_fn._encode_transaction_data()[:10],
+                                    ['uint256'], [REWARD_DATE])
+
+    async def execute():
+        async with aiohttp.ClientSession() as session:
+            return await RpcBatch(web3).add_call(reward_date_fn).add_block().execute_async(
+                session)
+
+    reward_date, block = asyncio.run(execute())
+    assert reward_date == REWARD_DATE
+    assert block['number'] == rpc_server.node.block_number
+    assert rpc_server.batches == 1
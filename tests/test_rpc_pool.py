@@ -0,0 +1,126 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+
+import aiohttp
+import pytest
+import requests
+from web3 import Web3
+
+from configs import RPC_BACKOFF_BASE
+from tests.fake_rpc import FakeNode, FakeRpcServer
+from tools.exceptions import CircuitOpenException
+from tools.helper import RpcBatch
+from tools.rpc_pool import RpcPool
+
+
+@pytest.fixture
+def servers():
+    servers = [FakeRpcServer(FakeNode(latency=0.05)).start(), FakeRpcServer().start()]
+    yield servers
+    for server in servers:
+        try:
+            server.stop()
+        except OSError:
+            pass
+
+
+def test_routes_to_fastest_endpoint(servers):
+    slow, fast = servers
+    pool = RpcPool([slow.url, fast.url], probe_interval=60)
+    pool.probe()
+    assert pool.select().url == fast.url
+
+    web3 = Web3(pool)
+    requests_before = slow.http_requests
+    for _ in range(5):
+        assert web3.eth.block_number == fast.node.block_number
+    assert slow.http_requests == requests_before
+    pool.stop()
+
+
+def test_lagging_endpoint_is_not_used(servers):
+    slow, fast = servers
+    fast.node.block_number = slow.node.block_number - 100
+    pool = RpcPool([slow.url, fast.url], probe_interval=60)
+    pool.probe()
+    assert pool.select().url == slow.url
+    pool.stop()
+
+
+def test_probe_survives_bad_response(servers):
+    good, bad = servers
+    bad.node.handle = lambda request: {'jsonrpc': '2.0', 'id': request['id'], 'result': None}
+    pool = RpcPool([good.url, bad.url], probe_interval=60)
+    pool.probe()
+    assert pool.endpoints[1].failures == 1
+    assert pool.select().url == good.url
+    pool.stop()
+
+
+def test_failover(servers):
+    broken, working = servers
+    broken.stop()
+    pool = RpcPool([broken.url, working.url], probe_interval=60)
+    web3 = Web3(pool)
+    assert web3.eth.block_number == working.node.block_number
+    assert pool.endpoints[0].failures == 1
+    assert pool.select().url == working.url
+
+    batch = RpcBatch(web3).add_block('latest')
+    block, = batch.execute()
+    assert block['number'] == working.node.block_number
+
+    working.stop()
+    with pytest.raises(CircuitOpenException):  # web3 retries once both breakers are open
+        web3.eth.block_number
+    pool.stop()
+
+
+def test_circuit_breaker(servers):
+    _, server = servers
+    pool = RpcPool([server.url], probe_interval=60)
+    endpoint = pool.endpoints[0]
+    pool.record(endpoint, error=requests.ConnectionError())
+    with pytest.raises(CircuitOpenException) as err:
+        pool.post(b'{}')
+    assert 0 < err.value.delay <= RPC_BACKOFF_BASE
+    assert server.http_requests == 0
+
+    pool.probe()  # probes reach endpoints with open breakers
+    assert not endpoint.breaker.is_open
+    assert pool.select() is endpoint
+    pool.stop()
+
+
+def test_async_failover(servers):
+    broken, working = servers
+    broken.stop()
+    pool = RpcPool([broken.url, working.url], probe_interval=60)
+
+    async def execute():
+        async with aiohttp.ClientSession() as session:
+            return await RpcBatch(Web3(pool)).add_block('latest').execute_async(session)
+
+    block, = asyncio.run(execute())
+    assert block['number'] == working.node.block_number
+    assert pool.endpoints[0].failures == 1
+    pool.stop()
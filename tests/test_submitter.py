@@ -0,0 +1,81 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from eth_abi import decode
+from skale.transactions.exceptions import TransactionFailedError
+
+from tests.fake_rpc import START_NONCE, CallReverted
+from tools.receipt_tracker import ReceiptTracker
+from tools.submitter import ClaimSubmitter
+
+
+def test_concurrent_claims_get_unique_nonces(rpc_server, fake_skale):
+    sent = []
+
+    def handle_transaction(sender, tx):
+        sent.append((tx['nonce'], decode(['uint256'], tx['data'][4:])[0]))
+        if tx['nonce'] == START_NONCE + 3:
+            raise CallReverted()
+        return []
+
+    rpc_server.node.transaction_handler = handle_transaction
+    submitter = ClaimSubmitter(fake_skale)
+    with ThreadPoolExecutor(8) as executor:
+        claims = list(executor.map(submitter.submit, range(20)))
+
+    assert sorted(nonce for nonce, _ in sent) == list(range(START_NONCE, START_NONCE + 20))
+    assert sorted(node_id for _, node_id in sent) == list(range(20))
+    assert rpc_server.node.calls['eth_getTransactionCount'] == 1
+    assert [claim.node_id for claim in claims] == list(range(20))
+
+    failed_node = next(node_id for nonce, node_id in sent if nonce == START_NONCE + 3)
+    results = {}
+    tracker = ReceiptTracker(fake_skale, interval=60)
+    for claim in claims:
+        tracker.track(claim, lambda claim, tx_res, error: results.update(
+            {claim.node_id: (tx_res, error)}))
+    tracker.poll()
+    for node_id, (tx_res, error) in results.items():
+        if node_id == failed_node:
+            assert isinstance(error, TransactionFailedError)
+        else:
+            assert tx_res.receipt['status'] == 1
+    assert len(results) == 20
+    tracker.stop()
+
+
+def test_nonce_is_read_again_after_failed_send(rpc_server, fake_skale):
+    submitter = ClaimSubmitter(fake_skale)
+    with pytest.raises(Exception):
+        submitter.submit(0)  # the fake node rejects raw transactions without a handler
+    rpc_server.node.transaction_handler = lambda sender, tx: []
+    submitter.submit(0)
+    assert rpc_server.node.calls['eth_getTransactionCount'] == 2
+    assert rpc_server.node.nonces[fake_skale.wallet.address] == START_NONCE + 1
+
+
+def test_preflight_gas_estimate_skips_dry_run(rpc_server, fake_skale):
+    gas_limits = []
+    rpc_server.node.transaction_handler = lambda sender, tx: gas_limits.append(tx['gas']) or []
+    ClaimSubmitter(fake_skale).submit(0, gas_estimate=100000)
+    assert gas_limits == [120000]
+    assert 'eth_estimateGas' not in rpc_server.node.calls
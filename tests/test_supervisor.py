@@ -0,0 +1,122 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+from unittest import mock
+
+import tools.supervisor
+from tools.exceptions import CircuitOpenException
+from tools.supervisor import Supervisor, restart_delay
+
+
+class FakeProvider:
+    def __init__(self):
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+
+class FakeSkale:
+    def __init__(self):
+        self.web3 = mock.Mock(provider=FakeProvider())
+
+
+class FakeAgent:
+    def __init__(self, skale, fail=False):
+        self.skale = skale
+        self.fail = fail
+        self.stopped = threading.Event()
+        self.is_shut_down = False
+
+    def run(self):
+        if self.fail:
+            raise RuntimeError('Cannot start agent')
+
+    def stop(self):
+        self.stopped.set()
+
+    def shutdown(self):
+        self.stop()
+        self.is_shut_down = True
+
+
+def test_restart_delay():
+    for attempt in range(20):
+        assert 0 <= restart_delay(attempt, base=1, cap=30) <= min(30, 2 ** attempt)
+
+
+def test_supervisor_keeps_healthy_connection():
+    skales = []
+    agents = []
+    healthy = {'value': True}
+
+    def skale_factory():
+        healthy['value'] = True
+        skales.append(FakeSkale())
+        return skales[-1]
+
+    def agent_factory(skale):
+        agents.append(FakeAgent(skale, fail=len(agents) in (1, 3)))
+        if len(agents) == 5:
+            supervisor.stop()
+        else:
+            agents[-1].stopped.set()
+        if len(agents) == 3:
+            healthy['value'] = False
+        return agents[-1]
+
+    supervisor = Supervisor(skale_factory, agent_factory,
+                            health_check=lambda skale: healthy['value'])
+    with mock.patch.object(tools.supervisor, 'restart_delay', return_value=0):
+        supervisor.run()
+
+    assert len(agents) == 5
+    assert all(agent.is_shut_down for agent in agents)
+    assert len(skales) == 2
+    assert [agent.skale for agent in agents] == [skales[0]] * 3 + [skales[1]] * 2
+    assert [skale.web3.provider.stopped for skale in skales] == [True, False]
+    assert supervisor.failures == 0
+
+
+def test_supervisor_waits_for_open_circuits():
+    skales = []
+    agents = []
+
+    def skale_factory():
+        skales.append(FakeSkale())
+        return skales[-1]
+
+    def agent_factory(skale):
+        agents.append(FakeAgent(skale))
+        if len(agents) == 2:
+            supervisor.stop()
+        else:
+            agents[-1].stopped.set()
+        return agents[-1]
+
+    def health_check(skale):
+        raise CircuitOpenException(0.01, 'All endpoints back off')
+
+    supervisor = Supervisor(skale_factory, agent_factory, health_check=health_check)
+    supervisor.run()
+
+    assert len(agents) == 2
+    assert len(skales) == 1
+    assert not skales[0].web3.provider.stopped
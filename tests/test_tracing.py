@@ -0,0 +1,76 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import json
+import os
+import time
+
+import pytest
+
+from tools.tracing import Tracer
+
+
+def busy_wait(seconds):
+    finish = time.monotonic() + seconds
+    while time.monotonic() < finish:
+        pass
+
+
+def test_tracer_writes_chrome_trace(tmp_path):
+    filepath = os.path.join(tmp_path, 'trace.json')
+    tracer = Tracer(filepath)
+    with tracer.span('job', node_id=1):
+        with tracer.span('get_bounty'):
+            pass
+    with pytest.raises(ValueError):
+        with tracer.span('job', node_id=1):
+            raise ValueError()
+    tracer.flush()
+    tracer.flush()
+
+    with open(filepath) as trace_file:
+        events = json.loads(trace_file.read().rstrip().rstrip(',') + ']')
+    assert [event['name'] for event in events] == ['get_bounty', 'job', 'job']
+    assert all(event['ph'] == 'X' for event in events)
+    assert events[0]['ts'] >= events[1]['ts']
+    assert events[1]['dur'] >= events[0]['dur']
+    assert events[1]['args'] == {'node_id': 1}
+    assert events[2]['args'] == {'node_id': 1, 'error': 'ValueError'}
+
+
+def test_disabled_tracer(tmp_path):
+    tracer = Tracer()
+    with tracer.span('job'), tracer.profile('job'):
+        pass
+    tracer.flush()
+    assert os.listdir(tmp_path) == []
+
+
+def test_profile_single_job(tmp_path):
+    filepath = os.path.join(tmp_path, 'trace.json')
+    tracer = Tracer(filepath, profile_jobs=1)
+    with tracer.profile('job'):
+        busy_wait(0.1)
+    with tracer.profile('job'):
+        busy_wait(0.01)
+
+    profiles = [name for name in os.listdir(tmp_path) if name.endswith('.folded')]
+    assert len(profiles) == 1
+    with open(os.path.join(tmp_path, profiles[0])) as profile_file:
+        assert 'busy_wait' in profile_file.read()
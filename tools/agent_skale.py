@@ -0,0 +1,98 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import hashlib
+import json
+import logging
+import os
+
+from skale import Skale
+from skale.contracts.contract_manager import ContractManager
+from skale.skale_manager import CONTRACTS_INFO
+from skale.utils.abi_utils import get_abi_key_name, get_address_key_name
+from skale.utils.helper import get_contracts_info
+
+from configs import ABI_CACHE_FOLDER
+
+logger = logging.getLogger(__name__)
+
+AGENT_CONTRACTS = ('manager', 'nodes')
+AGENT_CONTRACTS_INFO = get_contracts_info(
+    [info for info in CONTRACTS_INFO if info.name in AGENT_CONTRACTS])
+
+
+def abi_keys(contract_names):
+    keys = [get_address_key_name('contract_manager'), get_abi_key_name('contract_manager')]
+    for name in contract_names:
+        keys.extend((get_address_key_name(name), get_abi_key_name(name)))
+    return keys
+
+
+def load_agent_abi(abi_filepath, contract_names=AGENT_CONTRACTS, cache_folder=ABI_CACHE_FOLDER):
+    """
+    Returns the part of the ABI file used by the agent. It is cached as JSON keyed
+    by the file hash, so the full file is parsed only when it changes.
+    """
+    with open(abi_filepath, 'rb') as abi_file:
+        raw_abi = abi_file.read()
+    digest = hashlib.sha256(raw_abi).hexdigest()
+    cache_path = os.path.join(cache_folder, f'abi-{digest}.json')
+    try:
+        with open(cache_path) as cache_file:
+            return json.load(cache_file)
+    except FileNotFoundError:
+        pass
+    except Exception as err:
+        logger.warning(f'Cannot read ABI cache {cache_path}: {err}')
+
+    abi = json.loads(raw_abi)
+    agent_abi = {key: abi[key] for key in abi_keys(contract_names) if key in abi}
+    try:
+        os.makedirs(cache_folder, exist_ok=True)
+        tmp_path = f'{cache_path}.tmp'
+        with open(tmp_path, 'w') as cache_file:
+            json.dump(agent_abi, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError as err:
+        logger.warning(f'Cannot save ABI cache {cache_path}: {err}')
+    return agent_abi
+
+
+class AgentSkale(Skale):
+    """
+    Skale that knows only the contracts used by the agent and creates them on first
+    access from the cached ABI subset instead of re-reading the ABI file.
+    """
+    abi_cache_folder = ABI_CACHE_FOLDER
+
+    def set_contracts_info(self):
+        self._agent_abi = load_agent_abi(self._abi_filepath, cache_folder=self.abi_cache_folder)
+        self.add_lib_contract('contract_manager', ContractManager, self._agent_abi)
+
+    def add_contract(self, name, contract):
+        super().add_contract(name, contract)
+        if name in AGENT_CONTRACTS_INFO:
+            # an instance attribute, so the next lookups do not reach __getattr__
+            setattr(self, name, contract)
+
+    def __getattr__(self, name):
+        if name in AGENT_CONTRACTS_INFO:
+            self.init_upgradeable_contract(AGENT_CONTRACTS_INFO[name], self._agent_abi)
+            return getattr(self, name)
+        return super().__getattr__(name)
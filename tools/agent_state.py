@@ -0,0 +1,153 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Schedule of every node saved in a local SQLite database, so a restarted agent resumes
+it from disk instead of reading it from SKALE Manager before the first job.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from peewee import CharField, DateTimeField, IntegerField, Model, SqliteDatabase, TextField
+
+from configs.db import AGENT_STATE_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class NodeState(Model):
+    node_id = IntegerField(primary_key=True)
+    node_name = CharField(null=True)
+    node_ip = CharField(null=True)
+    reward_date = DateTimeField(null=True)  # last known, from SKALE Manager
+    next_claim_at = DateTimeField(null=True)  # local UTC time of the next job
+    pending_claims = TextField(default='[]')  # JSON list of [tx_id, sent_at]
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    class Meta:
+        table_name = 'node_states'
+
+
+class SavedClaim(NamedTuple):
+    tx_id: str
+    sent_at: float
+
+
+class SavedState(NamedTuple):
+    node_name: Optional[str]
+    node_ip: Optional[str]
+    reward_date: Optional[datetime]
+    next_claim_at: Optional[datetime]
+    pending_claims: list  # of SavedClaim
+
+    @property
+    def has_node_info(self) -> bool:
+        return self.node_name is not None and self.node_ip is not None
+
+    @property
+    def has_schedule(self) -> bool:
+        return self.next_claim_at is not None or bool(self.pending_claims)
+
+
+class StateStore:
+    """
+    Keeps node info, the last known reward date, the time of the next job and the
+    claims waiting for receipts per node. Writes are small upserts, made when the
+    schedule changes.
+    """
+
+    def __init__(self, path=None):
+        # a write lost on power failure only costs a read from SKALE Manager on restart
+        self.database = SqliteDatabase(path or AGENT_STATE_DB_PATH,
+                                       pragmas={'journal_mode': 'wal', 'synchronous': 'normal'})
+        self.database.bind([NodeState])
+        with self.database.connection_context():
+            self.database.create_tables([NodeState], safe=True)
+        self._lock = threading.Lock()
+
+    def load(self, node_ids) -> dict:
+        """Returns SavedState by node ID, nodes without a saved state are skipped."""
+        states = {}
+        with self.database.connection_context():
+            for chunk_start in range(0, len(node_ids), 500):
+                chunk = node_ids[chunk_start:chunk_start + 500]
+                for row in NodeState.select().where(NodeState.node_id.in_(chunk)):
+                    claims = [SavedClaim(*claim) for claim in json.loads(row.pending_claims)]
+                    states[row.node_id] = SavedState(row.node_name, row.node_ip,
+                                                     row.reward_date, row.next_claim_at, claims)
+        return states
+
+    def save(self, node_id, **fields) -> None:
+        fields['updated_at'] = datetime.utcnow()
+        with self._lock, self.database.connection_context():
+            NodeState.insert(node_id=node_id, **fields).on_conflict(
+                conflict_target=[NodeState.node_id], update=fields).execute()
+
+    def save_many(self, fields_by_node) -> None:
+        """Saves the fields of many nodes in one transaction."""
+        updated_at = datetime.utcnow()
+        with self._lock, self.database.connection_context(), self.database.atomic():
+            for node_id, fields in fields_by_node.items():
+                fields = dict(fields, updated_at=updated_at)
+                NodeState.insert(node_id=node_id, **fields).on_conflict(
+                    conflict_target=[NodeState.node_id], update=fields).execute()
+
+    def _update_claims(self, node_id, update):
+        with self._lock, self.database.connection_context(), self.database.atomic():
+            row = NodeState.get_or_none(NodeState.node_id == node_id)
+            claims = json.loads(row.pending_claims) if row is not None else []
+            claims = update(claims)
+            NodeState.insert(node_id=node_id, pending_claims=json.dumps(claims),
+                             updated_at=datetime.utcnow()).on_conflict(
+                conflict_target=[NodeState.node_id],
+                update={NodeState.pending_claims: json.dumps(claims),
+                        NodeState.updated_at: datetime.utcnow()}).execute()
+
+    def add_claim(self, node_id, tx_id, sent_at) -> None:
+        self._update_claims(node_id, lambda claims: claims + [[tx_id, sent_at]])
+
+    def remove_claim(self, node_id, tx_id) -> None:
+        self._update_claims(node_id,
+                            lambda claims: [claim for claim in claims if claim[0] != tx_id])
+
+    def delete(self, node_id) -> None:
+        with self._lock, self.database.connection_context():
+            NodeState.delete().where(NodeState.node_id == node_id).execute()
+
+
+_state_store = None
+_state_store_lock = threading.Lock()
+
+
+def get_state_store():
+    """Returns the process-wide state store, None if the database cannot be opened."""
+    global _state_store
+    with _state_store_lock:
+        if _state_store is None:
+            try:
+                _state_store = StateStore()
+            except Exception as err:
+                logger.warning(f'Agent state is not saved: {err}')
+                return None
+        return _state_store
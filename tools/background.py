@@ -0,0 +1,97 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Bounded queue processed in batches by a daemon thread, shared by the ledger,
+notifications and queued logging.
+"""
+
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueue:
+    """
+    Items are put without blocking and processed in batches of up to `batch_size` by
+    a background thread. When the queue is full new items are dropped. An error of a
+    batch is passed to `_failed` and the thread goes on with the next one.
+
+    Subclasses implement `_process(batch)`, and may override `_dropped(item)` and
+    `_failed(batch, err)`.
+    """
+
+    def __init__(self, name, max_size, batch_size=1, flush_timeout=None):
+        self.batch_size = batch_size
+        self.flush_timeout = flush_timeout
+        self.queue = queue.Queue(maxsize=max_size)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, item) -> bool:
+        """Queues the item, returns False if it is dropped because the queue is full."""
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self._dropped(item)
+            return False
+        return True
+
+    def flush(self, timeout=None) -> bool:
+        """Waits until all queued items are processed, returns False on timeout."""
+        if timeout is None:
+            timeout = self.flush_timeout
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(
+                lambda: not self.queue.unfinished_tasks, timeout)
+
+    def _next_batch(self) -> list:
+        batch = [self.queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._process(batch)
+            except Exception as err:
+                try:
+                    self._failed(batch, err)
+                except Exception:
+                    logger.exception(f'Cannot handle the error of {self._thread.name} queue')
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _process(self, batch):
+        raise NotImplementedError
+
+    def _dropped(self, item):
+        logger.warning(f'{self._thread.name} queue is full, item dropped')
+
+    def _failed(self, batch, err):
+        logger.exception(f'Cannot process {len(batch)} items of {self._thread.name} queue: {err}')
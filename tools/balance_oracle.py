@@ -0,0 +1,116 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Cached wallet balance and gas price, refreshed in the background."""
+
+import logging
+import threading
+import time
+
+from skale.utils.constants import GAS_PRICE_COEFFICIENT
+
+from configs import BALANCE_CHECK_INTERVAL, BOUNTY_GAS_ESTIMATE, MIN_ETH_AMOUNT
+from tools.exceptions import NotEnoughEthForTxException
+from tools.helper import MsgIcon, RpcBatch, call_retry
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceOracle:
+    """
+    Reads the wallet balance and gas price with one JSON-RPC batch every interval,
+    so the claim path answers from cache. Sends a warning once the balance cannot
+    cover a claim of every served node, and again only after it was topped up.
+    """
+
+    def __init__(self, skale, notifier=None, claims_per_epoch=1,
+                 interval=BALANCE_CHECK_INTERVAL):
+        self.skale = skale
+        self.notifier = notifier
+        self.claims_per_epoch = claims_per_epoch
+        self.interval = interval
+        self.gas_estimate = BOUNTY_GAS_ESTIMATE
+        self.balance = None
+        self.gas_price = None  # with the same coefficient skale.py applies
+        self.updated_at = None
+        self._warned = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Starts refreshing in the background, the first refresh runs at once."""
+        self._thread = threading.Thread(target=self._run, name='balance-oracle', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as err:
+                logger.warning(f'Cannot refresh wallet balance: {err}')
+            if self._stopped.wait(self.interval):
+                return
+
+    def refresh(self) -> None:
+        batch = RpcBatch(self.skale.web3)
+        batch.add_quantity('eth_getBalance', [self.skale.wallet.address, 'latest'])
+        batch.add_quantity('eth_gasPrice')
+        balance, gas_price = call_retry(batch.execute)
+        with self._lock:
+            self.balance = balance
+            self.gas_price = gas_price * GAS_PRICE_COEFFICIENT
+            self.updated_at = time.time()
+        self._check_low_balance()
+
+    def observe_gas(self, gas_limit) -> None:
+        """Updates the gas estimate of a claim with the result of a dry run."""
+        self.gas_estimate = gas_limit
+
+    def claim_cost(self) -> int:
+        return max(self.gas_estimate * self.gas_price, MIN_ETH_AMOUNT)
+
+    def check(self) -> None:
+        """Raises NotEnoughEthForTxException if the cached balance cannot pay for a claim."""
+        if self.balance is None:
+            self.refresh()
+        cost = self.claim_cost()
+        if self.balance < cost:
+            raise NotEnoughEthForTxException(
+                f'Wallet {self.skale.wallet.address} balance is {self.balance} wei, '
+                f'a claim needs {cost} wei')
+
+    def _check_low_balance(self):
+        required = self.claim_cost() * self.claims_per_epoch
+        if self.balance >= required:
+            self._warned = False
+            return
+        if self._warned:
+            return
+        self._warned = True
+        message = (f'Wallet balance is low: {self.skale.web3.from_wei(self.balance, "ether")} '
+                   f'ETH, {self.claims_per_epoch} claims need about '
+                   f'{self.skale.web3.from_wei(required, "ether")} ETH')
+        logger.warning(message)
+        if self.notifier is not None:
+            self.notifier.send(message, MsgIcon.WARNING)
@@ -0,0 +1,79 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from configs import (BLOCK_HISTORY_SIZE, DEFAULT_BLOCK_INTERVAL, MIN_POLL_INTERVAL,
+                     RETRY_INTERVAL)
+
+
+class BlockClock:
+    """
+    Estimates chain time from recently observed block headers: the offset between
+    block timestamps and the local clock, and the average block interval.
+    """
+
+    def __init__(self, history_size=BLOCK_HISTORY_SIZE):
+        self._headers = deque(maxlen=history_size)  # (number, timestamp, local time)
+        self._lock = threading.Lock()
+
+    def observe(self, block) -> None:
+        with self._lock:
+            if self._headers and self._headers[-1][0] >= block['number']:
+                return
+            self._headers.append((block['number'], block['timestamp'], time.time()))
+
+    @property
+    def offset(self) -> float:
+        """Chain time minus local time, 0 if no blocks were observed."""
+        with self._lock:
+            if not self._headers:
+                return 0
+            # A block is seen some time after it was produced, so the largest
+            # difference is the closest to the real offset
+            return max(timestamp - seen_at for _, timestamp, seen_at in self._headers)
+
+    @property
+    def block_interval(self) -> float:
+        with self._lock:
+            if len(self._headers) < 2:
+                return DEFAULT_BLOCK_INTERVAL
+            first, last = self._headers[0], self._headers[-1]
+            return (last[1] - first[1]) / (last[0] - first[0])
+
+    def local_timestamp(self, chain_date: datetime) -> float:
+        """Local time when the chain is expected to reach the given naive UTC date."""
+        return chain_date.replace(tzinfo=timezone.utc).timestamp() - self.offset
+
+    def local_date(self, chain_date: datetime) -> datetime:
+        return datetime.utcfromtimestamp(self.local_timestamp(chain_date))
+
+    def poll_delay(self, chain_date: datetime) -> float:
+        """
+        Seconds to wait before checking for the first block with a timestamp at or after
+        chain_date: sleep until the chain is expected to reach it, then poll twice
+        per block interval.
+        """
+        remaining = self.local_timestamp(chain_date) - time.time()
+        if remaining <= 0:
+            remaining = self.block_interval / 2
+        return min(max(remaining, MIN_POLL_INTERVAL), RETRY_INTERVAL)
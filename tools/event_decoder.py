@@ -0,0 +1,117 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Decoder of a single contract event from receipt logs."""
+
+from eth_abi import decode
+from eth_utils import keccak, to_checksum_address
+from hexbytes import HexBytes
+
+WORD_SIZE = 32
+
+
+def to_bytes(value) -> bytes:
+    return value if isinstance(value, bytes) else bytes(HexBytes(value))
+
+
+def make_word_decoder(abi_type):
+    """Returns a decoder of one 32-byte word of a static ABI type."""
+    if abi_type.startswith('uint'):
+        return lambda word: int.from_bytes(word, 'big')
+    if abi_type.startswith('int'):
+        return lambda word: int.from_bytes(word, 'big', signed=True)
+    if abi_type == 'address':
+        return lambda word: to_checksum_address(word[12:])
+    if abi_type == 'bool':
+        return lambda word: word[-1] == 1
+    return lambda word: decode([abi_type], word)[0]
+
+
+def is_static(abi_type):
+    return abi_type not in ('bytes', 'string') and '[' not in abi_type and \
+        not abi_type.startswith('tuple')
+
+
+class EventDecoder:
+    """
+    Decodes one event of a contract. The topic hash and field decoders are built once;
+    logs are matched by address and topic0 before anything is decoded, and only the
+    requested fields are read: indexed ones from topics, static ones from their data
+    word.
+
+    Usage:
+        decoder = EventDecoder(skale.manager.contract, 'BountyReceived',
+                               ('nodeIndex', 'bounty'))
+        events = decoder.decode_receipt(receipt)  # [{'nodeIndex': 1, 'bounty': ...}]
+    """
+
+    def __init__(self, contract, event_name, fields=None):
+        event_abi = next(item for item in contract.abi
+                         if item['type'] == 'event' and item['name'] == event_name)
+        inputs = event_abi['inputs']
+        signature = f'{event_name}({",".join(item["type"] for item in inputs)})'
+        self.topic = keccak(text=signature)
+        self.address = to_bytes(contract.address)
+        fields = fields or [item['name'] for item in inputs]
+        data_types = [item['type'] for item in inputs if not item['indexed']]
+        self._data_decoder = None
+        self._field_decoders = []  # (name, topic index or None, data word index or None, decoder)
+        topic_index = 1
+        data_index = 0
+        for item in inputs:
+            if item['indexed']:
+                position = (topic_index, None)
+                topic_index += 1
+            else:
+                position = (None, data_index)
+                data_index += 1
+            if item['name'] not in fields:
+                continue
+            if position[1] is not None and not all(is_static(t) for t in data_types):
+                self._data_decoder = data_types  # dynamic data is decoded as a whole
+            self._field_decoders.append((item['name'], *position, make_word_decoder(item['type'])))
+
+    def matches(self, log) -> bool:
+        topics = log['topics']
+        return bool(topics) and to_bytes(topics[0]) == self.topic and \
+            to_bytes(log['address']) == self.address
+
+    def decode_log(self, log) -> dict:
+        topics = log['topics']
+        data = to_bytes(log['data'])
+        values = decode(self._data_decoder, data) if self._data_decoder else None
+        event = {}
+        for name, topic_index, data_index, decode_word in self._field_decoders:
+            if topic_index is not None:
+                event[name] = decode_word(to_bytes(topics[topic_index]))
+            elif values is not None:
+                event[name] = values[data_index]
+            else:
+                offset = data_index * WORD_SIZE
+                event[name] = decode_word(data[offset:offset + WORD_SIZE])
+        return event
+
+    def decode_receipt(self, receipt) -> list:
+        """Returns the decoded events of the receipt, logs of other events are skipped."""
+        return [self.decode_log(log) for log in receipt['logs'] if self.matches(log)]
+
+    def decode_receipts(self, receipts) -> list:
+        """Returns the decoded events of every receipt, in the order of receipts."""
+        return [self.decode_receipt(receipt) for receipt in receipts]
@@ -21,6 +21,19 @@
 class NotTimeForBountyException(Exception):
     """Raised when reward date has come but current block's timestamp is less than reward date."""
 
+    def __init__(self, delay, *args):
+        super().__init__(*args)
+        self.delay = delay  # seconds to wait before the next check
+
+
+class PreflightFailedException(Exception):
+    """Raised when a simulated getBounty call reverts, so the claim is not sent."""
+
+    def __init__(self, reason, delay, *args):
+        super().__init__(*args)
+        self.reason = reason
+        self.delay = delay  # seconds to wait before the next claim attempt
+
 
 class NodeNotFoundException(Exception):
     """Raised when Node ID doesn't exist in SKALE Manager."""
@@ -28,3 +41,11 @@ class NodeNotFoundException(Exception):
 
 class NotEnoughEthForTxException(Exception):
     """Raised when a wallet balance is too low to send a transaction."""
+
+
+class CircuitOpenException(Exception):
+    """Raised instead of sending a request when circuit breakers of all endpoints are open."""
+
+    def __init__(self, delay, *args):
+        super().__init__(*args)
+        self.delay = delay  # seconds until an endpoint can be tried again
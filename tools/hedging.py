@@ -0,0 +1,87 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Policy of hedged reads: if a read has not been answered within a high percentile of
+recent read latencies, the same read is sent again and the first answer wins.
+"""
+
+import threading
+from collections import deque
+
+from configs import (RPC_HEDGE_BURST, RPC_HEDGE_MAX_RATIO, RPC_HEDGE_MIN_DELAY,
+                     RPC_HEDGE_MIN_SAMPLES, RPC_HEDGE_PERCENTILE, RPC_HEDGE_WINDOW)
+from tools.metrics import REGISTRY
+from tools.retry import TokenBucket
+
+RPC_HEDGES = REGISTRY.counter(
+    'bounty_agent_rpc_hedges_total', 'Hedged reads by the request that answered first',
+    ['winner'])
+RPC_HEDGE_DELAY = REGISTRY.gauge(
+    'bounty_agent_rpc_hedge_delay_seconds', 'Current delay before a read is hedged')
+RPC_READ_LATENCY = REGISTRY.histogram(
+    'bounty_agent_rpc_read_latency_seconds',
+    'Latency of hedgeable reads: of the first request alone and as seen by the caller',
+    ['request'])
+
+
+class HedgePolicy:
+    """
+    The hedge delay is the RPC_HEDGE_PERCENTILE of the latest first-request latencies.
+    Extra load is capped by a token bucket: every read adds RPC_HEDGE_MAX_RATIO of a
+    token, up to RPC_HEDGE_BURST, and every hedge takes one.
+    """
+
+    def __init__(self, percentile=RPC_HEDGE_PERCENTILE, min_delay=RPC_HEDGE_MIN_DELAY,
+                 max_ratio=RPC_HEDGE_MAX_RATIO, burst=RPC_HEDGE_BURST):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self._latencies = deque(maxlen=RPC_HEDGE_WINDOW)
+        self._tokens = TokenBucket(0, burst)
+        self._lock = threading.Lock()
+
+    def observe(self, latency, succeeded=True):
+        """Records the latency of a first request."""
+        RPC_READ_LATENCY.observe(latency, 'primary')
+        if succeeded:
+            with self._lock:
+                self._latencies.append(latency)
+
+    def delay(self):
+        """Returns seconds to wait before hedging a new read, None if it is not hedged."""
+        self._tokens.deposit(self.max_ratio)
+        with self._lock:
+            if len(self._latencies) < RPC_HEDGE_MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        delay = max(latencies[min(int(len(latencies) * self.percentile), len(latencies) - 1)],
+                    self.min_delay)
+        RPC_HEDGE_DELAY.set(delay)
+        return delay
+
+    def acquire(self) -> bool:
+        """Takes a token for a hedge, False if the extra load limit is reached."""
+        return self._tokens.withdraw()
+
+    def answered(self, latency, hedged, winner=None):
+        RPC_READ_LATENCY.observe(latency, 'effective')
+        if hedged:
+            RPC_HEDGES.inc(winner)
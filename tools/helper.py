@@ -17,21 +17,40 @@
 #   You should have received a copy of the GNU Affero General Public License
 #   along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import asyncio
+import atexit
 import json
 import logging
 import re
+import threading
+import time
 from enum import Enum
+from typing import NamedTuple, Optional
 
 import redis
 import requests
-import tenacity
-from skale import Skale
-from skale.utils.web3_utils import init_web3
+from hexbytes import HexBytes
+from skale.utils.web3_utils import DEFAULT_HTTP_TIMEOUT, init_web3
 from skale.wallets import RedisWalletAdapter, SgxWallet
+from web3 import HTTPProvider
+from web3._utils.abi import get_abi_output_types
+from web3._utils.method_formatters import receipt_formatter
+from web3._utils.request import make_post_request
+from web3.datastructures import AttributeDict
 
 from configs import (
-    CONFIG_CHECK_PERIOD,
     DEFAULT_POOL,
+    NOTIFIER_BATCH_SIZE,
+    NOTIFIER_DEDUP_INTERVAL,
+    NOTIFIER_DIGEST_INTERVAL,
+    NOTIFIER_DIGEST_LINES,
+    NOTIFIER_FLUSH_TIMEOUT,
+    NOTIFIER_GLOBAL_BURST,
+    NOTIFIER_GLOBAL_RATE,
+    NOTIFIER_NODE_BURST,
+    NOTIFIER_NODE_RATE,
+    NOTIFIER_QUEUE_SIZE,
+    NOTIFIER_TIMEOUT,
     NOTIFIER_URL,
     NODE_CONFIG_FILEPATH,
     REDIS_URI,
@@ -39,27 +58,190 @@ from configs import (
     SGX_SERVER_URL,
     STATE_FILEPATH
 )
-from configs.web3 import ABI_FILEPATH, ENDPOINT
+from configs.web3 import ABI_FILEPATH, ENDPOINT, EXTRA_ENDPOINTS
+from tools.agent_skale import AgentSkale
+from tools.background import BackgroundQueue
 from tools.exceptions import NodeNotFoundException
+from tools.metrics import REGISTRY
+from tools.node_config import get_config_watcher
+from tools.retry import RetryPolicy, TokenBucket
+from tools.rpc_pool import RpcPool
 
 logger = logging.getLogger(__name__)
 
-call_retry = tenacity.Retrying(stop=tenacity.stop_after_attempt(10),
-                               wait=tenacity.wait_fixed(2),
-                               reraise=True)
-_config_first_read = True
+call_retry = RetryPolicy()
+
+NOTIFICATIONS_COALESCED = REGISTRY.counter(
+    'bounty_agent_notifications_coalesced_total',
+    'Notifications not sent at once but counted in a digest', ['reason'])
+
+BLOCK_QUANTITY_FIELDS = ('number', 'timestamp', 'gasLimit', 'gasUsed', 'baseFeePerGas',
+                         'difficulty', 'size')
+
+
+class RpcError(NamedTuple):
+    code: int
+    message: str
+    data: Optional[str]
+
+
+class RpcBatch:
+    """
+    Sends several read requests in one JSON-RPC batch. Contract calls are decoded
+    by their ABI, blocks are returned without transactions, receipts are formatted
+    as web3 does. Falls back to one request per call for non-HTTP providers.
+
+    Usage:
+        batch = RpcBatch(web3)
+        batch.add_call(contract.functions.getNodeNextRewardDate(node_id))
+        batch.add_block('latest')
+        reward_date, block = call_retry(batch.execute)
+        reward_date, block = await call_retry.call_async(batch.execute_async, session)
+    """
+
+    def __init__(self, web3):
+        self.web3 = web3
+        self._requests = []  # (method, params, decoder)
+        self._errors_allowed = set()  # indexes of requests
+
+    def add_call(self, contract_function, block_identifier='latest', sender=None,
+                 allow_error=False):
+        """
+        Adds a contract call. With allow_error an error response, e.g. a revert, is
+        returned as RpcError instead of failing the whole batch.
+        """
+        tx = self._call_tx(contract_function, sender)
+        if allow_error:
+            self._errors_allowed.add(len(self._requests))
+        output_types = get_abi_output_types(contract_function.abi)
+
+        def decode(result):
+            values = self.web3.codec.decode(output_types, HexBytes(result))
+            return values[0] if len(values) == 1 else values
+
+        self._requests.append(('eth_call', [tx, self._to_block_param(block_identifier)], decode))
+        return self
+
+    def add_estimate_gas(self, contract_function, sender=None, allow_error=False):
+        """
+        Adds a gas estimate of a transaction. A call that would revert fails as with
+        add_call, so with allow_error it is returned as RpcError.
+        """
+        if allow_error:
+            self._errors_allowed.add(len(self._requests))
+        self.add_quantity('eth_estimateGas', [self._call_tx(contract_function, sender)])
+        return self
+
+    def add_block(self, block_identifier='latest'):
+        def decode(result):
+            if result is None:
+                raise ValueError(f'Block {block_identifier} not found')
+            return AttributeDict({
+                key: int(value, 16) if key in BLOCK_QUANTITY_FIELDS and value else value
+                for key, value in result.items()
+            })
+
+        self._requests.append((
+            'eth_getBlockByNumber', [self._to_block_param(block_identifier), False], decode))
+        return self
+
+    def add_quantity(self, method, params=()):
+        """Adds a request with an integer result, e.g. eth_getBalance or eth_gasPrice."""
+        self._requests.append((method, list(params), lambda result: int(result, 16)))
+        return self
+
+    def add_receipt(self, tx_hash):
+        """Adds a receipt request, the result is None if the transaction is not mined yet."""
+        def decode(result):
+            return None if result is None else AttributeDict.recursive(receipt_formatter(result))
+
+        self._requests.append(('eth_getTransactionReceipt', [tx_hash], decode))
+        return self
+
+    @staticmethod
+    def _call_tx(contract_function, sender=None) -> dict:
+        tx = {'to': contract_function.address,
+              'data': contract_function._encode_transaction_data()}
+        if sender is not None:
+            tx['from'] = sender
+        return tx
+
+    @staticmethod
+    def _to_block_param(block_identifier):
+        return hex(block_identifier) if isinstance(block_identifier, int) else block_identifier
+
+    def _payload(self) -> str:
+        return json.dumps([
+            {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+            for i, (method, params, _) in enumerate(self._requests)
+        ])
+
+    def _send(self) -> dict:
+        provider = self.web3.provider
+        if not isinstance(provider, HTTPProvider):
+            return {i: provider.make_request(method, params)
+                    for i, (method, params, _) in enumerate(self._requests)}
+        if isinstance(provider, RpcPool):
+            raw_response = provider.post(self._payload(), read=True)
+        else:
+            raw_response = make_post_request(provider.endpoint_uri, self._payload(),
+                                             **provider.get_request_kwargs())
+        return {response['id']: response for response in json.loads(raw_response)}
+
+    def execute(self) -> list:
+        return self._decode(self._send())
+
+    async def execute_async(self, session) -> list:
+        """Same as execute, the batch is posted with an aiohttp session."""
+        provider = self.web3.provider
+        if not isinstance(provider, HTTPProvider):
+            return await asyncio.get_running_loop().run_in_executor(None, self.execute)
+        if isinstance(provider, RpcPool):
+            raw_responses = await provider.post_async(session, self._payload(), read=True)
+            return self._decode({response['id']: response for response in raw_responses})
+        async with session.post(provider.endpoint_uri, data=self._payload(),
+                                headers={'Content-Type': 'application/json'}) as response:
+            response.raise_for_status()
+            raw_responses = await response.json(content_type=None)
+        return self._decode({response['id']: response for response in raw_responses})
+
+    def _decode(self, responses) -> list:
+        results = []
+        for i, (method, _, decode) in enumerate(self._requests):
+            response = responses.get(i)
+            if response is None:
+                raise ValueError(f'No response for {method} in JSON-RPC batch')
+            if 'error' in response:
+                if i not in self._errors_allowed:
+                    raise ValueError(response['error'])
+                error = response['error']
+                results.append(RpcError(error.get('code'), error.get('message', ''),
+                                        error.get('data')))
+                continue
+            results.append(decode(response['result']))
+        return results
 
 
 def init_skale():
-    wallet = init_wallet()
-    return Skale(ENDPOINT, ABI_FILEPATH, wallet, state_path=STATE_FILEPATH)
+    rpc_pool = init_rpc_pool()
+    wallet = init_wallet(provider=rpc_pool)
+    skale = AgentSkale(ENDPOINT, ABI_FILEPATH, wallet, state_path=STATE_FILEPATH)
+    skale.web3.provider = rpc_pool
+    return skale
+
 
+def init_rpc_pool():
+    """RpcPool over ENDPOINT and EXTRA_ENDPOINTS, also used for the circuit breaker."""
+    return RpcPool([ENDPOINT, *EXTRA_ENDPOINTS], request_kwargs={'timeout': DEFAULT_HTTP_TIMEOUT})
 
-def init_wallet(pool=DEFAULT_POOL):
+
+def init_wallet(pool=DEFAULT_POOL, provider=None):
     sgx_keyname = get_sgx_keyname_from_config(NODE_CONFIG_FILEPATH)
     cpool = redis.ConnectionPool.from_url(REDIS_URI)
     rs = redis.Redis(connection_pool=cpool)
     web3 = init_web3(ENDPOINT)
+    if provider is not None:
+        web3.provider = provider
     sgx_wallet = SgxWallet(
         web3=web3,
         sgx_endpoint=SGX_SERVER_URL,
@@ -83,44 +265,24 @@ def check_if_node_is_registered(skale, node_id):
         raise NodeNotFoundException(err_msg)
 
 
-@tenacity.retry(
-    wait=tenacity.wait_fixed(CONFIG_CHECK_PERIOD),
-    retry=tenacity.retry_if_exception_type(KeyError) | tenacity.retry_if_exception_type(
-        FileNotFoundError))
+def check_if_nodes_are_registered(skale, node_ids):
+    nodes_number = skale.nodes.get_nodes_number()
+    missing_ids = [node_id for node_id in node_ids if not 0 <= node_id < nodes_number]
+    if missing_ids:
+        err_msg = f'There are no Nodes with IDs = {missing_ids} in SKALE manager'
+        logger.error(err_msg)
+        raise NodeNotFoundException(err_msg)
+    return True
+
+
 def get_id_from_config(node_config_filepath) -> int:
-    """Gets node ID from config file for agent initialization."""
-    global _config_first_read
-    try:
-        logger.debug('Reading node id from config file...')
-        with open(node_config_filepath) as json_file:
-            data = json.load(json_file)
-        return data['node_id']
-    except (FileNotFoundError, KeyError) as err:
-        if _config_first_read:
-            logger.warning(
-                'Cannot read a node id from config file - is the node already registered?')
-            _config_first_read = False
-        raise err
-
-
-@tenacity.retry(
-    wait=tenacity.wait_fixed(CONFIG_CHECK_PERIOD),
-    retry=tenacity.retry_if_exception_type(KeyError) | tenacity.retry_if_exception_type(
-        FileNotFoundError))
-def get_sgx_keyname_from_config(node_config_filepath) -> int:
-    """Gets sgx keyname from config file."""
-    global _config_first_read
-    try:
-        logger.debug('Reading node id from config file...')
-        with open(node_config_filepath) as json_file:
-            data = json.load(json_file)
-        return data['sgx_key_name']
-    except (FileNotFoundError, KeyError) as err:
-        if _config_first_read:
-            logger.warning(
-                'Cannot read a sgx_key_name from config file?')
-            _config_first_read = False
-        raise err
+    """Gets node ID from config file for agent initialization, waits until it appears."""
+    return get_config_watcher(node_config_filepath).wait_for('node_id')
+
+
+def get_sgx_keyname_from_config(node_config_filepath) -> str:
+    """Gets sgx keyname from config file, waits until it appears."""
+    return get_config_watcher(node_config_filepath).wait_for('sgx_key_name')
 
 
 class MsgIcon(Enum):
@@ -131,31 +293,230 @@ class MsgIcon(Enum):
     CRITICAL = '\ud83c\udd98'
 
 
-class Notifier:
-    def __init__(self, cont_name, node_name, node_id, node_ip):
-        self.header = f'Container: {cont_name}, Node: {node_name}, ' \
-                      f'ID: {node_id}, IP: {node_ip}\n'
+class NotificationQueue(BackgroundQueue):
+    """
+    Delivers notifications from a background thread through one keep-alive session.
+    Messages queued in a burst are sent in one POST. When the buffer is full new
+    messages are dropped, so callers never wait for the notifier endpoint.
+    """
 
-    def send(self, message, icon=MsgIcon.ERROR):
-        """Send message to telegram."""
-        logger.info(message)
-        header = f'{icon.value} {self.header}'
-        message_data = {"message": [header, message]}
+    def __init__(self, url=NOTIFIER_URL, max_size=NOTIFIER_QUEUE_SIZE,
+                 batch_size=NOTIFIER_BATCH_SIZE, timeout=NOTIFIER_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount(url, requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.stats = {'queued': 0, 'sent': 0, 'dropped': 0, 'failed': 0}
+        self._stats_lock = threading.Lock()
+        super().__init__('notifier', max_size, batch_size, NOTIFIER_FLUSH_TIMEOUT)
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def put(self, message_lines) -> bool:
+        if not super().put(message_lines):
+            return False
+        self._count('queued')
+        return True
+
+    def _dropped(self, message_lines):
+        self._count('dropped')
+        logger.warning('Notification queue is full, message dropped')
+
+    def _process(self, batch):
+        sent = self._post([line for lines in batch for line in lines])
+        self._count('sent' if sent else 'failed', len(batch))
+
+    def _failed(self, batch, err):
+        logger.exception(f'Cannot send notifications: {err}')
+        self._count('failed', len(batch))
+
+    def _post(self, message_lines) -> bool:
         try:
-            response = requests.post(url=NOTIFIER_URL, json=message_data)
+            response = self.session.post(url=self.url, json={'message': message_lines},
+                                         timeout=self.timeout)
         except requests.exceptions.ConnectionError:
-            logger.info(f'Cannot send Telegram notification (failed to connect to {NOTIFIER_URL})')
-            return 1
+            logger.info(f'Cannot send Telegram notification (failed to connect to {self.url})')
+            return False
         except Exception as err:
-            logger.info(f'Cannot notify validator {NOTIFIER_URL}. {err}')
-            return 1
+            logger.info(f'Cannot notify validator {self.url}. {err}')
+            return False
         if response.status_code != requests.codes.ok:
-            logger.info(f'Request to {NOTIFIER_URL} failed, status code: {response.status_code}')
-            return 1
+            logger.info(f'Request to {self.url} failed, status code: {response.status_code}')
+            return False
 
-        res = response.json()
+        try:
+            res = response.json()
+        except ValueError:
+            res = None
+        if not isinstance(res, dict):
+            logger.info(f'Unexpected response of {self.url}: {response.text[:100]}')
+            return False
         if res.get('status') == 'error':
             logger.info('Telegram notifications are not supported on the node')
-            return 1
+            return False
         logger.debug('Message to validator was sent successfully')
-        return 0
+        return True
+
+
+class CoalescedMessage:
+    def __init__(self, header, message):
+        self.header = header
+        self.message = message  # the latest suppressed one with this key
+        self.sent_at = None
+        self.suppressed = 0  # since the last digest
+
+
+class NotificationCoalescer:
+    """
+    Keeps failure storms out of the notification queue. A message is sent once per
+    `dedup_interval` for its key and source, and only while the token buckets of its
+    source and of the process have tokens. Suppressed messages are counted and listed
+    in a digest every `digest_interval`. The first critical message with a key is
+    sent regardless of the rate limits.
+    """
+
+    def __init__(self, notification_queue, dedup_interval=NOTIFIER_DEDUP_INTERVAL,
+                 digest_interval=NOTIFIER_DIGEST_INTERVAL, digest_lines=NOTIFIER_DIGEST_LINES,
+                 node_rate=NOTIFIER_NODE_RATE, node_burst=NOTIFIER_NODE_BURST,
+                 global_rate=NOTIFIER_GLOBAL_RATE, global_burst=NOTIFIER_GLOBAL_BURST,
+                 clock=time.monotonic):
+        self.queue = notification_queue
+        self.dedup_interval = dedup_interval
+        self.digest_interval = digest_interval
+        self.digest_lines = digest_lines
+        self.node_rate = node_rate
+        self.node_burst = node_burst
+        self.clock = clock
+        self.bucket = TokenBucket(global_rate, global_burst, clock)
+        self._buckets = {}  # by source
+        self._messages = {}  # by (source, key)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='notification-digest',
+                                        daemon=True)
+        self._thread.start()
+
+    def put(self, source, header, message, key, critical=False) -> bool:
+        """Returns False if the message was sent at once but dropped by the queue."""
+        with self._lock:
+            now = self.clock()
+            coalesced = self._messages.get((source, key))
+            if coalesced is None:
+                coalesced = self._messages[source, key] = CoalescedMessage(header, message)
+            first = coalesced.sent_at is None and coalesced.suppressed == 0
+            if coalesced.sent_at is not None and now - coalesced.sent_at < self.dedup_interval:
+                return self._suppress(coalesced, header, message, 'duplicate')
+            bucket = self._buckets.get(source)
+            if bucket is None:
+                bucket = self._buckets[source] = TokenBucket(self.node_rate, self.node_burst,
+                                                             self.clock)
+            # both buckets are refilled before either is checked
+            limited = not all([bucket.available(), self.bucket.available()])
+            if limited and not (critical and first):
+                return self._suppress(coalesced, header, message, 'rate_limited')
+            bucket.take()
+            self.bucket.take()
+            coalesced.sent_at = now
+        return self.queue.put([header, message])
+
+    def _suppress(self, coalesced, header, message, reason) -> bool:
+        coalesced.header, coalesced.message = header, message
+        coalesced.suppressed += 1
+        NOTIFICATIONS_COALESCED.inc(reason)
+        return True
+
+    def send_digest(self) -> bool:
+        """Queues one message with counts of the suppressed messages, if there are any."""
+        with self._lock:
+            now = self.clock()
+            suppressed = [(coalesced.suppressed, coalesced.header, coalesced.message)
+                          for coalesced in self._messages.values() if coalesced.suppressed]
+            for coalesced in self._messages.values():
+                coalesced.suppressed = 0
+            self._messages = {
+                key: coalesced for key, coalesced in self._messages.items()
+                if coalesced.sent_at is not None and now - coalesced.sent_at < self.dedup_interval
+            }
+        if not suppressed:
+            return False
+        suppressed.sort(key=lambda item: item[0], reverse=True)
+        lines = [f'{MsgIcon.WARNING.value} Suppressed {sum(item[0] for item in suppressed)} '
+                 f'notifications in the last {self.digest_interval / 60:.0f} min:']
+        lines.extend(f'{count} x {header.strip()}\n{message}'
+                     for count, header, message in suppressed[:self.digest_lines])
+        if len(suppressed) > self.digest_lines:
+            lines.append(f'... and {len(suppressed) - self.digest_lines} more')
+        return self.queue.put(lines)
+
+    def _run(self):
+        while not self._stopped.wait(self.digest_interval):
+            self.send_digest()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.send_digest()
+
+
+_notification_queue = None
+_notification_queue_lock = threading.Lock()
+_notification_coalescer = None
+
+
+def get_notification_queue():
+    """Returns the process-wide notification queue, shared by all notifiers."""
+    global _notification_queue
+    with _notification_queue_lock:
+        if _notification_queue is None:
+            _notification_queue = NotificationQueue()
+            atexit.register(_notification_queue.flush)
+            stats = _notification_queue.stats
+            REGISTRY.callback('bounty_agent_notifications_total', 'Notifier queue outcomes',
+                              'counter', lambda: {(name,): value for name, value in stats.items()},
+                              ['outcome'])
+        return _notification_queue
+
+
+def get_notification_coalescer():
+    """Returns the process-wide coalescer in front of the notification queue."""
+    global _notification_coalescer
+    notification_queue = get_notification_queue()
+    with _notification_queue_lock:
+        if _notification_coalescer is None:
+            _notification_coalescer = NotificationCoalescer(notification_queue)
+            # registered after the queue flush, so it runs first at exit
+            atexit.register(_notification_coalescer.stop)
+        return _notification_coalescer
+
+
+class Notifier:
+    COALESCED_ICONS = (MsgIcon.WARNING, MsgIcon.ERROR, MsgIcon.CRITICAL)
+
+    def __init__(self, cont_name, node_name, node_id, node_ip, notification_queue=None,
+                 coalescer=None):
+        """
+        Notifiers on the default queue share the process-wide coalescer, a notifier on
+        a given queue coalesces only through the given coalescer.
+        """
+        self.header = f'Container: {cont_name}, Node: {node_name}, ' \
+                      f'ID: {node_id}, IP: {node_ip}\n'
+        if notification_queue is None:
+            notification_queue = get_notification_queue()
+            coalescer = coalescer or get_notification_coalescer()
+        self.queue = notification_queue
+        self.coalescer = coalescer
+
+    def send(self, message, icon=MsgIcon.ERROR, key=None):
+        """
+        Queue message to telegram, returns 1 if it was dropped. Warnings and errors
+        are coalesced by key, the message itself if it is not given.
+        """
+        logger.info(message)
+        header = f'{icon.value} {self.header}'
+        if self.coalescer is None or icon not in self.COALESCED_ICONS:
+            return 0 if self.queue.put([header, message]) else 1
+        queued = self.coalescer.put(self.header, header, message, key or message,
+                                    critical=icon == MsgIcon.CRITICAL)
+        return 0 if queued else 1
@@ -0,0 +1,167 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from peewee import (BigIntegerField, CharField, DatabaseProxy, DateTimeField, FloatField,
+                    IntegerField, Model, MySQLDatabase, SqliteDatabase, TextField)
+
+from configs.db import (DB_HOST, DB_NAME, DB_PASSWORD, DB_PORT, DB_USER, LEDGER_BATCH_SIZE,
+                        LEDGER_DB_ENGINE, LEDGER_DB_PATH, LEDGER_FLUSH_TIMEOUT,
+                        LEDGER_QUEUE_SIZE)
+from tools.background import BackgroundQueue
+
+logger = logging.getLogger(__name__)
+
+database_proxy = DatabaseProxy()
+
+
+class WeiField(CharField):
+    """Stores token amounts in wei as decimal strings to keep them exact in any database."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', 40)
+        super().__init__(*args, **kwargs)
+
+    def db_value(self, value):
+        return None if value is None else str(value)
+
+    def python_value(self, value):
+        return None if value is None else int(value)
+
+
+class BaseModel(Model):
+    class Meta:
+        database = database_proxy
+
+
+class BountyClaim(BaseModel):
+    """One attempt to get a bounty for a node."""
+    SUCCESS = 'success'
+    FAILED = 'failed'
+
+    node_id = IntegerField()
+    epoch = IntegerField(index=True)  # calendar month of the reward date, counted from 1970
+    reward_date = DateTimeField(null=True)
+    attempted_at = DateTimeField(default=datetime.utcnow)
+    duration = FloatField(null=True)  # in seconds, from sending a tx to the receipt
+    status = CharField(max_length=16)
+    tx_hash = CharField(max_length=66, null=True)
+    block_number = BigIntegerField(null=True)
+    gas_used = BigIntegerField(null=True)
+    bounty = WeiField(null=True)
+    error = TextField(null=True)
+
+    class Meta:
+        table_name = 'bounty_claims'
+        indexes = (
+            (('node_id', 'epoch'), False),
+        )
+
+
+def get_epoch(date: datetime) -> int:
+    return (date.year - 1970) * 12 + date.month - 1
+
+
+def create_database(engine=LEDGER_DB_ENGINE):
+    if engine == 'mysql':
+        return MySQLDatabase(DB_NAME, user=DB_USER, password=DB_PASSWORD,
+                             host=DB_HOST, port=DB_PORT)
+    return SqliteDatabase(LEDGER_DB_PATH, pragmas={'journal_mode': 'wal'})
+
+
+class Ledger(BackgroundQueue):
+    """
+    Records bounty claims. Records are queued by the claim path and written in
+    batches by a background thread; queries read the database directly.
+    """
+
+    def __init__(self, database=None, max_size=LEDGER_QUEUE_SIZE, batch_size=LEDGER_BATCH_SIZE):
+        self.database = database or create_database()
+        database_proxy.initialize(self.database)
+        with self.database.connection_context():
+            self.database.create_tables([BountyClaim], safe=True)
+        super().__init__('ledger', max_size, batch_size, LEDGER_FLUSH_TIMEOUT)
+
+    def record(self, node_id, status, reward_date=None, **fields) -> None:
+        """Queues a claim record, never blocks the caller."""
+        claim_date = reward_date or datetime.utcnow()
+        # insert_many takes columns from the first row, so every row has all of them
+        row = {name: None for name in BountyClaim._meta.fields if name != 'id'}
+        row.update(node_id=node_id, epoch=get_epoch(claim_date), reward_date=reward_date,
+                   attempted_at=datetime.utcnow(), status=status, **fields)
+        self.put(row)
+
+    def _dropped(self, row):
+        logger.warning(f'Ledger queue is full, claim record dropped: {row}')
+
+    def _process(self, batch):
+        with self.database.connection_context(), self.database.atomic():
+            BountyClaim.insert_many(batch).execute()
+
+    def _failed(self, batch, err):
+        logger.exception(f'Cannot write {len(batch)} claim records to the ledger')
+
+    def get_node_claims(self, node_id, limit=None) -> list:
+        with self.database.connection_context():
+            query = (BountyClaim.select()
+                     .where(BountyClaim.node_id == node_id)
+                     .order_by(BountyClaim.attempted_at.desc())
+                     .limit(limit))
+            return list(query)
+
+    def get_node_total(self, node_id, epoch=None) -> int:
+        """Total bounty in wei received by the node, for all time or one epoch."""
+        with self.database.connection_context():
+            query = BountyClaim.select(BountyClaim.bounty).where(
+                (BountyClaim.node_id == node_id) & (BountyClaim.status == BountyClaim.SUCCESS))
+            if epoch is not None:
+                query = query.where(BountyClaim.epoch == epoch)
+            return sum(claim.bounty or 0 for claim in query)
+
+    def get_epoch_totals(self, epoch) -> dict:
+        """Total bounty in wei received in the epoch, keyed by node ID."""
+        totals = {}
+        with self.database.connection_context():
+            query = BountyClaim.select(BountyClaim.node_id, BountyClaim.bounty).where(
+                (BountyClaim.epoch == epoch) & (BountyClaim.status == BountyClaim.SUCCESS))
+            for claim in query:
+                totals[claim.node_id] = totals.get(claim.node_id, 0) + (claim.bounty or 0)
+        return totals
+
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger():
+    """Returns the process-wide ledger, None if the database cannot be opened."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            try:
+                _ledger = Ledger()
+            except Exception as err:
+                logger.warning(f'Bounty ledger is disabled: {err}')
+                return None
+            atexit.register(_ledger.flush)
+        return _ledger
@@ -17,6 +17,7 @@
 #   You should have received a copy of the GNU Affero General Public License
 #   along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import atexit
 import logging
 import logging.handlers as py_handlers
 import os
@@ -31,35 +32,91 @@ from configs.web3 import ENDPOINT
 from configs.logs import (
     LOG_BACKUP_COUNT,
     LOG_FILE_SIZE_BYTES,
+    LOG_FLUSH_TIMEOUT,
     LOG_FOLDER,
-    LOG_FORMAT
+    LOG_FORMAT,
+    LOG_QUEUE_ENABLED,
+    LOG_QUEUE_SIZE
 )
+from tools.background import BackgroundQueue
 
 
 def compose_hiding_patterns():
-    sgx_ip = urlparse(SGX_SERVER_URL).hostname
+    patterns = {}
+    sgx_ip = urlparse(SGX_SERVER_URL).hostname if SGX_SERVER_URL else None
     eth_ip = urlparse(ENDPOINT).hostname
-    return {
-        rf'{sgx_ip}': '[SGX_IP]',
-        rf'{eth_ip}': '[ETH_IP]',
-        r'NEK\:\w+': '[SGX_KEY]'
-    }
+    if sgx_ip:
+        patterns[re.escape(sgx_ip)] = '[SGX_IP]'
+    if eth_ip:
+        patterns[re.escape(eth_ip)] = '[ETH_IP]'
+    patterns[r'NEK\:\w+'] = '[SGX_KEY]'
+    return patterns
+
+
+_REGEX_SPECIAL_CHARS = set('\\.^$*+?{}[]|()')
+
+
+def literal_prefix(pattern: str) -> str:
+    """Returns the literal text every match of the pattern starts with."""
+    if '|' in pattern:
+        return ''
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            prefix.append(pattern[i + 1])
+            i += 2
+        elif char in _REGEX_SPECIAL_CHARS:
+            break
+        else:
+            prefix.append(char)
+            i += 1
+    if prefix and i < len(pattern) and pattern[i] in '*?{':
+        prefix.pop()
+    return ''.join(prefix)
+
+
+class Redactor:
+    """
+    Applies precompiled hiding patterns. A pattern is matched only when the message
+    contains its literal prefix, so most messages are returned without a regex pass.
+    """
+
+    def __init__(self, patterns: dict) -> None:
+        self._rules = [
+            (literal_prefix(pattern), re.compile(pattern), replacement)
+            for pattern, replacement in patterns.items()
+        ]
+
+    def redact(self, msg: str) -> str:
+        for trigger, regex, replacement in self._rules:
+            if trigger in msg:
+                msg = regex.sub(replacement, msg)
+        return msg
 
 
 class HidingFormatter(Formatter):
+    """
+    Formatter that hides sensitive data. A record handled by several handlers that
+    share the formatter is formatted and redacted only once.
+    """
+
     def __init__(self, log_format: str, patterns: dict) -> None:
         super().__init__(log_format)
         self._patterns: dict = patterns
+        self._redactor = Redactor(patterns)
 
     def _filter_sensitive(self, msg) -> str:
-        for match, replacement in self._patterns.items():
-            pat = re.compile(match)
-            msg = pat.sub(replacement, msg)
-        return msg
+        return self._redactor.redact(msg)
 
     def format(self, record) -> str:
-        msg = super().format(record)
-        return self._filter_sensitive(msg)
+        cached = record.__dict__.get('_hidden_message')
+        if cached is not None and cached[0] is self:
+            return cached[1]
+        msg = self._filter_sensitive(super().format(record))
+        record._hidden_message = (self, msg)
+        return msg
 
     def formatException(self, exc_info) -> str:
         msg = super().formatException(exc_info)
@@ -70,8 +127,89 @@ class HidingFormatter(Formatter):
         return self._filter_sensitive(msg)
 
 
+_hiding_formatter = None
+
+
+def get_hiding_formatter():
+    """Returns the formatter shared by all handlers, so records are formatted once."""
+    global _hiding_formatter
+    if _hiding_formatter is None:
+        _hiding_formatter = HidingFormatter(LOG_FORMAT, compose_hiding_patterns())
+    return _hiding_formatter
+
+
+class LogWriter(BackgroundQueue):
+    """
+    Thread that formats, redacts and writes records handed over by QueuedHandlers.
+    When the bounded queue is full records are dropped instead of blocking the caller.
+    """
+
+    def __init__(self, max_size=LOG_QUEUE_SIZE):
+        self.dropped = 0
+        super().__init__('log-writer', max_size, flush_timeout=LOG_FLUSH_TIMEOUT)
+
+    def put(self, handler, record):
+        return super().put((handler, record))
+
+    def _dropped(self, item):
+        self.dropped += 1
+
+    def _process(self, batch):
+        for handler, record in batch:
+            try:
+                handler.handle(record)
+                if self.dropped:
+                    dropped, self.dropped = self.dropped, 0
+                    sys.stderr.write(f'Log queue is full, {dropped} records dropped\n')
+            except Exception:
+                handler.handleError(record)
+
+
+class QueuedHandler(logging.Handler):
+    """Hands records over to the LogWriter thread that emits them with the target handler."""
+
+    def __init__(self, target, writer):
+        super().__init__(target.level)
+        self.target = target
+        self.writer = writer
+
+    def emit(self, record):
+        # Resolve arguments now: they may change before the writer thread formats the record
+        record.msg = record.getMessage()
+        record.args = None
+        self.writer.put(self.target, record)
+
+    def close(self):
+        self.writer.flush()
+        self.target.close()
+        super().close()
+
+
+_log_writer = None
+
+
+def get_log_writer():
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = LogWriter()
+        atexit.register(_log_writer.flush)
+    return _log_writer
+
+
+def flush_logs():
+    """Writes out all queued records, no-op unless queued logging is enabled."""
+    if _log_writer is not None:
+        _log_writer.flush()
+
+
+def wrap_handler(handler):
+    if not LOG_QUEUE_ENABLED:
+        return handler
+    return QueuedHandler(handler, get_log_writer())
+
+
 def create_file_handler(log_file_path):
-    formatter = HidingFormatter(LOG_FORMAT, compose_hiding_patterns())
+    formatter = get_hiding_formatter()
     f_handler = py_handlers.RotatingFileHandler(
         log_file_path,
         maxBytes=LOG_FILE_SIZE_BYTES,
@@ -84,7 +222,7 @@ def create_file_handler(log_file_path):
 
 
 def create_stream_handler():
-    formatter = HidingFormatter(LOG_FORMAT, compose_hiding_patterns())
+    formatter = get_hiding_formatter()
     stream_handler = StreamHandler(sys.stderr)
     stream_handler.setFormatter(formatter)
     stream_handler.setLevel(logging.INFO)
@@ -92,7 +230,7 @@ def create_stream_handler():
 
 
 def init_logger():
-    handlers = [create_stream_handler()]
+    handlers = [wrap_handler(create_stream_handler())]
     logging.basicConfig(level=logging.DEBUG, handlers=handlers)
 
 
@@ -101,9 +239,18 @@ def init_agent_logger(agent_name, node_id):
     init_logger(log_path)
 
 
+def get_handler_filepath(handler):
+    if isinstance(handler, QueuedHandler):
+        handler = handler.target
+    return getattr(handler, 'baseFilename', None)
+
+
 def add_file_handler(logger, agent_name, node_id):
-    log_path = get_log_filepath(agent_name, node_id)
-    logger.addHandler(create_file_handler(log_path))
+    """Adds a file handler to the logger unless it already writes to the same file."""
+    log_path = os.path.abspath(get_log_filepath(agent_name, node_id))
+    if any(get_handler_filepath(handler) == log_path for handler in logger.handlers):
+        return
+    logger.addHandler(wrap_handler(create_file_handler(log_path)))
 
 
 def get_log_filepath(agent_name, node_id):
@@ -0,0 +1,227 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+"""
+In-process metrics registry with Prometheus text exposition. Updates take one
+uncontended lock and a dict lookup, so metrics can stay on under load.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+CLAIM_LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _check_labels(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {labels}')
+        return tuple(str(label) for label in labels)
+
+    def samples(self):
+        with self._lock:
+            return [(f'{self.name}{format_labels(self.labelnames, labels)}', value)
+                    for labels, value in self._values.items()]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        labels = self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels):
+        return self._values.get(self._check_labels(labels), 0)
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, *labels):
+        labels = self._check_labels(labels)
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        labels = self._check_labels(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def get_count(self, *labels):
+        state = self._values.get(self._check_labels(labels))
+        return 0 if state is None else state[2]
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for labels, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += bucket_count
+                    samples.append((f'{self.name}_bucket'
+                                    f'{format_labels(self.labelnames, labels, [("le", bound)])}',
+                                    cumulative))
+                suffix = format_labels(self.labelnames, labels)
+                samples.append((f'{self.name}_sum{suffix}', total))
+                samples.append((f'{self.name}_count{suffix}', count))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """Metric whose samples are read at scrape time: the function returns {labels: value}."""
+
+    def __init__(self, name, documentation, metric_type, function, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.type = metric_type
+        self.function = function
+
+    def samples(self):
+        return [(f'{self.name}{format_labels(self.labelnames, labels)}', value)
+                for labels, value in self.function().items()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Registers the metric, replacing a previous metric with the same name."""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, metric_type, function, labelnames=()):
+        return self.register(CallbackMetric(name, documentation, metric_type, function,
+                                            labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as err:
+                logger.warning(f'Cannot collect metric {metric.name}: {err}')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(f'{name} {value}' for name, value in samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+RPC_LATENCY = REGISTRY.histogram(
+    'bounty_agent_rpc_latency_seconds', 'Latency of SKALE Manager requests', ['method'])
+CALL_RETRIES = REGISTRY.counter(
+    'bounty_agent_call_retries_total', 'Retried SKALE Manager calls')
+NOT_TIME_FOR_BOUNTY_RETRIES = REGISTRY.counter(
+    'bounty_agent_not_time_for_bounty_retries_total',
+    'Job checks made before a block reached the reward date')
+CLAIMS = REGISTRY.counter(
+    'bounty_agent_claims_total', 'Bounty claim attempts', ['status'])
+CLAIM_LAG = REGISTRY.histogram(
+    'bounty_agent_claim_lag_seconds', 'Time between the reward date and the claim receipt',
+    buckets=CLAIM_LAG_BUCKETS)
+
+
+def track_scheduler(scheduler, registry=REGISTRY):
+    """Exposes the number of jobs waiting in the scheduler."""
+    registry.callback('bounty_agent_scheduled_jobs', 'Jobs waiting in the scheduler', 'gauge',
+                      lambda: {(): len(scheduler.get_jobs())})
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port, host='127.0.0.1', registry=REGISTRY):
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f'Metrics are served on http://{host}:{server.server_port}/metrics')
+    return server
@@ -0,0 +1,112 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import socket
+
+from web3 import Web3
+from web3._utils.abi import get_abi_output_types
+
+from configs import AGGREGATED_CALLS_CHUNK_SIZE, MULTICALL_ADDRESS
+from tools.helper import RpcBatch, call_retry
+
+MULTICALL3_ABI = [{
+    'name': 'aggregate3',
+    'type': 'function',
+    'stateMutability': 'payable',
+    'inputs': [{
+        'name': 'calls',
+        'type': 'tuple[]',
+        'components': [
+            {'name': 'target', 'type': 'address'},
+            {'name': 'allowFailure', 'type': 'bool'},
+            {'name': 'callData', 'type': 'bytes'}
+        ]
+    }],
+    'outputs': [{
+        'name': 'returnData',
+        'type': 'tuple[]',
+        'components': [
+            {'name': 'success', 'type': 'bool'},
+            {'name': 'returnData', 'type': 'bytes'}
+        ]
+    }]
+}]
+
+
+class CallAggregator:
+    """
+    Executes many contract view calls in a few requests: through a Multicall3
+    contract when MULTICALL_ADDRESS is set, otherwise as chunked JSON-RPC batches.
+    """
+
+    def __init__(self, web3, multicall_address=MULTICALL_ADDRESS,
+                 chunk_size=AGGREGATED_CALLS_CHUNK_SIZE):
+        self.web3 = web3
+        self.chunk_size = chunk_size
+        self.multicall = None
+        if multicall_address:
+            self.multicall = web3.eth.contract(
+                address=Web3.to_checksum_address(multicall_address), abi=MULTICALL3_ABI)
+
+    def call(self, contract_functions) -> list:
+        results = []
+        for start in range(0, len(contract_functions), self.chunk_size):
+            chunk = contract_functions[start:start + self.chunk_size]
+            if self.multicall is None:
+                results.extend(call_retry(self._call_batch, chunk))
+            else:
+                results.extend(call_retry(self._call_multicall, chunk))
+        return results
+
+    def _call_batch(self, contract_functions) -> list:
+        batch = RpcBatch(self.web3)
+        for contract_function in contract_functions:
+            batch.add_call(contract_function)
+        return batch.execute()
+
+    def _call_multicall(self, contract_functions) -> list:
+        calls = [
+            (contract_function.address, False, contract_function._encode_transaction_data())
+            for contract_function in contract_functions
+        ]
+        return_data = self.multicall.functions.aggregate3(calls).call()
+        results = []
+        for contract_function, (_, data) in zip(contract_functions, return_data):
+            values = self.web3.codec.decode(get_abi_output_types(contract_function.abi), data)
+            results.append(values[0] if len(values) == 1 else values)
+        return results
+
+
+def get_reward_dates(skale, node_ids, aggregator=None) -> dict:
+    """Returns next reward timestamps of the nodes, keyed by node ID."""
+    aggregator = aggregator or CallAggregator(skale.web3)
+    functions = skale.nodes.contract.functions
+    reward_dates = aggregator.call([functions.getNodeNextRewardDate(i) for i in node_ids])
+    return dict(zip(node_ids, reward_dates))
+
+
+def get_nodes_info(skale, node_ids, aggregator=None) -> dict:
+    """Returns name and IP of the nodes used for notifications, keyed by node ID."""
+    aggregator = aggregator or CallAggregator(skale.web3)
+    functions = skale.nodes.contract.functions
+    nodes = aggregator.call([functions.nodes(i) for i in node_ids])
+    return {
+        node_id: {'name': node[0], 'ip': socket.inet_ntoa(node[1])}
+        for node_id, node in zip(node_ids, nodes)
+    }
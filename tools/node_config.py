@@ -0,0 +1,171 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Parsed node_config.json, cached until the file changes. Agents that start before the
+node is registered wait for node_id without re-reading the file on a timer: they are
+woken by inotify, or by polling file stats where inotify is not available.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import threading
+from typing import NamedTuple, Optional
+
+from configs import CONFIG_CHECK_PERIOD, CONFIG_POLL_INTERVAL, NODE_CONFIG_FILEPATH
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+class NodeConfig(NamedTuple):
+    node_id: Optional[int] = None
+    sgx_key_name: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data):
+        node_id = data.get('node_id')
+        if node_id is not None and (not isinstance(node_id, int) or isinstance(node_id, bool)):
+            raise ValueError(f'Invalid node_id in node config: {node_id!r}')
+        return cls(node_id, data.get('sgx_key_name'))
+
+
+def open_inotify(directory) -> Optional[int]:
+    """Returns an inotify descriptor watching the directory, None if it is not available."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class NodeConfigWatcher:
+    """
+    Returns the node config parsed from the file, reading it again only when its
+    stats change. wait_for blocks until a field appears in the config.
+    """
+
+    def __init__(self, filepath=NODE_CONFIG_FILEPATH, use_inotify=True):
+        self.filepath = filepath
+        self.use_inotify = use_inotify
+        self._config = NodeConfig()
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> NodeConfig:
+        stamp = self._file_stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                self._config = self._read() if stamp is not None else NodeConfig()
+                self._stamp = stamp
+            return self._config
+
+    def _read(self) -> NodeConfig:
+        logger.debug(f'Reading node config from {self.filepath}')
+        try:
+            with open(self.filepath) as config_file:
+                data = json.load(config_file)
+        except (FileNotFoundError, json.JSONDecodeError) as err:
+            logger.debug(f'Node config is not ready: {err}')  # e.g. being written
+            return NodeConfig()
+        return NodeConfig.from_dict(data)
+
+    def wait_for(self, field, timeout=None):
+        """Returns the field value once it is in the config, None after the timeout."""
+        value = getattr(self.get(), field)
+        if value is not None:
+            return value
+        logger.warning(f'Cannot read {field} from {self.filepath} - '
+                       f'is the node already registered?')
+        self._start()
+        with self._changed:
+            self._changed.wait_for(lambda: getattr(self.get(), field) is not None, timeout)
+        return getattr(self.get(), field)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name='node-config',
+                                                daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """The polling thread exits at once, the inotify one after its current check."""
+        self._stopped.set()
+
+    def _watch(self):
+        fd = None
+        if self.use_inotify:
+            fd = open_inotify(os.path.dirname(os.path.abspath(self.filepath)))
+        if fd is None:
+            logger.info(f'Polling {self.filepath} every {CONFIG_POLL_INTERVAL} sec')
+        try:
+            while not self._stopped.is_set():
+                if fd is None:
+                    self._stopped.wait(CONFIG_POLL_INTERVAL)
+                else:
+                    # stats are also checked periodically in case an event is missed
+                    readable, _, _ = select.select([fd], [], [], CONFIG_CHECK_PERIOD)
+                    if readable:
+                        try:
+                            os.read(fd, 65536)
+                        except BlockingIOError:
+                            pass
+                with self._changed:
+                    self._changed.notify_all()
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+
+def get_config_watcher(filepath=NODE_CONFIG_FILEPATH) -> NodeConfigWatcher:
+    with _watchers_lock:
+        if filepath not in _watchers:
+            _watchers[filepath] = NodeConfigWatcher(filepath)
+        return _watchers[filepath]
@@ -0,0 +1,64 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""Classification of getBounty reverts found by simulating the claim with eth_call."""
+
+from enum import Enum
+
+from eth_abi import decode
+from hexbytes import HexBytes
+
+from configs import DELAY_AFTER_ERR, PREFLIGHT_RETRY_DELAY
+
+ERROR_SELECTOR = bytes.fromhex('08c379a0')  # Error(string)
+
+
+class RevertReason(Enum):
+    NOT_TIME = 'Not time for bounty'
+    NOT_NODE_OWNER = 'Node does not exist for Message sender'
+    NODE_LEFT = 'The node must not be in Left state'
+    INCOMPLIANT = 'The node is incompliant'
+    UNKNOWN = 'Unknown'
+
+    @property
+    def delay(self) -> int:
+        """Seconds before the next claim attempt, NOT_TIME waits for the reward block."""
+        return DELAY_AFTER_ERR if self == RevertReason.UNKNOWN else PREFLIGHT_RETRY_DELAY
+
+
+def revert_message(rpc_error) -> str:
+    """Returns the Error(string) reason of the revert, or the error message."""
+    data = rpc_error.data
+    if isinstance(data, dict):  # some clients nest the revert data
+        data = data.get('data')
+    if isinstance(data, str):
+        try:
+            raw = bytes(HexBytes(data))
+            if raw[:4] == ERROR_SELECTOR:
+                return decode(['string'], raw[4:])[0]
+        except ValueError:
+            pass
+    return rpc_error.message
+
+
+def classify_revert(rpc_error) -> RevertReason:
+    message = revert_message(rpc_error)
+    return next((reason for reason in RevertReason if reason.value in message),
+                RevertReason.UNKNOWN)
@@ -0,0 +1,156 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Waits for receipts of sent bounty claims in one background thread, so scheduler
+workers do not block for the confirmation time.
+"""
+
+import json
+import logging
+import threading
+import time
+
+from eth_utils import add_0x_prefix
+from skale.transactions.exceptions import TransactionNotMinedError
+from skale.transactions.result import TxRes
+from skale.wallets import RedisWalletAdapter
+from skale.wallets.redis_wallet import (RedisWalletDroppedError, RedisWalletWaitError,
+                                        TxRecordStatus)
+
+from configs import RECEIPT_POLL_INTERVAL, RECEIPT_TIMEOUT
+from tools.helper import RpcBatch, call_retry
+
+logger = logging.getLogger(__name__)
+
+
+class ReceiptTracker:
+    """
+    Polls receipts of all pending claims with one JSON-RPC batch per tick. Claims sent
+    through RedisWalletAdapter are first resolved to transaction hashes with one Redis
+    read. When a claim is mined, failed or timed out, its callback is called with the
+    claim, the TxRes (None on error) and the error (None on success). A timed out
+    transaction was dropped, so the nonce manager of the submitter is reset to fill
+    the gap it left.
+    """
+
+    def __init__(self, skale, interval=RECEIPT_POLL_INTERVAL, timeout=RECEIPT_TIMEOUT,
+                 nonce_manager=None):
+        self.skale = skale
+        self.nonce_manager = nonce_manager
+        self.interval = interval
+        self.timeout = timeout
+        self._pending = {}  # tx id -> (claim, callback)
+        self._tx_hashes = {}  # transaction manager ID -> tx hash
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def track(self, claim, callback) -> None:
+        with self._lock:
+            self._pending[claim.tx_id] = (claim, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='receipt-tracker',
+                                                daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception('Receipts polling failed')
+
+    def poll(self) -> None:
+        """Checks all pending claims once."""
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return
+        results = {}  # tx id -> (receipt, error)
+        if isinstance(self.skale.wallet, RedisWalletAdapter):
+            results.update(self._resolve_tx_hashes(list(pending)))
+            tx_hashes = {tx_id: tx_hash for tx_id, tx_hash in self._tx_hashes.items()
+                         if tx_id in pending and tx_id not in results}
+        else:
+            tx_hashes = {tx_id: tx_id for tx_id in pending}
+        if tx_hashes:
+            batch = RpcBatch(self.skale.web3)
+            for tx_hash in tx_hashes.values():
+                batch.add_receipt(add_0x_prefix(tx_hash))
+            for tx_id, receipt in zip(tx_hashes, call_retry(batch.execute)):
+                if receipt is not None:
+                    results[tx_id] = (receipt, None)
+        now = time.time()
+        timed_out = [tx_id for tx_id, (claim, _) in pending.items()
+                     if tx_id not in results and now - claim.sent_at > self.timeout]
+        for tx_id in timed_out:
+            results[tx_id] = (None, TransactionNotMinedError(
+                f'Transaction {tx_id} is not mined in {self.timeout} seconds'))
+        if timed_out and self.nonce_manager is not None:
+            logger.info(f'{len(timed_out)} claims are not mined, nonce is read again')
+            self.nonce_manager.reset()
+        for tx_id, (receipt, error) in results.items():
+            self._finish(pending[tx_id], receipt, error)
+
+    def _resolve_tx_hashes(self, tx_ids) -> dict:
+        """Reads transaction manager records, returns errors of dropped or failed ones."""
+        unresolved = [tx_id for tx_id in tx_ids if tx_id not in self._tx_hashes]
+        errors = {}
+        if not unresolved:
+            return errors
+        wallet = self.skale.wallet
+        records = call_retry(wallet.rs.mget, [wallet._to_raw_id(tx_id) for tx_id in unresolved])
+        for tx_id, record in zip(unresolved, records):
+            if record is None:
+                continue
+            record = json.loads(record)
+            status = record.get('status')
+            if status in (TxRecordStatus.SUCCESS, TxRecordStatus.FAILED) and record['tx_hash']:
+                self._tx_hashes[tx_id] = record['tx_hash']
+            elif status == TxRecordStatus.DROPPED:
+                errors[tx_id] = (None, RedisWalletDroppedError('Tx was dropped after max retries'))
+            elif status == TxRecordStatus.FAILED:
+                errors[tx_id] = (None, RedisWalletWaitError(f'Tx finished with status {status}'))
+        return errors
+
+    def _finish(self, item, receipt, error):
+        claim, callback = item
+        with self._lock:
+            self._pending.pop(claim.tx_id, None)
+        self._tx_hashes.pop(claim.tx_id, None)
+        tx_res = None
+        if error is None:
+            tx_res = TxRes(claim.call_result, claim.tx_id, receipt)
+            try:
+                tx_res.raise_for_status()
+            except Exception as err:
+                tx_res, error = None, err
+        try:
+            callback(claim, tx_res, error)
+        except Exception:
+            logger.exception(f'Receipt callback of node {claim.node_id} failed')
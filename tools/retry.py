@@ -0,0 +1,276 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Retry policy shared by RPC calls, bounty jobs and RPC endpoints: exponential backoff
+with jitter, error classification, circuit breakers and a process-wide retry budget.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from enum import Enum
+
+import aiohttp
+import redis
+import requests
+from skale.transactions.exceptions import TransactionError, TransactionLogicError
+from web3.exceptions import ContractLogicError
+
+from configs import (BALANCE_CHECK_INTERVAL, CALL_RETRY_ATTEMPTS, CALL_RETRY_BASE,
+                     CALL_RETRY_MAX, JOB_RETRY_BASE, JOB_RETRY_MAX, PREFLIGHT_RETRY_DELAY,
+                     RETRY_BUDGET_BURST, RETRY_BUDGET_MIN_RATE, RETRY_BUDGET_RATIO)
+from tools.exceptions import (CircuitOpenException, NodeNotFoundException,
+                              NotEnoughEthForTxException, PreflightFailedException)
+from tools.metrics import CALL_RETRIES, REGISTRY
+
+RETRIES_DENIED = REGISTRY.counter(
+    'bounty_agent_retries_denied_total', 'Retries not made because the retry budget is spent')
+
+TRANSIENT_ERRORS = (
+    requests.ConnectionError, requests.Timeout, requests.HTTPError, aiohttp.ClientError,
+    redis.ConnectionError, redis.TimeoutError, ConnectionError, TimeoutError,
+    CircuitOpenException
+)
+REVERT_ERRORS = (ContractLogicError, TransactionLogicError, PreflightFailedException)
+CONFIG_ERRORS = (NodeNotFoundException, FileNotFoundError)
+FUNDS_ERRORS = (NotEnoughEthForTxException,)
+TRANSIENT_RPC_CODES = (-32005, -32603)  # limit exceeded, internal error
+
+
+class ErrorKind(Enum):
+    TRANSIENT = 'transient'  # connection problems, timeouts, overloaded endpoints
+    REVERT = 'revert'  # the call or the transaction reverted
+    CONFIG = 'config'  # the operator has to act: missing node or config
+    FUNDS = 'funds'  # the wallet cannot pay for the transaction until it is topped up
+    UNKNOWN = 'unknown'
+
+
+def classify(err) -> ErrorKind:
+    if isinstance(err, REVERT_ERRORS):
+        return ErrorKind.REVERT
+    if isinstance(err, CONFIG_ERRORS):
+        return ErrorKind.CONFIG
+    if isinstance(err, FUNDS_ERRORS):
+        return ErrorKind.FUNDS
+    if isinstance(err, TRANSIENT_ERRORS):
+        return ErrorKind.TRANSIENT
+    if isinstance(err, ValueError) and err.args and isinstance(err.args[0], dict):
+        rpc_error = err.args[0]  # JSON-RPC error response
+        if 'revert' in str(rpc_error.get('message', '')).lower():
+            return ErrorKind.REVERT
+        if rpc_error.get('code') in TRANSIENT_RPC_CODES:
+            return ErrorKind.TRANSIENT
+    if isinstance(err, TransactionError):
+        return ErrorKind.TRANSIENT  # not signed, not sent or not mined
+    return ErrorKind.UNKNOWN
+
+
+def backoff_delay(attempt, base, cap) -> float:
+    """Exponential backoff with equal jitter: at least half of the exponential delay."""
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """
+    Holds up to `burst` tokens: `rate` tokens are added per second and `deposit`
+    adds more, every allowed action takes one. Used by the retry budget, hedged
+    reads and notification rate limits.
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._tokens = burst
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, amount=0):
+        now = self.clock()
+        self._tokens = min(self.burst,
+                           self._tokens + amount + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def deposit(self, amount=1):
+        with self._lock:
+            self._refill(amount)
+
+    def available(self) -> bool:
+        """Refills the bucket, True if it has a token. The token is not taken."""
+        with self._lock:
+            self._refill()
+            return self._tokens >= 1
+
+    def take(self):
+        """Takes a token even if there is none, e.g. for critical notifications."""
+        with self._lock:
+            self._tokens = max(self._tokens - 1, 0)
+
+    def withdraw(self) -> bool:
+        """Takes a token, False if the bucket is empty."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryBudget(TokenBucket):
+    """
+    Token bucket shared by all retries of the process: every first attempt adds
+    `ratio` of a token and `min_rate` tokens are added per second, a retry takes one.
+    Under an outage retries stop once the bucket is empty instead of multiplying load.
+    """
+
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, min_rate=RETRY_BUDGET_MIN_RATE,
+                 burst=RETRY_BUDGET_BURST):
+        super().__init__(min_rate, burst)
+        self.ratio = ratio
+
+    def deposit(self, amount=None):
+        super().deposit(self.ratio if amount is None else amount)
+
+    def withdraw(self) -> bool:
+        if not super().withdraw():
+            RETRIES_DENIED.inc()
+            return False
+        return True
+
+
+RETRY_BUDGET = RetryBudget()
+
+
+class CircuitBreaker:
+    """
+    Closed while requests succeed. After `threshold` consecutive failures it opens and
+    requests are not sent; once the open time passes, requests are let through again
+    (half-open) and the next failure reopens it for twice as long, up to `cap`.
+    A success closes it.
+    """
+
+    def __init__(self, threshold=1, base=1, cap=60):
+        self.threshold = threshold
+        self.base = base
+        self.cap = cap
+        self.failures = 0  # consecutive
+        self.open_until = 0  # monotonic time
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until > time.monotonic()
+
+    def remaining(self) -> float:
+        """Seconds until requests are let through, 0 if the breaker is not open."""
+        return max(self.open_until - time.monotonic(), 0)
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.open_until = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                opened = self.failures - self.threshold
+                self.open_until = time.monotonic() + min(self.base * 2 ** opened, self.cap)
+
+
+class RetryPolicy:
+    """
+    Retries transient and unclassified errors of a call up to `attempts` times with
+    backoff, if the retry budget allows. Errors with a `delay` attribute, e.g. open
+    circuit breakers, are retried no sooner than that. Reverts and configuration
+    errors are raised at once.
+
+    Usage:
+        reward_date = call_retry(contract.functions.getNodeNextRewardDate(node_id).call)
+        results = await call_retry.call_async(batch.execute_async, session)
+    """
+
+    def __init__(self, attempts=CALL_RETRY_ATTEMPTS, base=CALL_RETRY_BASE, cap=CALL_RETRY_MAX,
+                 budget=RETRY_BUDGET):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.budget = budget
+
+    def _retry_delay(self, err, attempt):
+        """Returns seconds to wait before the next attempt, None if the error is raised."""
+        if attempt + 1 >= self.attempts:
+            return None
+        if classify(err) not in (ErrorKind.TRANSIENT, ErrorKind.UNKNOWN):
+            return None
+        if not self.budget.withdraw():
+            return None
+        CALL_RETRIES.inc()
+        return max(backoff_delay(attempt, self.base, self.cap), getattr(err, 'delay', 0))
+
+    def __call__(self, fn, *args, **kwargs):
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as err:
+                delay = self._retry_delay(err, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn, *args, **kwargs):
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as err:
+                delay = self._retry_delay(err, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def job_retry_delay(err, attempt, budget=RETRY_BUDGET) -> float:
+    """
+    Seconds before a failed bounty job runs again. Errors with a `delay` attribute
+    set it, e.g. waiting for the reward block. Configuration errors wait for the
+    operator, a low balance is checked again when the balance oracle refreshes it.
+    Other errors back off exponentially with jitter, so nodes do not retry
+    in lockstep, and one step longer when the retry budget is spent.
+    """
+    kind = classify(err)
+    delay = getattr(err, 'delay', None)
+    if delay is not None and kind != ErrorKind.TRANSIENT:
+        return delay
+    if kind == ErrorKind.CONFIG:
+        return PREFLIGHT_RETRY_DELAY
+    if kind == ErrorKind.FUNDS:
+        return BALANCE_CHECK_INTERVAL
+    if not budget.withdraw():
+        return max(backoff_delay(attempt + 1, JOB_RETRY_BASE, JOB_RETRY_MAX), delay or 0)
+    return max(backoff_delay(attempt, JOB_RETRY_BASE, JOB_RETRY_MAX), delay or 0)
@@ -0,0 +1,323 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+HTTP provider over several JSON-RPC endpoints of the same chain. Every request goes
+to the fastest healthy endpoint and fails over to the next one on connection errors,
+timeouts and HTTP errors. Slow reads can be hedged, see tools.hedging.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+
+import aiohttp
+import requests
+from web3 import HTTPProvider
+from web3._utils.request import make_post_request
+
+from configs import (RPC_BACKOFF_BASE, RPC_BACKOFF_MAX, RPC_HEDGE_WORKERS, RPC_HEDGING,
+                     RPC_LATENCY_SMOOTHING, RPC_MAX_BLOCK_LAG, RPC_PROBE_INTERVAL)
+from tools.hedging import HedgePolicy
+from tools.exceptions import CircuitOpenException
+from tools.metrics import REGISTRY
+from tools.retry import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+TRANSPORT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.HTTPError)
+ASYNC_TRANSPORT_ERRORS = (aiohttp.ClientError, TimeoutError)
+READ_METHODS = frozenset((
+    'eth_blockNumber', 'eth_call', 'eth_chainId', 'eth_estimateGas', 'eth_gasPrice',
+    'eth_getBalance', 'eth_getBlockByNumber', 'eth_getTransactionCount',
+    'eth_getTransactionReceipt'
+))
+
+RPC_FAILOVERS = REGISTRY.counter(
+    'bounty_agent_rpc_failovers_total', 'Requests retried on another endpoint', ['endpoint'])
+
+
+class Endpoint:
+    """Rolling latency score and circuit breaker of one endpoint."""
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None  # exponentially weighted moving average, in seconds
+        self.breaker = CircuitBreaker(base=RPC_BACKOFF_BASE, cap=RPC_BACKOFF_MAX)
+        self.block_number = None  # from the latest probe
+
+    def __repr__(self):
+        return f'Endpoint({self.url}, latency={self.latency}, failures={self.failures})'
+
+    @property
+    def failures(self):
+        return self.breaker.failures
+
+    def observe(self, latency):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += RPC_LATENCY_SMOOTHING * (latency - self.latency)
+        self.breaker.success()
+
+    def fail(self):
+        self.breaker.failure()
+
+
+class RpcPool(HTTPProvider):
+    """
+    Keeps latency and health scores from passive measurements of every request plus
+    eth_blockNumber probes each RPC_PROBE_INTERVAL, which also take endpoints lagging
+    behind the chain head out of rotation. An endpoint that failed is skipped while its
+    circuit breaker is open; if all are open, requests fail with CircuitOpenException
+    without being sent. Probes start with the first request and also reach endpoints
+    with open breakers, so they are back in rotation as soon as they recover.
+
+    With hedging, reads that are not answered within the HedgePolicy delay are sent
+    again, to another endpoint if there is one, and the first answer is used.
+    """
+
+    def __init__(self, endpoints, request_kwargs=None, probe_interval=RPC_PROBE_INTERVAL,
+                 hedging=RPC_HEDGING):
+        if not endpoints:
+            raise ValueError('At least one endpoint is required')
+        super().__init__(endpoints[0], request_kwargs=request_kwargs)
+        self.endpoints = [Endpoint(url) for url in endpoints]
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._probe_thread = None
+        self._stopped = threading.Event()
+        self.hedge_policy = HedgePolicy() if hedging else None
+        self._hedge_executor = concurrent.futures.ThreadPoolExecutor(
+            RPC_HEDGE_WORKERS, thread_name_prefix='rpc-hedge') if hedging else None
+        REGISTRY.callback(
+            'bounty_agent_rpc_endpoint_latency_seconds', 'Smoothed latency of RPC endpoints',
+            'gauge', lambda: {(endpoint.url,): endpoint.latency for endpoint in self.endpoints
+                              if endpoint.latency is not None}, ['endpoint'])
+        REGISTRY.callback(
+            'bounty_agent_rpc_endpoint_open', 'RPC endpoints skipped by the circuit breaker',
+            'gauge', lambda: {(endpoint.url,): int(endpoint.breaker.is_open)
+                              for endpoint in self.endpoints}, ['endpoint'])
+
+    @staticmethod
+    def _is_synced(endpoint, head):
+        return head is None or endpoint.block_number is None or \
+            endpoint.block_number >= head - RPC_MAX_BLOCK_LAG
+
+    def select(self, exclude=()) -> Endpoint:
+        """
+        Returns the fastest synced endpoint with a closed breaker, endpoints without
+        measurements come first; a lagging one if there are no others. Returns None
+        if all endpoints are excluded, raises CircuitOpenException if the breakers of
+        the rest are open.
+        """
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+            available = [endpoint for endpoint in candidates if not endpoint.breaker.is_open]
+            if not available:
+                delay = min(endpoint.breaker.remaining() for endpoint in candidates)
+                raise CircuitOpenException(delay, f'All RPC endpoints are skipped for '
+                                                  f'{delay:.1f} sec after failures')
+            block_numbers = [e.block_number for e in self.endpoints if e.block_number is not None]
+            head = max(block_numbers) if block_numbers else None
+            synced = [endpoint for endpoint in available if self._is_synced(endpoint, head)]
+            if synced:
+                return min(synced, key=lambda endpoint: endpoint.latency or 0)
+            return max(available, key=lambda endpoint: endpoint.block_number)
+
+    def record(self, endpoint, latency=None, error=None):
+        with self._lock:
+            if error is None:
+                endpoint.observe(latency)
+                return
+            endpoint.fail()
+        logger.warning(f'RPC endpoint {endpoint.url} failed: {error}')
+
+    def _next_endpoint(self, tried, last_error):
+        try:
+            endpoint = self.select(exclude=tried)
+        except CircuitOpenException:
+            if last_error is not None:
+                raise last_error
+            raise
+        if endpoint is None:
+            raise last_error
+        if tried:
+            RPC_FAILOVERS.inc(tried[-1].url)
+        tried.append(endpoint)
+        return endpoint
+
+    def _failover(self, send, exclude=()):
+        self._start_probes()
+        tried, last_error = list(exclude), None
+        while True:
+            endpoint = self._next_endpoint(tried, last_error)
+            start = time.monotonic()
+            try:
+                result = send(endpoint)
+            except TRANSPORT_ERRORS as err:
+                self.record(endpoint, error=err)
+                last_error = err
+                continue
+            self.record(endpoint, time.monotonic() - start)
+            return result
+
+    def _hedge_exclude(self):
+        """The hedge goes to another endpoint, or to the same one over a new connection."""
+        if len(self.endpoints) < 2:
+            return []
+        try:
+            return [self.select()]
+        except CircuitOpenException:
+            return []
+
+    def post(self, data, read=False) -> bytes:
+        """Posts a JSON-RPC request or batch, returns the raw response. Reads can be hedged."""
+        def send(endpoint):
+            return make_post_request(endpoint.url, data, **self.get_request_kwargs())
+
+        if not read or self.hedge_policy is None:
+            return self._failover(send)
+        return self._hedged(send)
+
+    def _hedged(self, send):
+        policy, start = self.hedge_policy, time.monotonic()
+        primary = self._hedge_executor.submit(self._failover, send)
+        primary.add_done_callback(lambda future: policy.observe(
+            time.monotonic() - start, future.exception() is None))
+        futures = [primary]
+        delay = policy.delay()
+        if delay is not None:
+            done, _ = concurrent.futures.wait(futures, timeout=delay)
+            if not done and policy.acquire():
+                futures.append(self._hedge_executor.submit(self._failover, send,
+                                                           self._hedge_exclude()))
+        errors = []
+        for future in concurrent.futures.as_completed(futures):
+            if future.exception() is not None:
+                errors.append(future.exception())
+                continue
+            policy.answered(time.monotonic() - start, len(futures) > 1,
+                            'primary' if future is primary else 'hedge')
+            return future.result()
+        raise errors[0]
+
+    def make_request(self, method, params):
+        raw_response = self.post(self.encode_rpc_request(method, params),
+                                 read=method in READ_METHODS)
+        return self.decode_rpc_response(raw_response)
+
+    async def _failover_async(self, session, data, exclude=()):
+        self._start_probes()
+        tried, last_error = list(exclude), None
+        while True:
+            endpoint = self._next_endpoint(tried, last_error)
+            start = time.monotonic()
+            try:
+                async with session.post(endpoint.url, data=data,
+                                        headers={'Content-Type': 'application/json'}) as response:
+                    response.raise_for_status()
+                    result = await response.json(content_type=None)
+            except ASYNC_TRANSPORT_ERRORS as err:
+                self.record(endpoint, error=err)
+                last_error = err
+                continue
+            self.record(endpoint, time.monotonic() - start)
+            return result
+
+    async def post_async(self, session, data, read=False) -> list:
+        """Same as post with an aiohttp session, returns the decoded response."""
+        if not read or self.hedge_policy is None:
+            return await self._failover_async(session, data)
+        policy, start = self.hedge_policy, time.monotonic()
+        primary = asyncio.ensure_future(self._failover_async(session, data))
+
+        def observe(task):
+            # a primary cancelled after losing did not finish, its time is not a latency
+            if not task.cancelled():
+                policy.observe(time.monotonic() - start, task.exception() is None)
+
+        primary.add_done_callback(observe)
+        tasks = [primary]
+        delay = policy.delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and policy.acquire():
+                tasks.append(asyncio.ensure_future(
+                    self._failover_async(session, data, self._hedge_exclude())))
+        pending, errors = set(tasks), []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    policy.answered(time.monotonic() - start, len(tasks) > 1,
+                                    'primary' if task is primary else 'hedge')
+                    return task.result()
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def probe(self):
+        """Measures latency and the latest block number of every endpoint."""
+        request = json.dumps({'jsonrpc': '2.0', 'id': 0, 'method': 'eth_blockNumber',
+                              'params': []})
+        for endpoint in self.endpoints:
+            start = time.monotonic()
+            try:
+                response = json.loads(make_post_request(endpoint.url, request,
+                                                        **self.get_request_kwargs()))
+                block_number = int(response['result'], 16)
+            except (*TRANSPORT_ERRORS, ValueError, KeyError, TypeError) as err:
+                self.record(endpoint, error=err)
+                continue
+            self.record(endpoint, time.monotonic() - start)
+            with self._lock:
+                endpoint.block_number = block_number
+
+    def _start_probes(self):
+        if len(self.endpoints) < 2 or self._probe_thread is not None:
+            return
+        with self._lock:
+            if self._probe_thread is None:
+                self._probe_thread = threading.Thread(target=self._probe_loop,
+                                                      name='rpc-pool-probe', daemon=True)
+                self._probe_thread.start()
+
+    def _probe_loop(self):
+        while not self._stopped.wait(self.probe_interval):
+            try:
+                self.probe()
+            except Exception as err:
+                logger.exception(f'RPC endpoints probe failed: {err}')
+
+    def stop(self):
+        self._stopped.set()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
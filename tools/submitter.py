@@ -0,0 +1,125 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Sends getBounty transactions without waiting for receipts, so claims of many nodes
+can be in flight at once from the shared wallet.
+"""
+
+import logging
+import threading
+import time
+from typing import NamedTuple
+
+import skale.config as skale_config
+from skale.transactions.result import TxCallResult, TxRes
+from skale.transactions.tools import TxStatus, make_dry_run_call, transaction_from_method
+from skale.wallets import RedisWalletAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class PendingClaim(NamedTuple):
+    node_id: int
+    tx_id: str  # transaction hash, or transaction manager ID for RedisWalletAdapter
+    call_result: TxCallResult
+    sent_at: float
+
+
+class NonceManager:
+    """
+    Assigns consecutive nonces of one account locally, starting from its pending
+    transaction count. After a failed send the count is read again, so a skipped
+    nonce does not block later transactions.
+    """
+
+    def __init__(self, web3, address):
+        self.web3 = web3
+        self.address = address
+        self._next_nonce = None
+        self._lock = threading.Lock()
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = self.web3.eth.get_transaction_count(self.address, 'pending')
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+
+    def reset(self) -> None:
+        with self._lock:
+            self._next_nonce = None
+
+
+class ClaimSubmitter:
+    """
+    Dry-runs, unless the preflight gas estimate is given, signs and sends getBounty
+    transactions. Transactions sent through RedisWalletAdapter get their nonces from
+    the transaction manager, other wallets use a local NonceManager instead of reading
+    the nonce for every transaction. With a BalanceOracle claims that the wallet cannot
+    pay for are refused before the dry run, and the cached gas price is used.
+    """
+
+    def __init__(self, skale, balance_oracle=None):
+        self.skale = skale
+        self.balance_oracle = balance_oracle
+        if isinstance(skale.wallet, RedisWalletAdapter):
+            self.nonce_manager = None
+        else:
+            self.nonce_manager = NonceManager(skale.web3, skale.wallet.address)
+
+    def submit(self, node_id, gas_estimate=None) -> PendingClaim:
+        """
+        Sends the claim of the node, raises TransactionError if the dry run fails and
+        NotEnoughEthForTxException if the wallet balance is too low. The dry run is
+        skipped if the gas estimate of the claim is already known from the preflight.
+        """
+        if self.balance_oracle is not None:
+            self.balance_oracle.check()
+        method = self.skale.manager.contract.functions.getBounty(node_id)
+        call_result, gas_limit = None, skale_config.DEFAULT_GAS_LIMIT
+        if gas_estimate is not None:
+            gas_limit = int(gas_estimate * skale_config.DEFAULT_GAS_MULTIPLIER)
+            call_result = TxCallResult(TxStatus.SUCCESS, '', 'success', {'gas': gas_limit})
+        elif not skale_config.DISABLE_DRY_RUN:
+            call_result = make_dry_run_call(self.skale, method)
+            if call_result.status != TxStatus.SUCCESS:
+                TxRes(call_result).raise_for_status()
+            gas_limit = call_result.data['gas']
+        if call_result is not None and self.balance_oracle is not None:
+            self.balance_oracle.observe_gas(gas_limit)
+        gas_price = skale_config.DEFAULT_GAS_PRICE_WEI or self.cached_gas_price() or \
+            self.skale.gas_price
+        nonce = None if self.nonce_manager is None else self.nonce_manager.allocate()
+        tx = transaction_from_method(method, gas_limit=gas_limit, gas_price=gas_price,
+                                     nonce=nonce)
+        try:
+            tx_id = self.skale.wallet.sign_and_send(
+                tx, method=f'{self.skale.manager.name}.getBounty', meta={'node_id': node_id})
+        except Exception:
+            if self.nonce_manager is not None:
+                self.nonce_manager.reset()
+            raise
+        logger.info(f'Bounty claim of node {node_id} sent: {tx_id}, nonce: {nonce}')
+        return PendingClaim(node_id, tx_id, call_result, time.time())
+
+    def cached_gas_price(self):
+        return None if self.balance_oracle is None else self.balance_oracle.gas_price
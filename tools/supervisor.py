@@ -0,0 +1,113 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import random
+import threading
+
+from configs import RESTART_BASE_DELAY, RESTART_MAX_DELAY
+from tools.exceptions import CircuitOpenException
+
+logger = logging.getLogger(__name__)
+
+
+def check_connection(skale):
+    try:
+        skale.web3.eth.block_number
+    except CircuitOpenException:
+        raise  # endpoints back off after failures, the connection is not broken
+    except Exception as err:
+        logger.warning(f'SKALE Manager endpoint is not healthy: {err}')
+        return False
+    return True
+
+
+def restart_delay(attempt, base=RESTART_BASE_DELAY, cap=RESTART_MAX_DELAY):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class Supervisor:
+    """
+    Keeps an agent running. The Skale connection survives agent restarts and is
+    rebuilt only when its health check fails; restarts back off exponentially.
+    """
+
+    def __init__(self, skale_factory, agent_factory, health_check=check_connection):
+        self.skale_factory = skale_factory
+        self.agent_factory = agent_factory
+        self.health_check = health_check
+        self.skale = None
+        self.agent = None
+        self.failures = 0
+        self._shutdown = threading.Event()
+
+    def _is_healthy(self):
+        try:
+            return self.health_check(self.skale)
+        except CircuitOpenException as err:
+            # a new connection would start with closed circuit breakers and lose the backoff
+            logger.warning(f'All SKALE Manager endpoints back off, waiting {err.delay:.1f} sec')
+            self._shutdown.wait(err.delay)
+            return True
+
+    def _close_skale(self):
+        skale, self.skale = self.skale, None
+        stop = getattr(skale.web3.provider, 'stop', None)
+        if stop is not None:
+            stop()  # probe thread and hedge executor of RpcPool
+
+    def _start_agent(self):
+        if self.skale is None or not self._is_healthy():
+            logger.info('Connecting to SKALE Manager ...')
+            if self.skale is not None:
+                self._close_skale()
+            self.skale = self.skale_factory()
+        self.agent = self.agent_factory(self.skale)
+        self.agent.run()
+
+    def _stop_agent(self):
+        if self.agent is not None:
+            try:
+                self.agent.shutdown()
+            except Exception:
+                logger.exception('Failed to shut down the agent')
+            self.agent = None
+
+    def run(self):
+        while not self._shutdown.is_set():
+            try:
+                self._start_agent()
+            except Exception as err:
+                self._stop_agent()
+                self.failures += 1
+                delay = restart_delay(self.failures)
+                logger.exception(f'Bounty agent failed with {err}, restart in {delay:.1f} sec')
+                self._shutdown.wait(delay)
+                continue
+            self.failures = 0
+            if self._shutdown.is_set():
+                self.agent.stop()
+            self.agent.stopped.wait()
+            self._stop_agent()
+
+    def stop(self):
+        self._shutdown.set()
+        if self.agent is not None:
+            self.agent.stop()
@@ -0,0 +1,161 @@
+#   -*- coding: utf-8 -*-
+#
+#   This file is part of bounty-agent
+#
+#   Copyright (C) 2019-Present SKALE Labs
+#
+#   This program is free software: you can redistribute it and/or modify
+#   it under the terms of the GNU Affero General Public License as published
+#   by the Free Software Foundation, either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU Affero General Public License for more details.
+#
+#   You should have received a copy of the GNU Affero General Public License
+#   along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+"""
+Opt-in span tracing in Chrome trace event format. Load the trace file in
+chrome://tracing or Perfetto; profiled jobs are written next to it as folded stacks
+for flamegraph tools.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from configs import (TRACE_BUFFER_SIZE, TRACE_FILEPATH, TRACE_PROFILE_JOBS,
+                     TRACE_SAMPLE_INTERVAL)
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval."""
+
+    def __init__(self, thread_id, interval=TRACE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Tracer:
+    def __init__(self, filepath=None, profile_jobs=0, buffer_size=TRACE_BUFFER_SIZE):
+        """Tracer without a filepath is disabled, its spans cost one attribute check."""
+        self.filepath = filepath
+        self.enabled = filepath is not None
+        self.profile_jobs = profile_jobs
+        self.buffer_size = buffer_size
+        self.pid = os.getpid()
+        self._events = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException as err:
+            args['error'] = type(err).__name__
+            raise
+        finally:
+            self._add({'name': name, 'ph': 'X', 'ts': start // 1000,
+                       'dur': (time.perf_counter_ns() - start) // 1000,
+                       'pid': self.pid, 'tid': threading.get_ident(), 'args': args})
+
+    @contextmanager
+    def profile(self, name):
+        """Samples the current thread while the block runs, for the first profile_jobs runs."""
+        with self._lock:
+            enabled = self.enabled and self.profile_jobs > 0
+            if enabled:
+                self.profile_jobs -= 1
+        if not enabled:
+            yield
+            return
+        profiler = SamplingProfiler(threading.get_ident())
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            filepath = f'{self.filepath}.{name}.{int(time.time())}.folded'
+            with open(filepath, 'w') as profile_file:
+                profile_file.write(profiler.folded())
+            logger.info(f'Profile of {name} saved to {filepath}')
+
+    def _add(self, event):
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Appends buffered events to the trace file. The file is a JSON array without the
+        closing bracket, which trace viewers accept, so it stays valid between flushes.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            events, self._events = self._events, []
+        if not events:
+            return
+        with self._write_lock:
+            new_file = not os.path.isfile(self.filepath)
+            with open(self.filepath, 'a') as trace_file:
+                if new_file:
+                    trace_file.write('[\n')
+                for event in events:
+                    trace_file.write(json.dumps(event, default=str) + ',\n')
+
+
+def get_tracer():
+    """Returns the process-wide tracer configured with TRACE_* options."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(TRACE_FILEPATH, TRACE_PROFILE_JOBS)
+            atexit.register(_tracer.flush)
+        return _tracer